@@ -0,0 +1,35 @@
+#include <cstdint>
+#include <cstring>
+#include <iostream>
+#include <vector>
+#include <zmq.hpp>
+
+// Sends the bandwidth, start time, and end time in the binary format of FTIO:
+// a header frame followed by one frame per field with the values as
+// little-endian doubles (native layout on x86 and most ARM systems).
+// The header contains the magic "FTB1", the number of ranks (uint32), and the
+// number of values per field (uint64).
+int main() {
+    zmq::context_t context(1);
+    zmq::socket_t sender(context, ZMQ_PUSH);
+    sender.connect("tcp://127.0.0.1:5555");
+
+    uint32_t ranks = 8;
+    std::vector<double> b  = {3.0, 0.0, 3.0, 0.0, 3.0};
+    std::vector<double> ts = {1.0, 2.0, 3.0, 4.0, 5.0};
+    std::vector<double> te = {5.0, 6.0, 7.0, 8.0, 9.0};
+    uint64_t n = b.size();
+
+    char header[16];
+    memcpy(header, "FTB1", 4);
+    memcpy(header + 4, &ranks, sizeof(ranks));
+    memcpy(header + 8, &n, sizeof(n));
+
+    // the fields are sent without copying them into a buffer first
+    sender.send(zmq::buffer(header, sizeof(header)), zmq::send_flags::sndmore);
+    sender.send(zmq::buffer(b.data(), n * sizeof(double)), zmq::send_flags::sndmore);
+    sender.send(zmq::buffer(ts.data(), n * sizeof(double)), zmq::send_flags::sndmore);
+    sender.send(zmq::buffer(te.data(), n * sizeof(double)), zmq::send_flags::none);
+
+    return 0;
+}
@@ -19,13 +19,16 @@ from ftio.prediction.helper import dump_json
 CONSOLE = MyConsole()
 CONSOLE.set(True)
 
-def run(files_or_msgs: list, argv=["-e", "plotly", "-f", "100"], b_app = [], t_app = []) -> tuple[dict, argparse.Namespace, dict]:  # "0.01"] ):
+def run(files_or_msgs: list, argv=["-e", "plotly", "-f", "100"], b_app = [], t_app = [], history = None) -> tuple[dict, argparse.Namespace, dict]:  # "0.01"] ):
     """Executes ftio on list of files_or_msgs.
 
     Args:
         files_or_msgs (list): _description_
         argv: command line arguments from ftio
-        data_rank
+        b_app (list, optional): app bandwidth of the previous ZMQ messages (extended)
+        t_app (list, optional): app time of the previous ZMQ messages (extended)
+        history (SharedHistory, optional): app bandwidth and time of the previous ZMQ
+            messages in shared memory. Used instead of b_app and t_app if set
     """
 
     # parse args
@@ -76,10 +79,14 @@ def run(files_or_msgs: list, argv=["-e", "plotly", "-f", "100"], b_app = [], t_a
     # 5) Extend for ZMQ
     if "ZMQ" in ext.upper(): # or use args.zmq
         # extend data
-        b_app.extend(b)
-        t_app.extend(t)
-        t = np.array(t_app[:])
-        b = np.array(b_app[:])
+        if history is not None:
+            history.append(b, t)
+            b, t = history.view()
+        else:
+            b_app.extend(b)
+            t_app.extend(t)
+            t = np.array(t_app[:])
+            b = np.array(b_app[:])
     else:
         t = np.array(list(t))
         b = np.array(list(b))
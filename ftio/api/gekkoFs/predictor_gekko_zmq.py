@@ -6,12 +6,14 @@ from rich.console import Console
 import numpy as np
 import zmq
 from ftio.prediction.helper import print_data#, export_extrap
-from ftio.prediction.async_process import handle_in_process
-from ftio.prediction.probability_analysis import find_probability
+from ftio.prediction.async_process import handle_in_process, WorkerPool
+from ftio.prediction.probability_analysis import find_probability, get_tracker
 from ftio.prediction.helper import get_dominant_and_conf, get_hits
 from ftio.api.gekkoFs.ftio_gekko import run
 from ftio.prediction.analysis import display_result, save_data, data_analysis
-from ftio.prediction.async_process import join_procs
+from ftio.prediction.scheduler import CoalescingScheduler
+from ftio.prediction.shared_history import SharedHistory
+from ftio.prediction.trigger import TriggerScheduler, ShellAction, LocalCargo
 from ftio.freq.helper import MyConsole
 from ftio.parse.args import parse_args
 from ftio.prediction.processes_zmq import bind_socket, receive_messages
@@ -50,9 +52,9 @@ def main(args: list[str] = sys.argv[1:]) -> None:
     hits = manager.Value("d", 0.0)
     start_time = manager.Value("d", 0.0)
     count = manager.Value("i", 0)
-    procs = []
-    b_app = manager.list()
-    t_app = manager.list()
+    # app bandwidth and time of all messages so far (shared memory, no copies). The
+    # lock of the manager allows sending it to the workers of the pool
+    history = SharedHistory(columns=2, lock=manager.Lock())
 
     # for Cargo trigger process:
     sync_trigger = manager.Queue()
@@ -61,12 +63,44 @@ def main(args: list[str] = sys.argv[1:]) -> None:
     if "-zmq" not in args:
         args.extend(["--zmq"])
 
+    # persistent workers keep the probability tracker (see get_tracker) between
+    # predictions, so only the new predictions are grouped
+    pool = None
+    if tmp_args.pool_size > 0:
+        pool = WorkerPool(
+            prediction_zmq_process,
+            (data, queue, count, hits, start_time, aggregated_bytes, args),
+            tmp_args.pool_size,
+        )
+
+    # at most max(1, pool_size) predictions in flight, messages that arrive meanwhile are
+    # merged into one pending prediction
+    def launch(msgs, ticket):
+        if pool:
+            pool.submit(msgs, history, sync_trigger, ticket)
+            return None
+        return handle_in_process(
+            prediction_zmq_process,
+            args=(
+                data,
+                queue,
+                count,
+                hits,
+                start_time,
+                aggregated_bytes,
+                args,
+                msgs,
+                history,
+                sync_trigger,
+                ticket
+            ),
+        )
+    scheduler = CoalescingScheduler(launch, tmp_args.pool_size, lambda pending, msgs: pending + msgs)
+
     # Loop and predict if changes occur
     try:
         with CONSOLE.status("[green] started\n",spinner="arrow3") as status:
             while True:
-                procs = join_procs(procs)
-
                 # get all messages
                 msgs, ranks = receive_messages(socket, poller)
 
@@ -78,27 +112,14 @@ def main(args: list[str] = sys.argv[1:]) -> None:
                 status.update("")
 
                 # launch prediction_process
-                procs.append(
-                    handle_in_process(
-                        prediction_zmq_process,
-                        args=(
-                            data,
-                            queue,
-                            count,
-                            hits,
-                            start_time,
-                            aggregated_bytes,
-                            args,
-                            msgs,
-                            b_app,
-                            t_app,
-                            sync_trigger
-                        ),
-                    )
-                )
+                scheduler.submit(msgs)
 
     except KeyboardInterrupt:
+        if pool:
+            pool.close()
+        scheduler.shutdown()
         trigger.join()
+        history.close()
         print_data(data)
         # export_extrap(data=data)
         print("-- done -- ")
@@ -113,9 +134,9 @@ def prediction_zmq_process(
     aggregated_bytes,
     args,
     msg,
-    b_app,
-    t_app,
-    sync_trigger
+    history,
+    sync_trigger,
+    ticket=None
 ) -> None:
     """performs prediction
 
@@ -128,22 +149,47 @@ def prediction_zmq_process(
         aggregated_bytes (_type_): _description_
         args (list[str]): _description_
         msg (_type_): _description_
-        b_app (_type_): _description_
-        t_app (_type_): _description_
+        history (SharedHistory): app bandwidth and time of all messages so far
         sync_trigger (_type_): _description_
+        ticket (Ticket, optional): sequence number from the scheduler. Defaults to None.
     """
+    try:
+        prediction_zmq_core(data, queue, count, hits, start_time, aggregated_bytes, args, msg, history, sync_trigger, ticket)
+    finally:
+        if ticket is not None:
+            ticket.finish()
+
+
+def prediction_zmq_core(
+    data, queue, count, hits, start_time, aggregated_bytes, args, msg, history, sync_trigger, ticket=None
+) -> None:
+    """performs the prediction and applies the result unless a newer one was already
+    applied (see prediction_zmq_process)"""
     t_prediction = time.time()
     console = Console()
     console.print(f"[purple][PREDICTOR] (#{count.value}):[/]  Started")
 
     # Modify the arguments
-    args.extend(["-e", "no"])
-    args.extend(["-ts", f"{start_time.value:.2f}"])
-    
+    args = args + ["-e", "no", "-ts", f"{start_time.value:.2f}"]
 
     # Perform prediction
-    prediction, args, t_flush = run(msg, args, b_app, t_app)
+    prediction, args, t_flush = run(msg, args, history=history)
+
+    # never apply a result that is older than an already applied one
+    if ticket is not None and not ticket.acquire():
+        console.print(f"[purple][PREDICTOR] (seq {ticket.seq}):[/][yellow] Dropped, a newer prediction was already applied[/]")
+        return
+    try:
+        apply_zmq_prediction(data, queue, count, hits, start_time, aggregated_bytes, args, prediction, t_flush, t_prediction, sync_trigger, console)
+    finally:
+        if ticket is not None:
+            ticket.release()
 
+
+def apply_zmq_prediction(
+    data, queue, count, hits, start_time, aggregated_bytes, args, prediction, t_flush, t_prediction, sync_trigger, console
+) -> None:
+    """saves the prediction, updates the shared state, and sends the result to the trigger"""
     # get data
     freq, conf = get_dominant_and_conf(prediction)  # just get a single dominant value
     hits = get_hits(prediction, count.value, hits)
@@ -163,7 +209,7 @@ def prediction_zmq_process(
         data.append(queue.get())
 
     #calculate probability
-    prob = find_probability(data)
+    prob = find_probability(data, tracker=get_tracker())
 
     probability = -1
     for p in prob:
@@ -190,57 +236,73 @@ def prediction_zmq_process(
 
 def trigger_cargo(sync_trigger,args):
     """sends cargo calls. For that in extracts the predictions from `sync_trigger` and examines it. 
+    The calls are scheduled at the predicted time of the next phase. A newer prediction
+    replaces the pending call.
 
     Args:
         sync_trigger (_type_): _description_
+        args (argparse.Namespace): parsed arguments (cargo_bin, cargo_server, and flush_cmd)
+    """
+    scheduler = TriggerScheduler(on_fire=print_trigger)
+    action = flush_action(args)
+    try:
+        while True:
+            # blocks until a prediction arrives
+            prediction = sync_trigger.get()
+            t = time.time() - prediction['t_wait']  # time waiting so far
+            # CONSOLE.print(f"[bold green][Trigger] queue wait time = {t:.3f} s[/]\n")
+            if not np.isnan(prediction['freq']):
+                #? 1) Find estimated number of phases and skip in case less than 1
+                # n_phases = (prediction['t_end']- prediction['t_start'])*prediction['freq']
+                # if n_phases <= 1:
+                #     CONSOLE.print(f"[bold green][Trigger] Skipping this prediction[/]\n")
+                #     continue
+                
+                #? 2) Time analysis to find the right instance when to send the data
+                target_time = prediction['t_end'] + 1/prediction['freq']
+                geko_elapsed_time = prediction['t_flush'] + t  # t  is the waiting time in this function. t_flush contains the overhead of ftio + when the data was flushed from gekko
+                remaining_time = (target_time - geko_elapsed_time ) 
+                CONSOLE.print(f"[bold green][Trigger {prediction['source']}][/][green] Target time = {target_time:.3f} -- Gekko time = {geko_elapsed_time:.3f} -> sending cmd in {remaining_time:.3f} s[/]\n")
+                #? 3) Skip the pending call, the new prediction is more recent
+                if scheduler.cancel("cargo"):
+                    CONSOLE.print("[bold green][Trigger][/][yellow] Skipping pending call, new prediction is ready[/]\n")
+                if remaining_time > 0:
+                    scheduler.schedule(time.time() + remaining_time, action, "cargo", prediction)
+                else:
+                    CONSOLE.print("[bold green][Trigger][/][yellow] Skipping, not in time[/]\n")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        scheduler.close()
+
+
+def flush_action(args):
+    """action executed by the trigger: --flush_cmd (a shell command or "local" for
+    a stand-in that only records the calls) or the cargo_ftio call
+
+    Args:
+        args (argparse.Namespace): parsed arguments
+
+    Returns:
+        Callable: action called with the prediction
     """
-    while True:
-        try:
-            if not sync_trigger.empty():
-                skip_flag = False 
-                prediction = sync_trigger.get()
-                t = time.time() - prediction['t_wait']  # time waiting so far
-                # CONSOLE.print(f"[bold green][Trigger] queue wait time = {t:.3f} s[/]\n")
-                if not np.isnan(prediction['freq']):
-                    #? 1) Find estimated number of phases and skip in case less than 1
-                    # n_phases = (prediction['t_end']- prediction['t_start'])*prediction['freq']
-                    # if n_phases <= 1:
-                    #     CONSOLE.print(f"[bold green][Trigger] Skipping this prediction[/]\n")
-                    #     continue
-                    
-                    #? 2) Time analysis to find the right instance when to send the data
-                    target_time = prediction['t_end'] + 1/prediction['freq']
-                    geko_elapsed_time = prediction['t_flush'] + t  # t  is the waiting time in this function. t_flush contains the overhead of ftio + when the data was flushed from gekko
-                    remaining_time = (target_time - geko_elapsed_time ) 
-                    CONSOLE.print(f"[bold green][Trigger {prediction['source']}][/][green] Target time = {target_time:.3f} -- Gekko time = {geko_elapsed_time:.3f} -> sending cmd in {remaining_time:.3f} s[/]\n")
-                    if remaining_time > 0:
-                        countdown = time.time() + remaining_time
-                        # wait till the time elapses:
-                        while time.time() < countdown:
-                            pass
-                            #? 3) Skip in case new prediction is available  
-                            # if not sync_trigger.empty():
-                            #     skip_flag = True
-
-                        if not skip_flag:
-                            if CARGO:
-                                # call = f"{args.cargo_bin}/cargo_ftio --server {args.cargo_server} -c {prediction['conf']} -p {prediction['probability']} -t {1/prediction['freq']}"
-                                call = f"{args.cargo_bin}/cargo_ftio --server {args.cargo_server} --run"
-                                os.system(call)
-
-                            # to use maybe later
-                            period = 1/prediction['freq'] if prediction['freq'] > 0 else 0
-                            text = f"frequency: {prediction['freq']}\nperiod: {period} \nconfidence: {prediction['conf']}\nprobability: {prediction['probability']}\n"
-                            CONSOLE.print("[bold green][Trigger][/][green]" + call +"\n"+text)
-                        else:
-                            CONSOLE.print("[bold green][Trigger][/][yellow] Skipping, new prediction is ready[/]\n")
-
-                    else:
-                        CONSOLE.print("[bold green][Trigger][/][yellow] Skipping, not in time[/]\n")
-
-            time.sleep(0.01)
-        except KeyboardInterrupt:
-            exit()
+    if args.flush_cmd == "local":
+        return LocalCargo()
+    if args.flush_cmd:
+        return ShellAction(args.flush_cmd)
+    if CARGO:
+        # call = f"{args.cargo_bin}/cargo_ftio --server {args.cargo_server} -c {prediction['conf']} -p {prediction['probability']} -t {1/prediction['freq']}"
+        return ShellAction(f"{args.cargo_bin}/cargo_ftio --server {args.cargo_server} --run")
+    return LocalCargo()
+
+
+def print_trigger(record: dict) -> None:
+    prediction = record["info"]
+    # to use maybe later
+    period = 1/prediction['freq'] if prediction['freq'] > 0 else 0
+    text = f"frequency: {prediction['freq']}\nperiod: {period} \nconfidence: {prediction['conf']}\nprobability: {prediction['probability']}\n"
+    text += f"fired {record['delay']*1e3:.2f} ms after the target time\n"
+    CONSOLE.print(f"[bold green][Trigger {prediction['source']}][/][green] {record['result']}\n" + text)
 
 
 def setup_cargo(tmp_args):
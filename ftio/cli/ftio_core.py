@@ -12,18 +12,14 @@ from rich.console import Group
 from rich.panel import Panel
 from ftio.parse.scales import Scales
 from ftio.parse.extract import get_time_behavior
-from ftio.plot.freq_plot import convert_and_plot
 from ftio.freq.helper import get_mode, MyConsole, merge_results
 from ftio.freq.autocorrelation import find_autocorrelation
-from ftio.freq.anomaly_detection import outlier_detection
-from ftio.freq.discretize import sample_data
-from ftio.freq._wavelet import (
-    wavelet_disc,
-    plot_wave_disc,
-    wavelet_cont,
-    plot_wave_cont,
-)  # , welch
-from ftio.freq._dft import dft, prepare_plot_dfs, display_prediction, precision_dft
+from ftio.freq.anomaly_detection import outlier_detection, outlier_detection_batch
+from ftio.freq.discretize import sample_data, sampling_frequency, sampling_grid, zero_order_hold
+from ftio.freq._dft import real_dft, rfft_buffer, amp_phi, step_dft, step_dft_bins, zoom_dft, prepare_plot_dfs, display_prediction, precision_dft
+from ftio.freq._sliding_dft import sliding_dft
+from ftio.freq._lomb_scargle import lomb_scargle
+from ftio.freq._welch import welch
 from ftio.prediction.unify_predictions import merge_predictions
 from ftio.freq.time_window import data_in_time_window
 
@@ -31,9 +27,10 @@ from ftio.freq.time_window import data_in_time_window
 CONSOLE = MyConsole()
 
 
-def main(cmd_input: list[str], msgs=None):  # -> dict[Any, Any]:
+def main(cmd_input: list[str], msgs=None, state=None):  # -> dict[Any, Any]:
     """Pass variables and call main_core. The extraction of the traces
-    and the parsing of the arguments is done in this function.
+    and the parsing of the arguments is done in this function. `state`
+    (dict) persists between calls (e.g., the sliding DFT of the predictor).
     """
     # prepare data
     start = time.time()
@@ -47,18 +44,24 @@ def main(cmd_input: list[str], msgs=None):  # -> dict[Any, Any]:
     CONSOLE.print(f"[cyan]Frequency Analysis:[/] {args.transformation.upper()}")
     CONSOLE.print(f"[cyan]Mode:[/] {args.mode}")
 
-    # get prediction
-    prediction, dfs = core(data, args)
-
-    # plot and print info
-    convert_and_plot(data, dfs, args)
-    display_prediction(cmd_input, prediction)
+    # get prediction (a list with one prediction per trace in batch mode)
+    if args.batch:
+        prediction, dfs = core_batch(data, args)
+    else:
+        prediction, dfs = core(data, args, state)
+
+    # plot and print info (the plot modules are only loaded when needed)
+    if any(x in args.engine for x in ["mat", "plot"]):
+        from ftio.plot.freq_plot import convert_and_plot
+        convert_and_plot(data, dfs, args)
+    for pred in prediction if args.batch else [prediction]:
+        display_prediction(cmd_input, pred)
     CONSOLE.print(f"[cyan]Total elapsed time:[/] {time.time()-start:.3f} s\n")
 
     return prediction, args
 
 
-def core(data: list[dict], args) -> tuple[dict, list]:
+def core(data: list[dict], args, state=None) -> tuple[dict, list]:
     """ftio core function
 
     Args:
@@ -69,6 +72,7 @@ def core(data: list[dict], args) -> tuple[dict, list]:
             "ranks": i (int)
             }
         args (_type_): argparse
+        state (dict, optional): persistent state between calls (see freq_analysis). Defaults to None.
 
     Returns:
         tuple[dict,list[list[float]]]: _description_
@@ -82,7 +86,7 @@ def core(data: list[dict], args) -> tuple[dict, list]:
     # get predictions
     for sim in data:
         # Perform frequency analysis (dft/wavelet)
-        prediction_dft, dfs, share = freq_analysis(args, sim)
+        prediction_dft, dfs, share = freq_analysis(args, sim, state)
         # Perform autocorrelation if args.autocorrelation is true + Merge the results into a single prediction
         prediction_auto = find_autocorrelation(args, sim, share)
         # Merge results
@@ -93,7 +97,102 @@ def core(data: list[dict], args) -> tuple[dict, list]:
     return prediction, dfs_out
 
 
-def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list], dict]:
+def core_batch(data: list[dict], args) -> tuple[list[dict], list]:
+    """Batch version of the ftio core function that returns one prediction per trace.
+    The sampled signals with the same length and sampling frequency are stacked in a 2D
+    array and transformed with a single rfft along the rows. The Z-score is vectorized
+    across the rows. Transformations other than dft are executed trace by trace.
+
+    Args:
+        data (list[dict]): traces (see core)
+        args (_type_): argparse
+
+    Returns:
+        tuple[list[dict], list[list[float]]]: predictions (same order as data) and dataframes for plotting
+    """
+    CONSOLE.set(args.verbose)
+    predictions = [{} for _ in data]
+    dfs_out = [[],[],[],[]]
+    if args.transformation != "dft":
+        for i, sim in enumerate(data):
+            prediction_dft, dfs, share = freq_analysis(args, sim)
+            prediction_auto = find_autocorrelation(args, sim, share)
+            predictions[i] = merge_predictions(args, prediction_dft, prediction_auto)
+            dfs_out = merge_results(dfs_out, dfs)
+        return predictions, dfs_out
+
+    #! Discretize all signals and group them according to the length and sampling frequency
+    tik = time.time()
+    traces = []
+    groups = {}
+    for i, sim in enumerate(data):
+        bandwidth, time_b, _ = data_in_time_window(
+            args, sim["bandwidth"], sim["time"], sim["total_bytes"], sim["ranks"]
+        )
+        b_sampled, freq, _ = sample_data(bandwidth, time_b, args.freq)
+        traces.append((bandwidth, time_b, b_sampled, freq))
+        groups.setdefault((len(b_sampled), freq), []).append(i)
+    CONSOLE.print(
+        f"\n[cyan]Discretization finished:[/] {time.time() - tik:.3f} s "
+        f"({len(data)} traces in {len(groups)} groups)"
+    )
+
+    #! Batched transformation + outlier detection
+    tik = time.time()
+    for (N, freq), rows in groups.items():
+        b_sampled = np.vstack([traces[i][2] for i in rows])
+        if args.autocorrelation:
+            spectrum = np.fft.rfft(b_sampled, 2 * N, axis=1)
+            amp, phi = amp_phi(spectrum[:, ::2], N)
+        else:
+            X, _ = real_dft(b_sampled, args.fft_backend, args.fft_workers, args.fft_fast_len)
+            amp, phi = amp_phi(X, N)
+        freq_arr = freq * np.arange(0, N) / N
+        results = outlier_detection_batch(amp, freq_arr, args)
+
+        for j, i in enumerate(rows):
+            bandwidth, time_b, _, _ = traces[i]
+            dominant_index, conf, outlier_text = results[j]
+            CONSOLE.print(outlier_text)
+            prediction = {
+                "source": {args.transformation},
+                "dominant_freq": [],
+                "conf": [],
+                "t_start": time_b[0],
+                "t_end": time_b[-1],
+                "total_bytes": data[i]["total_bytes"],
+                "freq": freq,
+                "ranks": data[i]["ranks"],
+            }
+            conf = assign_dft_prediction(args, prediction, amp[j], phi[j], freq_arr, dominant_index, conf)
+            share = {}
+            if args.autocorrelation:
+                share = {
+                    "b_sampled": b_sampled[j],
+                    "freq": freq,
+                    "t_start": prediction["t_start"],
+                    "t_end": prediction["t_end"],
+                    "total_bytes": prediction["total_bytes"],
+                    "spectrum": spectrum[j],
+                }
+            prediction_auto = find_autocorrelation(args, data[i], share)
+            predictions[i] = merge_predictions(args, prediction, prediction_auto)
+
+            if any(x in args.engine for x in ["mat", "plot"]):
+                dfs = prepare_plot_dfs(
+                    i, freq, freq_arr, conf, dominant_index, amp[j], phi[j],
+                    b_sampled[j], time_b, data[i]["ranks"], bandwidth,
+                )
+                dfs_out = merge_results(dfs_out, dfs)
+
+    CONSOLE.print(
+        f"\n[cyan]Batched {args.transformation.upper()} + {args.outlier} finished:[/] {time.time() - tik:.3f} s"
+    )
+
+    return predictions, dfs_out
+
+
+def freq_analysis(args, data: dict, state=None) -> tuple[dict, tuple[list, list, list, list], dict]:
     """Description:
     performs sampling and that frequency technique (dft, wave_cont, or wave_disc),
     followed by creating
@@ -106,6 +205,8 @@ def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list]
             2. time (np.array): time array indicating when bandwidth time points changed
             3. total_bytes (int): total transferred bytes
             4. ranks: number of ranks that did I/O
+        state (dict, optional): persistent state between calls. Used with --sliding_dft to
+            update the spectrum instead of recalculating it. Defaults to None.
 
     Raises:
         Exception: _description_
@@ -144,8 +245,30 @@ def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list]
 
     #! Discretize signal: sample the bandwidth
     tik = time.time()
+    X = None
+    t_start = time_b[0]
     CONSOLE.print("[cyan]Executing:[/] Discretization\n")
-    b_sampled, freq, text_disc = sample_data(bandwidth, time_b, args.freq)
+    if any(x in args.transformation for x in ["step", "lomb", "welch"]):
+        # the spectrum is evaluated from the change points (welch: per segment),
+        # sampling the entire signal is only needed for plots
+        b_sampled = np.array([])
+        freq = args.freq
+        if "step" in args.transformation:
+            # the number of bins does not grow with the sampling frequency
+            freq, N, text_disc = step_dft_bins(time_b, freq)
+        else:
+            if "lomb" in args.transformation and freq < 0 and time_b[-1] > time_b[0]:
+                # the bins reach up to the average Nyquist frequency of the change points
+                freq = len(time_b) / (time_b[-1] - time_b[0])
+            freq, N, text_disc = sampling_frequency(time_b, freq)
+        text_disc = text_disc[:-1]
+    elif state is not None and args.sliding_dft:
+        # the spectrum is updated with the samples that arrived since the last call
+        X, b_sampled, freq, t_start, text_disc = sliding_dft(
+            state, bandwidth, time_b, args.freq, args.ts if args.ts else 0
+        )
+    else:
+        b_sampled, freq, text_disc = sample_data(bandwidth, time_b, args.freq)
     CONSOLE.print(
         Panel.fit(
             text_disc,
@@ -164,53 +287,64 @@ def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list]
     tik = time.time()
 
     ##! Choose Method
-    if "dft" in args.transformation:
-        ##? calculate DFT
-        X = dft(b_sampled)
-        N = len(X)
-        amp = abs(X)
-        freq_arr = freq * np.arange(0, N) / N
-        phi = np.arctan2(X.imag, X.real)
-        conf = np.zeros(len(amp))
-        # welch(bandwidth,freq)
+    if any(x in args.transformation for x in ["dft", "lomb", "welch"]):
+        ##? calculate DFT (only the non-redundant half of the spectrum)
+        if any(x in args.transformation for x in ["step", "lomb", "welch"]):
+            if args.autocorrelation or args.refine or any(x in args.engine for x in ["mat", "plot"]):
+                # only N samples (as many as bins, see step_dft_bins for step_dft)
+                b_sampled = zero_order_hold(bandwidth, time_b, sampling_grid(time_b[0], freq, N))
+            if "lomb" in args.transformation:
+                X = lomb_scargle(bandwidth, time_b, freq, N)
+            elif "welch" in args.transformation:
+                # the bins refer to the segment length L, the signal keeps its N samples
+                X, L, welch_text = welch(
+                    bandwidth, time_b, freq, N, args.welch_segment, args.welch_overlap,
+                    backend=args.fft_backend, workers=args.fft_workers,
+                )
+                text = Group(text, welch_text)
+            else:
+                X = step_dft(bandwidth, time_b, freq, N)
+        elif X is not None:
+            # sliding DFT
+            N = len(b_sampled)
+        elif args.autocorrelation:
+            # the zero-padded spectrum contains the DFT at the even bins and is
+            # shared with the autocorrelation
+            share["spectrum"] = np.fft.rfft(b_sampled, 2 * len(b_sampled))
+            X = share["spectrum"][::2]
+            N = len(b_sampled)
+        else:
+            out = None
+            if state is not None and args.fft_backend == "rfft" and not args.fft_fast_len:
+                # repeated predictions with the same N reuse the spectrum
+                out = rfft_buffer(state, len(b_sampled))
+            X, N = real_dft(b_sampled, args.fft_backend, args.fft_workers, args.fft_fast_len, out)
+        n_bins = L if "welch" in args.transformation else N
+        amp, phi = amp_phi(X, n_bins)
+        freq_arr = freq * np.arange(0, n_bins) / n_bins
 
         ##? Find dominant frequency
-        (
-            dominant_index,
-            conf[1 : int(len(amp) / 2) + 1],
-            outlier_text,
-        ) = outlier_detection(amp, freq_arr, args)
-
-        ##? ignore DC offset
-        conf[0] = np.inf
-        if len(amp) % 2 == 0:
-            conf[int(len(amp) / 2) + 1 :] = np.flip(conf[1 : int(len(amp) / 2)])
-        else:
-            conf[int(len(amp) / 2) + 1 :] = np.flip(conf[1 : int(len(amp) / 2) + 1])
+        dominant_index, conf, outlier_text = outlier_detection(amp, freq_arr, args)
 
         ##? Assign data
-        prediction["dominant_freq"] = freq_arr[dominant_index]
-        prediction["conf"]          = conf[dominant_index]
-        prediction["amp"]           = amp[dominant_index]
-        prediction["phi"]           = phi[dominant_index]
-        prediction["t_start"]       = time_b[0]
+        conf = assign_dft_prediction(args, prediction, amp, phi, freq_arr, dominant_index, conf)
+        prediction["t_start"]       = t_start
         prediction["t_end"]         = time_b[-1]
         prediction["freq"]          = freq
         prediction["ranks"]         = ranks
         prediction["total_bytes"]   = total_bytes
 
-        #? save up to n_freq from the top candidates
-        if args.n_freq > 0:
-            arr = amp[0:int(np.ceil(len(amp)/2))]
-            top_candidates = np.argsort(-arr) # from max to min
-            n_freq = int(min(len(arr),args.n_freq))
-            prediction["top_freq"] = {
-                "freq": freq_arr[top_candidates[0:n_freq]],
-                "conf": conf[top_candidates[0:n_freq]],
-                "amp":  amp[top_candidates[0:n_freq]],
-                "phi":  phi[top_candidates[0:n_freq]]
-            }
-            
+        ##? Refine the dominant frequencies below the frequency resolution
+        refine_text = ""
+        if args.refine and len(dominant_index) > 0:
+            (
+                prediction["dominant_freq"],
+                prediction["amp"],
+                prediction["phi"],
+                refine_text,
+            ) = zoom_dft(b_sampled, freq, dominant_index, args.refine_points, n_bins)
+            refine_text = refine_text[:-1]
+
         if args.autocorrelation:
             share["b_sampled"]   = b_sampled
             share["freq"]        = freq
@@ -223,7 +357,7 @@ def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list]
         #     amp, phi, dominant_index, b_sampled, time_b[0] + np.arange(0, N) * 1 / freq, freq_arr, args.engine
         # )
 
-        text = Group(text, outlier_text, precision_text[:-1])
+        text = Group(text, outlier_text, refine_text, precision_text[:-1])
 
         if any(x in args.engine for x in ["mat", "plot"]):
             df_out = prepare_plot_dfs(
@@ -245,6 +379,7 @@ def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list]
         # discrete wavelet decomposition:
         # https://edisciplinas.usp.br/pluginfile.php/4452162/mod_resource/content/1/V1-Parte%20de%20Slides%20de%20p%C3%B3sgrad%20PSI5880_PDF4%20em%20Wavelets%20-%202010%20-%20Rede_AIASYB2.pdf
         # https://www.youtube.com/watch?v=hAQQwvKsWCY&ab_channel=NathanKutz
+        from ftio.freq._wavelet import wavelet_disc, plot_wave_disc
         print("    '-> \033[1;32mPerforming discrete wavelet decomposition\033[1;0m")
         wavelet = "db1"  # dmey might be better https://pywavelets.readthedocs.io/en/latest/ref/wavelets.html
         # wavelet = 'haar' # dmey might be better https://pywavelets.readthedocs.io/en/latest/ref/wavelets.html
@@ -271,6 +406,7 @@ def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list]
 
     elif "wave_cont" in args.transformation:
         # Continuous wavelets
+        from ftio.freq._wavelet import wavelet_cont, plot_wave_cont
         print("    '-> \033[1;32mPerforming discrete wavelet decomposition\033[1;0m")
         wavelet = "morl"
         # wavelet = 'cmor'
@@ -300,6 +436,60 @@ def freq_analysis(args, data: dict) -> tuple[dict, tuple[list, list, list, list]
     return prediction, df_out, share
 
 
+def assign_dft_prediction(
+    args,
+    prediction: dict,
+    amp: np.ndarray,
+    phi: np.ndarray,
+    freq_arr: np.ndarray,
+    dominant_index: list,
+    conf_half: np.ndarray,
+) -> np.ndarray:
+    """Assigns the dominant frequencies found by the outlier detection to the prediction
+    (dominant_freq, conf, amp, phi, and optionally top_freq)
+
+    Args:
+        args (argparse): command line arguments
+        prediction (dict): prediction to fill
+        amp (np.ndarray): amplitude spectrum
+        phi (np.ndarray): phase spectrum
+        freq_arr (np.ndarray): frequency array
+        dominant_index (list): indices of the dominant frequencies
+        conf_half (np.ndarray): confidence of the bins 1 to N/2 from the outlier detection
+
+    Returns:
+        np.ndarray: confidence for all N bins
+    """
+    conf = np.zeros(len(amp))
+    conf[1 : int(len(amp) / 2) + 1] = conf_half
+
+    ##? ignore DC offset
+    conf[0] = np.inf
+    if len(amp) % 2 == 0:
+        conf[int(len(amp) / 2) + 1 :] = np.flip(conf[1 : int(len(amp) / 2)])
+    else:
+        conf[int(len(amp) / 2) + 1 :] = np.flip(conf[1 : int(len(amp) / 2) + 1])
+
+    prediction["dominant_freq"] = freq_arr[dominant_index]
+    prediction["conf"]          = conf[dominant_index]
+    prediction["amp"]           = amp[dominant_index]
+    prediction["phi"]           = phi[dominant_index]
+
+    #? save up to n_freq from the top candidates
+    if args.n_freq > 0:
+        arr = amp[0:int(np.ceil(len(amp)/2))]
+        top_candidates = np.argsort(-arr) # from max to min
+        n_freq = int(min(len(arr),args.n_freq))
+        prediction["top_freq"] = {
+            "freq": freq_arr[top_candidates[0:n_freq]],
+            "conf": conf[top_candidates[0:n_freq]],
+            "amp":  amp[top_candidates[0:n_freq]],
+            "phi":  phi[top_candidates[0:n_freq]]
+        }
+
+    return conf
+
+
 def run():
     _ = main(sys.argv)
 
@@ -3,9 +3,6 @@
 from __future__ import annotations
 import sys
 from multiprocessing import Manager
-from ftio.prediction.pools import predictor_with_pools
-from ftio.prediction.processes_zmq import predictor_with_processes_zmq
-from ftio.prediction.processes import predictor_with_processes
 
 def main(args: list[str] = sys.argv) -> None:
     """runs the prediction and launches new threads whenever data is available
@@ -13,6 +10,31 @@ def main(args: list[str] = sys.argv) -> None:
     Args:
         args (list[str]): arguments passed from command line
     """
+    # result channel (PUB/REP)
+    publisher = None
+    if any(x in args for x in ["--pub_port", "--rep_port"]):
+        from ftio.prediction.publisher import start_publisher
+        publisher = start_publisher(args)
+
+    try:
+        run(args)
+    finally:
+        if publisher:
+            publisher.close()
+
+
+def run(args: list[str]) -> None:
+    """runs the predictor in the mode selected by the arguments
+
+    Args:
+        args (list[str]): arguments passed from command line
+    """
+    if "--server" in args:
+        # several applications over ZMQ with asyncio
+        from ftio.prediction.server_zmq import main as server_main
+        server_main(args)
+        return
+
     # Init
     manager = Manager()
     filename = args[1]
@@ -24,19 +46,23 @@ def main(args: list[str] = sys.argv) -> None:
     count = manager.Value('i', 0)
     b_app = manager.list()
     t_app = manager.list()
+    state = None # the workers keep the state between predictions (see get_state)
     
     mode = "procs" # "procs" or "pool"
     
     if "pool" in mode.lower():
         # prediction with a Pool of process and a callback mechanism
-        predictor_with_pools(filename, data, queue, count, hits, start_time, aggregated_bytes, args)
+        from ftio.prediction.pools import predictor_with_pools
+        predictor_with_pools(filename, data, queue, count, hits, start_time, aggregated_bytes, args, state)
     else:
         if any("zmq" in x for x in args):
             # prediction with Processes of process and a callback mechanism + zmq
-            predictor_with_processes_zmq(data, queue, count, hits, start_time, aggregated_bytes, args, b_app, t_app)
+            from ftio.prediction.processes_zmq import predictor_with_processes_zmq
+            predictor_with_processes_zmq(data, queue, count, hits, start_time, aggregated_bytes, args, b_app, t_app, state)
         else:
             # prediction with Processes of process and a callback mechanism
-            predictor_with_processes(filename, data, queue, count, hits, start_time, aggregated_bytes, args)
+            from ftio.prediction.processes import predictor_with_processes
+            predictor_with_processes(filename, data, queue, count, hits, start_time, aggregated_bytes, args, state)
 
 if __name__ == "__main__":
     main(sys.argv)
@@ -0,0 +1,149 @@
+"""DBSCAN with min_samples=2 for the points of a spectrum (normalized frequency and
+amplitude). With min_samples=2, a point is noise if and only if no other point lies
+within eps, so the noise is found without a neighbor search over all points: The
+points are sorted once into grid cells with a diagonal of eps. Points that share a
+cell are neighbors, and only the points that are alone in their cell are compared
+with the points of the surrounding cells. The clusters are the connected components
+of the neighbors. They are connected by the Euclidean minimum spanning tree of the
+points that are not noise, restricted to the edges within eps. This tree is part of
+the Delaunay triangulation, so only its O(n) edges are checked, and only for the
+cells next to a cell of another component. This takes
+O(n log n) time and O(n) memory, instead of the O(n^2) neighborhoods of sklearn's
+DBSCAN on dense spectra.
+"""
+
+from __future__ import annotations
+import numpy as np
+
+# cells around a cell that can contain points within eps (the diagonal is eps)
+OFFSETS = [(i, j) for i in range(-2, 3) for j in range(-2, 3) if (i, j) != (0, 0)]
+
+
+def dbscan(d: np.ndarray, eps: float) -> np.ndarray:
+    """Labels the points as sklearn.cluster.DBSCAN(eps=eps, min_samples=2) does: -1 for
+    noise and 0, 1, ... for the clusters in the order of their first point.
+
+    The labels are identical to DBSCAN. The clusters are the connected components of
+    the neighbors found on the way (points in the same cell, consecutive points, and
+    the neighbors of points alone in their cell) and of the Delaunay edges within eps.
+
+    Args:
+        d (np.ndarray): points (n x 2)
+        eps (float): maximal distance of two neighbors
+
+    Returns:
+        np.ndarray: label of each point
+    """
+    n = len(d)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n < 2:
+        return labels
+
+    # sort the points into cells
+    side = eps / np.sqrt(2)
+    cell = np.floor((d - d.min(axis=0)) / side).astype(np.int64) + 2
+    width = int(cell[:, 1].max()) + 3
+    key = cell[:, 0] * width + cell[:, 1]
+    order = np.argsort(key, kind="stable")
+    keys, starts, counts = np.unique(key[order], return_index=True, return_counts=True)
+    count = np.empty(n, dtype=np.int64)
+    count[order] = np.repeat(counts, counts)
+    core = count > 1
+
+    # points in the same cell
+    same = key[order[1:]] == key[order[:-1]]
+    edges = [(order[:-1][same], order[1:][same])]
+
+    # consecutive points (neighboring frequencies)
+    near = distance(d[:-1], d[1:]) <= eps
+    core[:-1] |= near
+    core[1:] |= near
+    edges.append((np.flatnonzero(near), np.flatnonzero(near) + 1))
+
+    # points alone in their cell
+    alone = np.flatnonzero(count == 1)
+    for i, j in OFFSETS:
+        other = key[alone] + i * width + j
+        pos = np.minimum(np.searchsorted(keys, other), len(keys) - 1)
+        found = keys[pos] == other
+        p, pos = alone[found], pos[found]
+        if len(p) == 0:
+            continue
+        # all points of the found cells
+        n_points = counts[pos]
+        p = np.repeat(p, n_points)
+        offset = np.arange(len(p)) - np.repeat(np.cumsum(n_points) - n_points, n_points)
+        q = order[np.repeat(starts[pos], n_points) + offset]
+        close = distance(d[p], d[q]) <= eps
+        core[p[close]] = True
+        edges.append((p[close], q[close]))
+
+    # clusters. Components in neighboring cells can still touch: only the points of
+    # these cells are triangulated
+    component = components(edges, n)
+    cell_component = np.where(core[order[starts]], component[order[starts]], -1)
+    border = np.zeros(len(keys), dtype=bool)
+    for i, j in OFFSETS:
+        other = keys + i * width + j
+        pos = np.minimum(np.searchsorted(keys, other), len(keys) - 1)
+        found = (keys[pos] == other) & (cell_component[pos] >= 0)
+        border |= found & (cell_component[pos] != cell_component)
+    in_border = np.empty(n, dtype=bool)
+    in_border[order] = np.repeat(border, counts)
+    index = np.flatnonzero(core & in_border)
+    if len(index) > 0:
+        edges.append(delaunay_edges(d, index, eps))
+        component = components(edges, n)
+    index = np.flatnonzero(core)
+    # number the clusters in the order of their first point
+    _, first, inverse = np.unique(component[index], return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    labels[index] = rank[inverse]
+    return labels
+
+
+def components(edges: list, n: int) -> np.ndarray:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    rows = np.concatenate([e[0] for e in edges])
+    cols = np.concatenate([e[1] for e in edges])
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def delaunay_edges(d: np.ndarray, index: np.ndarray, eps: float) -> tuple[np.ndarray, np.ndarray]:
+    """Finds the edges of the Delaunay triangulation that are within eps. They contain
+    the minimum spanning tree, and hence connect the points as all neighbors do.
+
+    Args:
+        d (np.ndarray): points (n x 2)
+        index (np.ndarray): indices of the points to triangulate
+        eps (float): maximal distance of two neighbors
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: indices of the two points of each edge
+    """
+    from scipy.spatial import Delaunay, QhullError
+
+    points = d[index]
+    try:
+        tri = Delaunay(points)
+    except (QhullError, ValueError):
+        # fewer than three points, or all points lie on a line: the tree is the
+        # chain of the points along the line
+        order = np.lexsort((points[:, 1], points[:, 0]))
+        p, q = order[:-1], order[1:]
+    else:
+        p = tri.simplices.ravel()
+        q = np.roll(tri.simplices, 1, axis=1).ravel()
+        # points left out of the triangulation (duplicates) and their nearest vertex
+        p = np.concatenate((p, tri.coplanar[:, 0]))
+        q = np.concatenate((q, tri.coplanar[:, 2]))
+    close = distance(points[p], points[q]) <= eps
+    return index[p[close]], index[q[close]]
+
+
+def distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.sum((a - b) ** 2, axis=1))
@@ -1,14 +1,14 @@
 """Contains DFT methods and accuracy calculation 
 """
+import inspect
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 from ftio.prediction.unify_predictions import  color_pred
 from ftio.prediction.helper import get_dominant_and_conf
 from ftio.freq.helper import MyConsole
 
 
 CONSOLE = MyConsole()
+_NUMPY_OUT = "out" in inspect.signature(np.fft.rfft).parameters
 
 
 #!################
@@ -41,6 +41,236 @@ def dft_slow(b):
     X = np.dot(e, b)
     return X
 
+#4) Analytic DFT of a step function
+# step_dft evaluates at most max(STEP_DFT_MAX_N, 2*change points) bins
+STEP_DFT_MAX_N = 2**16
+
+
+def step_dft_bins(t: np.ndarray, freq: float) -> tuple[float, int, str]:
+    """Finds the sampling frequency and the number of bins N of step_dft. In the
+    automatic modes of -f (freq < 0), the bins reach up to the average Nyquist frequency
+    of the change points, so N is the number of change points. Larger N (e.g., a high
+    sampling frequency) are clamped by lowering the sampling frequency. Hence, the cost
+    of step_dft depends on the change points and not on the sampling frequency.
+
+    Args:
+        t (np.ndarray): time stamps where the bandwidth changes
+        freq (float): sampling frequency (-1 or -2 for the automatic modes)
+
+    Returns:
+        tuple[float, int, str]: sampling frequency, number of bins, and text
+    """
+    from ftio.freq.discretize import sampling_frequency
+
+    if freq < 0 and t[-1] > t[0]:
+        freq = len(t) / (t[-1] - t[0])
+    freq, N, text = sampling_frequency(t, freq)
+    n_max = max(STEP_DFT_MAX_N, 2 * len(t))
+    if N > n_max:
+        freq, N, text = sampling_frequency(t, freq * n_max / N)
+        text += f"[yellow]Sampling frequency lowered to {freq:.3e} Hz (step_dft evaluates at most {n_max} bins)[/]\n"
+    return freq, N, text
+
+
+def step_dft(b: np.ndarray, t: np.ndarray, freq: float, N: int, chunk: int = 2**22) -> np.ndarray:
+    """Calculates the spectrum of the piecewise-constant bandwidth directly from
+    the change points without sampling it. Each segment [t_i, t_i+1) contributes
+    b_i*(exp(-jwt_i) - exp(-jwt_i+1))/(jw), which telescopes to a sum over the jumps
+    of the signal. The result is scaled by the sampling frequency so that it
+    matches the DFT of the sampled signal at the bins k*freq/N. Only the non-redundant
+    half of the spectrum is evaluated.
+
+    Args:
+        b (np.ndarray): bandwidth
+        t (np.ndarray): time stamps where the bandwidth changes
+        freq (float): sampling frequency (defines the frequency bins)
+        N (int): number of frequency bins
+        chunk (int, optional): max. elements of the intermediate matrix. Defaults to 2**22.
+
+    Returns:
+        np.ndarray: bins 0 to N//2 (as returned by np.fft.rfft)
+    """
+    n_half = N // 2 + 1
+    X = np.zeros(n_half, dtype=complex)
+    if N == 0 or len(t) == 0:
+        return X
+    # restrict the signal to the window covered by the N bins
+    tau = np.clip(np.append(t, t[0] + N / freq), t[0], t[0] + N / freq) - t[0]
+    b = np.asarray(b, dtype=float)[: len(t)]
+    X[0] = freq * np.sum(b * np.diff(tau))
+
+    # jumps of the signal (the signal is zero after the last point)
+    jumps = np.diff(np.concatenate([[0.0], b, [0.0]]))
+    keep = jumps != 0
+    jumps, tau = jumps[keep], tau[keep]
+
+    step = max(1, chunk // max(1, len(tau)))
+    for start in range(1, n_half, step):
+        w = 2 * np.pi * freq / N * np.arange(start, min(start + step, n_half))
+        X[start : start + len(w)] = np.exp(-1j * np.outer(w, tau)) @ jumps * freq / (1j * w)
+
+    return X
+
+
+#5) Real DFT backends
+def real_dft(
+    b: np.ndarray, backend: str = "rfft", workers: int = -1, fast_len: bool = False, out: np.ndarray = None
+) -> tuple[np.ndarray, int]:
+    """Calculates only the non-redundant half of the spectrum of a real signal
+    (bins 0 to N//2) with the selected backend. For 2D arrays, each row is transformed.
+
+    Args:
+        b (np.ndarray): sampled signal
+        backend (str, optional): rfft (numpy real FFT), scipy.fft (scipy real FFT with
+            several workers), or numpy (full complex numpy FFT). Defaults to "rfft".
+        workers (int, optional): workers for the scipy backend (-1 uses all cores). Defaults to -1.
+        fast_len (bool, optional): evaluates the bins with FFTs of a fast length (see
+            fast_len_dft). The bins are the same as without. Defaults to False.
+        out (np.ndarray, optional): output array for the rfft backend (numpy >= 2.0),
+            see rfft_buffer. The returned spectrum is then this array. Defaults to None
+            (a new array).
+
+    Returns:
+        tuple[np.ndarray, int]: bins 0 to N//2 and N (the number of samples)
+    """
+    n = b.shape[-1]
+    if fast_len:
+        return fast_len_dft(b, workers), n
+
+    if backend == "scipy.fft":
+        from scipy import fft as sp_fft
+
+        X = sp_fft.rfft(b, n, axis=-1, workers=workers)
+    elif backend == "numpy":
+        X = np.fft.fft(b, n, axis=-1)[..., : n // 2 + 1]
+    elif backend == "rfft":
+        if out is not None and _NUMPY_OUT:
+            X = np.fft.rfft(b, n, axis=-1, out=out)
+        else:
+            X = np.fft.rfft(b, n, axis=-1)
+    else:
+        raise ValueError(f"Unsupported FFT backend: {backend}")
+
+    return X, n
+
+
+def rfft_buffer(state: dict, n: int) -> np.ndarray:
+    """Output buffer for the rfft of n samples (see real_dft). The buffer is kept in the
+    state, so repeated predictions with the same N reuse it instead of allocating a new
+    spectrum. The content is only valid until the next call with the same state.
+
+    Args:
+        state (dict): state that persists between predictions
+        n (int): number of samples
+
+    Returns:
+        np.ndarray: buffer with n//2+1 complex bins
+    """
+    out = state.get("rfft_out", None)
+    if out is None or len(out) != n // 2 + 1:
+        out = np.empty(n // 2 + 1, dtype=complex)
+        state["rfft_out"] = out
+    return out
+
+
+def fast_len_dft(b: np.ndarray, workers: int = -1) -> np.ndarray:
+    """Calculates the bins 0 to N//2 of the DFT of length N with a chirp-Z transform
+    (Bluestein). The convolution is done with FFTs of the next fast length, so
+    lengths with large prime factors do not slow down the FFT. Unlike zero-padding the
+    signal, the frequency bins (and hence the prediction) stay the same.
+
+    Args:
+        b (np.ndarray): sampled signal (rows for 2D arrays)
+        workers (int, optional): workers of scipy.fft (-1 uses all cores). Defaults to -1.
+
+    Returns:
+        np.ndarray: bins 0 to N//2
+    """
+    from scipy import fft as sp_fft
+
+    n = b.shape[-1]
+    m = n // 2 + 1
+    # exp(-j*pi*k^2/N) with the exponent reduced exactly (k^2 mod 2N)
+    k = np.arange(n, dtype=np.int64)
+    chirp = np.exp(-1j * np.pi * ((k * k) % (2 * n)) / n)
+    length = sp_fft.next_fast_len(n + m - 1)
+    kernel = np.zeros(length, dtype=complex)
+    kernel[:m] = np.conj(chirp[:m])
+    kernel[length - n + 1 :] = np.conj(chirp[1:])[::-1]
+    X = sp_fft.ifft(
+        sp_fft.fft(b * chirp, length, axis=-1, workers=workers) * sp_fft.fft(kernel),
+        axis=-1,
+        workers=workers,
+    )
+    return X[..., :m] * chirp[:m]
+
+
+def amp_phi(X_half: np.ndarray, N: int) -> tuple[np.ndarray, np.ndarray]:
+    """Calculates the amplitude and phase of all N bins from the non-redundant half
+    of the spectrum. Only real arrays are mirrored, the complete complex spectrum is
+    never created.
+
+    Args:
+        X_half (np.ndarray): bins 0 to N//2
+        N (int): number of samples
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: amplitude and phase
+    """
+    amp_half = np.abs(X_half)
+    phi_half = np.arctan2(X_half.imag, X_half.real)
+    amp = np.concatenate([amp_half[..., : N // 2 + 1], amp_half[..., 1 : (N + 1) // 2][..., ::-1]], axis=-1)
+    phi = np.concatenate([phi_half[..., : N // 2 + 1], -phi_half[..., 1 : (N + 1) // 2][..., ::-1]], axis=-1)
+    return amp, phi
+
+
+#!################
+#! Zoom refinement
+#!################
+def zoom_dft(
+    b_sampled: np.ndarray, freq: float, dominant_index: np.ndarray, points: int = 64, N: int = 0
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, str]:
+    """Refines the dominant frequencies below the DFT resolution (freq/N). For each
+    dominant index k, the band between bins k-1 and k+1 is evaluated with a chirp-Z
+    transform on 2*points+1 frequencies, and the frequency with the highest amplitude
+    is kept. This costs O((N+points)log(N+points)) per dominant frequency instead of a
+    larger DFT.
+
+    Args:
+        b_sampled (np.ndarray): sampled bandwidth
+        freq (float): sampling frequency
+        dominant_index (np.ndarray): indices of the dominant frequencies
+        points (int, optional): evaluated frequencies per bin. Defaults to 64.
+        N (int, optional): number of bins of the spectrum the indices refer to. Defaults
+            to 0 (the length of b_sampled).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, str]: refined frequencies, amplitudes,
+        phases, and text
+    """
+    from scipy.signal import zoom_fft
+
+    N = N if N > 0 else len(b_sampled)
+    # the DC offset leaks into the band between the bins and biases the peak
+    b_sampled = b_sampled - np.mean(b_sampled)
+    dominant_freq = np.zeros(len(dominant_index))
+    amp = np.zeros(len(dominant_index))
+    phi = np.zeros(len(dominant_index))
+    text = ""
+    for i, k in enumerate(dominant_index):
+        band = [(k - 1) * freq / N, (k + 1) * freq / N]
+        X = zoom_fft(b_sampled, band, m=2 * points + 1, fs=freq, endpoint=True)
+        best = np.argmax(np.abs(X))
+        dominant_freq[i] = band[0] + best * (band[1] - band[0]) / (2 * points)
+        amp[i] = np.abs(X[best])
+        phi[i] = np.arctan2(X[best].imag, X[best].real)
+        text += (
+            f"Refined [cyan]{k * freq / N:.3e}[/] Hz to [cyan]{dominant_freq[i]:.3e}[/] Hz "
+            f"(period: {1 / dominant_freq[i]:.4f} s)\n"
+        )
+
+    return dominant_freq, amp, phi, text
+
 
 #!################
 #! DFT Precision
@@ -66,6 +296,7 @@ def precision_dft(
     showplot = False
     text = ""
     if showplot and ("mat" in plt_engine or "plotly" in plt_engine):
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(10, 5))
     dc_offset = np.zeros(len(amp))
     for index in dominant_index:
@@ -115,11 +346,21 @@ def prepare_plot_dfs(
     ranks,
     bandwidth,
 ) -> tuple[list, list, list, list]:
+    import pandas as pd
+
     df0 = []
     df1 = []
     df2 = []
     df3 = []
     N = len(b_sampled)
+    if len(amp) < N:
+        # the spectrum has fewer bins than the signal has samples (welch: the bins
+        # refer to the segment length). The remaining bins are empty
+        pad = N - len(amp)
+        amp = np.concatenate([amp, np.zeros(pad)])
+        phi = np.concatenate([phi, np.zeros(pad)])
+        conf = np.concatenate([conf, np.zeros(pad)])
+        freq_arr = np.concatenate([freq_arr, np.full(pad, np.nan)])
 
     df3.append(
         pd.DataFrame(
@@ -0,0 +1,154 @@
+"""Lomb-Scargle periodogram for the event-based bandwidth. The spectrum is
+calculated directly from the change points without sampling the signal. The
+trigonometric sums are evaluated with the extirpolation method of Press & Rybicki
+(1989), which costs O(n + M log M) for n change points and M frequencies.
+"""
+
+from __future__ import annotations
+from math import factorial
+import numpy as np
+
+
+def lomb_scargle(
+    b: np.ndarray, t: np.ndarray, freq: float, N: int, fast: bool = True, oversampling: int = 5
+) -> np.ndarray:
+    """Fits a sinusoid at each of the frequencies k*freq/N (k = 0 to N//2) to the
+    step-shaped bandwidth. Each segment between two change points is represented by
+    its midpoint and weighted by its duration. The fit is returned as the DFT of the
+    sampled signal would contain it (|X_k| = N/2 * amplitude, angle(X_k) = phase with
+    respect to t[0]), so it can be used exactly like the result of np.fft.rfft.
+
+    Args:
+        b (np.ndarray): bandwidth
+        t (np.ndarray): time stamps where the bandwidth changes
+        freq (float): sampling frequency (defines the frequency bins)
+        N (int): number of frequency bins
+        fast (bool, optional): use the extirpolation instead of the direct sums. Defaults to True.
+        oversampling (int, optional): oversampling of the extirpolation grid. Defaults to 5.
+
+    Returns:
+        np.ndarray: bins 0 to N//2 (as returned by np.fft.rfft)
+    """
+    n_half = N // 2 + 1
+    X = np.zeros(n_half, dtype=complex)
+    if N == 0 or len(t) == 0:
+        return X
+
+    # segments inside the window covered by the N bins
+    tau = np.clip(np.append(t, t[0] + N / freq), t[0], t[0] + N / freq) - t[0]
+    w = np.diff(tau)
+    keep = w > 0
+    y = np.asarray(b, dtype=float)[: len(t)][keep]
+    t_mid = (tau[:-1] + w / 2)[keep]
+    w = w[keep] / np.sum(w[keep])
+    mean = np.dot(w, y)
+    X[0] = N * mean
+    if n_half < 2:
+        return X
+
+    # amplitude and phase of the least squares fit at each frequency
+    df = freq / N
+    y = y - mean
+    Sh, Ch = trig_sum(t_mid, w * y, df, df, n_half - 1, 1, fast, oversampling)
+    S2, C2 = trig_sum(t_mid, w, df, df, n_half - 1, 2, fast, oversampling)
+    norm = np.hypot(C2, S2)
+    norm[norm == 0] = 1
+    C2w, S2w = C2 / norm, S2 / norm
+    Cw = np.sqrt(0.5 * (1 + C2w))
+    Sw = np.sign(S2w) * np.sqrt(np.maximum(0.5 * (1 - C2w), 0))
+
+    YC = Ch * Cw + Sh * Sw
+    YS = Sh * Cw - Ch * Sw
+    CC = 0.5 * (1 + C2 * C2w + S2 * S2w)
+    SS = 0.5 * (1 - C2 * C2w - S2 * S2w)
+    A = np.divide(YC, CC, out=np.zeros_like(YC), where=CC > 0)
+    B = np.divide(YS, SS, out=np.zeros_like(YS), where=SS > 0)
+    phi = -np.arctan2(Sw, Cw) - np.arctan2(B, A)
+    X[1:] = N / 2 * np.hypot(A, B) * np.exp(1j * phi)
+
+    return X
+
+
+def trig_sum(
+    t: np.ndarray,
+    h: np.ndarray,
+    f0: float,
+    df: float,
+    M: int,
+    freq_factor: int = 1,
+    fast: bool = True,
+    oversampling: int = 5,
+    Mfft: int = 4,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Calculates S_j = sum h*sin(2*pi*f_j*t) and C_j = sum h*cos(2*pi*f_j*t) for
+    the frequencies f_j = freq_factor*(f0 + j*df), j = 0 to M-1.
+
+    Args:
+        t (np.ndarray): time stamps
+        h (np.ndarray): weights of the time stamps
+        f0 (float): first frequency
+        df (float): frequency step
+        M (int): number of frequencies
+        freq_factor (int, optional): multiplies all frequencies. Defaults to 1.
+        fast (bool, optional): extirpolate the weights to a regular grid and use an FFT.
+            Otherwise, the sums are calculated directly in O(n*M). Defaults to True.
+        oversampling (int, optional): oversampling of the FFT grid. Defaults to 5.
+        Mfft (int, optional): number of grid points each weight is extirpolated to. Defaults to 4.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: S and C
+    """
+    f0 *= freq_factor
+    df *= freq_factor
+    if not fast:
+        S, C = np.zeros(M), np.zeros(M)
+        step = max(1, 2**22 // max(1, len(t)))
+        for start in range(0, M, step):
+            f = f0 + df * np.arange(start, min(start + step, M))
+            arg = 2 * np.pi * np.outer(f, t)
+            S[start : start + len(f)] = np.sin(arg) @ h
+            C[start : start + len(f)] = np.cos(arg) @ h
+        return S, C
+
+    n_fft = 1 << int(np.ceil(np.log2(max(M * oversampling, Mfft))))
+    t_0 = t.min()
+    h = h * np.exp(2j * np.pi * f0 * (t - t_0))
+    t_norm = ((t - t_0) * n_fft * df) % n_fft
+    grid = np.fft.ifft(extirpolate(t_norm, h, n_fft, Mfft))[:M]
+    if t_0 != 0:
+        grid *= np.exp(2j * np.pi * t_0 * (f0 + df * np.arange(M)))
+
+    return n_fft * grid.imag, n_fft * grid.real
+
+
+def extirpolate(x: np.ndarray, y: np.ndarray, N: int, M: int = 4) -> np.ndarray:
+    """Extirpolates the values y at the (non-integer) positions x to a regular grid
+    of N points, such that sum(y*f(x)) ~= sum(result*f(arange(N))) for smooth f.
+    Each value is spread to its M nearest grid points using Lagrange polynomials.
+
+    Args:
+        x (np.ndarray): positions in [0, N)
+        y (np.ndarray): values
+        N (int): number of grid points
+        M (int, optional): number of grid points each value is spread to. Defaults to 4.
+
+    Returns:
+        np.ndarray: values on the grid
+    """
+    result = np.zeros(N, dtype=y.dtype)
+
+    # values on the grid points are added directly
+    integers = x % 1 == 0
+    np.add.at(result, x[integers].astype(int), y[integers])
+    x, y = x[~integers], y[~integers]
+
+    ilo = np.clip((x - M // 2).astype(int), 0, N - M)
+    numerator = y * np.prod(x - ilo - np.arange(M)[:, np.newaxis], 0)
+    denominator = factorial(M - 1)
+    for j in range(M):
+        if j > 0:
+            denominator *= j / (j - M)
+        ind = ilo + (M - 1 - j)
+        np.add.at(result, ind, numerator / (denominator * (x - ind)))
+
+    return result
@@ -0,0 +1,141 @@
+"""Sliding DFT: keeps the spectrum of a fixed-length window and updates it
+as new samples are appended and old ones leave the window. Used by the
+predictor to avoid recalculating the DFT on the entire window on every
+prediction.
+"""
+
+from __future__ import annotations
+import numpy as np
+from ftio.freq.discretize import sample_data, sampling_grid, zero_order_hold
+
+
+class SlidingDFT:
+    """Stores the non-redundant DFT bins of a window with N samples.
+
+    Sliding the window by M samples costs O(N/2 * M). To bound the
+    accumulated floating point error, the bins are recalculated from the
+    samples once as many samples as the window holds have been slid in.
+    """
+
+    def __init__(self, b_sampled: np.ndarray, freq: float, t_0: float, ts: float = 0):
+        """init function
+
+        Args:
+            b_sampled (np.ndarray): samples of the window
+            freq (float): sampling frequency
+            t_0 (float): time of the first sample in the window
+            ts (float, optional): requested start time that established the window. Defaults to 0.
+        """
+        self.freq = freq
+        self.t_0 = t_0
+        self.ts = ts
+        self.window = np.array(b_sampled, dtype=float)
+        self.head = 0
+        self.updates = 0
+        self.X = np.fft.rfft(self.window)
+
+    @property
+    def n(self) -> int:
+        return len(self.window)
+
+    @property
+    def t_next(self) -> float:
+        """time of the next sample that enters the window"""
+        return self.t_0 + self.n / self.freq
+
+    def samples(self) -> np.ndarray:
+        """samples of the window in chronological order"""
+        return np.roll(self.window, -self.head)
+
+    def rebuild(self) -> None:
+        """recalculates the bins from the samples"""
+        self.window = self.samples()
+        self.head = 0
+        self.updates = 0
+        self.X = np.fft.rfft(self.window)
+
+    def slide(self, b_new: np.ndarray, chunk: int = 2**22) -> None:
+        """Slides the window by len(b_new) samples. Uses
+        X'[k] = exp(2j*pi*k*M/N) * (X[k] + sum_m (new_m - old_m) * exp(-2j*pi*k*m/N))
+
+        Args:
+            b_new (np.ndarray): new samples
+            chunk (int, optional): max. elements of the intermediate matrix. Defaults to 2**22.
+        """
+        n = self.n
+        m = len(b_new)
+        if m == 0 or n == 0:
+            return
+        self.t_0 += m / self.freq
+        if m >= n:
+            self.window = np.array(b_new[-n:], dtype=float)
+            self.head = 0
+            self.rebuild()
+            return
+
+        positions = (self.head + np.arange(m)) % n
+        delta = b_new - self.window[positions]
+        k = np.arange(len(self.X))
+        step = max(1, chunk // len(k))
+        acc = self.X.copy()
+        for start in range(0, m, step):
+            j = np.arange(start, min(start + step, m))
+            acc += np.exp(-2j * np.pi * np.outer(k, j) / n) @ delta[j]
+        self.X = np.exp(2j * np.pi * k * m / n) * acc
+
+        self.window[positions] = b_new
+        self.head = (self.head + m) % n
+        self.updates += m
+        if self.updates >= n:
+            self.rebuild()
+
+    def spectrum(self) -> np.ndarray:
+        """non-redundant half of the spectrum (bins 0 to N//2) as returned by np.fft.rfft"""
+        return self.X.copy()
+
+
+def sliding_dft(
+    state: dict, bandwidth: np.ndarray, time_b: np.ndarray, freq: float, ts: float = 0
+) -> tuple[np.ndarray, np.ndarray, float, float, str]:
+    """Calculates the spectrum of the window using the sliding DFT stored in `state`.
+    If the requested start time (ts) or the sampling frequency changed, the window is
+    established again from the data. Otherwise, the samples after the last window are
+    slid in while the window keeps its length. Note that this differs from the DFT
+    without sliding, which analyzes the growing window from ts to the last sample.
+
+    Args:
+        state (dict): state that persists between predictions. The state is kept in the
+            process (see ftio.prediction.analysis.get_state), so only the new samples are
+            processed on each call
+        bandwidth (np.ndarray): bandwidth
+        time_b (np.ndarray): time
+        freq (float): sampling frequency (-1 or -2 for the automatic modes of sample_data)
+        ts (float, optional): requested start time. Defaults to 0.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, float, float, str]: non-redundant half of the spectrum,
+        samples of the window, sampling frequency, start time of the window, and text
+    """
+    sdft = state.get("sliding_dft", None)
+    if (
+        sdft is None
+        or sdft.ts != ts
+        or (freq > 0 and sdft.freq != freq)
+        or sdft.t_next > time_b[-1]
+    ):
+        b_sampled, freq, text = sample_data(bandwidth, time_b, freq)
+        sdft = SlidingDFT(b_sampled, freq, time_b[0], ts)
+        text += "\nSliding DFT: window established"
+    else:
+        m = int(np.floor((time_b[-1] - sdft.t_next) * sdft.freq))
+        b_new = zero_order_hold(bandwidth, time_b, sampling_grid(sdft.t_next, sdft.freq, m))
+        sdft.slide(b_new)
+        text = (
+            f"Time window: {sdft.n/sdft.freq:.2f} s\n"
+            f"Sampling frequency:  {sdft.freq:.3e} Hz\n"
+            f"Samples: {sdft.n}\n"
+            f"Sliding DFT: {m} new samples (fixed window length)"
+        )
+    state["sliding_dft"] = sdft
+
+    return sdft.spectrum(), sdft.samples(), sdft.freq, sdft.t_0, text
@@ -0,0 +1,81 @@
+"""Welch method: averages the spectra of overlapping segments of the signal. The
+segments are sampled and transformed in batches, so the memory is bounded by the
+segment length instead of the length of the entire signal.
+"""
+
+from __future__ import annotations
+import numpy as np
+from ftio.freq.discretize import zero_order_hold
+from ftio.freq._dft import real_dft
+
+
+def welch(
+    b: np.ndarray,
+    t: np.ndarray,
+    freq: float,
+    N: int,
+    segment: float = 0,
+    overlap: float = 0.5,
+    window: str = "hann",
+    backend: str = "rfft",
+    workers: int = -1,
+    chunk: int = 2**22,
+) -> tuple[np.ndarray, int, str]:
+    """Calculates the averaged spectrum of the step-shaped bandwidth. Each segment is
+    sampled, its mean is removed, and it is multiplied with the window before the FFT.
+    The averaged power is returned as the amplitude the DFT of a segment would have
+    (zero phase), so it can be used exactly like the result of np.fft.rfft with
+    the segment length as N.
+
+    Args:
+        b (np.ndarray): bandwidth
+        t (np.ndarray): time stamps where the bandwidth changes
+        freq (float): sampling frequency
+        N (int): number of samples of the entire signal
+        segment (float, optional): segment length in seconds. Defaults to 0 (a quarter of the signal).
+        overlap (float, optional): overlap of consecutive segments in [0, 1). Defaults to 0.5.
+        window (str, optional): window applied to each segment. Defaults to "hann".
+        backend (str, optional): FFT backend (see real_dft). Defaults to "rfft".
+        workers (int, optional): workers for the scipy backend. Defaults to -1.
+        chunk (int, optional): max. samples transformed at once. Defaults to 2**22.
+
+    Returns:
+        tuple[np.ndarray, int, str]: bins 0 to L//2, the segment length L in samples, and text
+
+    Raises:
+        ValueError: if the signal has no samples (N < 1)
+    """
+    from scipy.signal import get_window
+
+    if N < 1:
+        raise ValueError(
+            f"Welch needs at least one sample, but the time window has N = {N} samples. "
+            "Increase the sampling frequency (-f) or the time window"
+        )
+    L = int(segment * freq) if segment > 0 else N // 4
+    L = min(max(L, 1), N)
+    step = max(1, L - int(overlap * L))
+    starts = np.arange(0, N - L + 1, step)
+    w = get_window(window, L) if L > 1 else np.ones(1)
+
+    psd = np.zeros(L // 2 + 1)
+    mean = 0.0
+    rows = max(1, chunk // L)
+    for i in range(0, len(starts), rows):
+        grid = t[0] + (starts[i : i + rows, np.newaxis] + np.arange(L)) / freq
+        samples = zero_order_hold(b, t, grid)
+        segment_mean = samples.mean(axis=1, keepdims=True)
+        mean += segment_mean.sum()
+        X, _ = real_dft((samples - segment_mean) * w, backend, workers)
+        psd += np.sum(X.real**2 + X.imag**2, axis=0)
+
+    X = np.sqrt(psd / len(starts)) * L / np.sum(w)
+    X = X.astype(complex)
+    X[0] = L * mean / len(starts)
+    text = (
+        f"Welch: {len(starts)} segments of {L} samples ({L / freq:.2f} s) "
+        f"with {100 * (1 - step / L):.0f}% overlap\n"
+        f"Frequency step: {freq / L:.3e} Hz"
+    )
+
+    return X, L, text
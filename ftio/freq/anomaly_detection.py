@@ -3,21 +3,11 @@
 Outlier detection methods
 ------------------------------
 """
-# DB-scan
+# sklearn, scipy.signal, and the plot modules are imported inside the
+# methods that need them, as loading them dominates the startup time
 from __future__ import annotations
-from sklearn.cluster import DBSCAN
-from sklearn.neighbors import NearestNeighbors
-from kneed import KneeLocator
 from rich.panel import Panel
-# Isolation forest
-from sklearn.ensemble import IsolationForest
-# Lof
-from sklearn.neighbors import LocalOutlierFactor
-# find_peaks
-from scipy.signal import find_peaks
-# all
 import numpy as np
-from ftio.plot.anomaly_plot import  plot_outliers, plot_decision_boundaries
 
 
 def outlier_detection(amp:np.ndarray, freq_arr:np.ndarray, args) -> tuple[list[float], np.ndarray, Panel]:
@@ -51,6 +41,9 @@ def outlier_detection(amp:np.ndarray, freq_arr:np.ndarray, args) -> tuple[list[f
     elif methode.lower() in ["find peaks", "peaks", "peak"]:
         dominant_index, conf, text = peaks(amp, freq_arr, args)
         title = "Find Peaks"
+    elif methode.lower() in ["ensemble"]:
+        dominant_index, conf, text = ensemble(amp, freq_arr, args)
+        title = "Ensemble"
     else:
         dominant_index, conf = [],np.array([])
         raise NotImplementedError("Unsupported method selected")
@@ -65,84 +58,178 @@ def outlier_detection(amp:np.ndarray, freq_arr:np.ndarray, args) -> tuple[list[f
     return dominant_index, conf, text
 
 
+def outlier_detection_batch(amp: np.ndarray, freq_arr: np.ndarray, args) -> list[tuple[list[float], np.ndarray, Panel]]:
+    """Find the outliers in several spectra with the same frequency array. Z-score
+    is vectorized across the spectra, the remaining methods are executed per spectrum.
+
+    Args:
+        amp (np.ndarray): 2D array of amplitudes (one spectrum per row)
+        freq_arr (np.ndarray): frequency array
+        args (object): arguments (see outlier_detection)
+
+    Returns:
+        list[tuple[list[float], np.ndarray, Panel]]: result of outlier_detection for each row
+    """
+    if args.outlier.lower() in ["z-score", "zscore"]:
+        return [
+            (dominant_index, conf, Panel.fit(text[:-1], style="white", border_style='green', title="Z-score", title_align='left'))
+            for dominant_index, conf, text in z_score_batch(amp, freq_arr, args)
+        ]
+
+    return [outlier_detection(row, freq_arr, args) for row in amp]
+
+
+def spectrum_features(amp: np.ndarray, freq_arr: np.ndarray, args, matrix: bool = True) -> dict:
+    """Features shared by the outlier detection methods: the spectrum (amplitude or
+    power), the bins 1 to N/2, their doubled amplitudes, and the normalized
+    (frequency, amplitude) matrix
+
+    Args:
+        amp (np.ndarray): amplitude (or 2D array with one spectrum per row if matrix is not set)
+        freq_arr (np.ndarray): frequencies
+        args (argsparse): arguments
+        matrix (bool, optional): also calculate the matrix. Defaults to True.
+
+    Returns:
+        dict: amp, text, indices, amp_tmp, and d (if matrix is set)
+    """
+    text = "[green]Spectrum[/]: Amplitude spectrum\n"
+    if args.psd:
+        amp = amp*amp/amp.shape[-1]
+        text = "[green]Spectrum[/]: Power spectrum\n"
+
+    indices = np.arange(1, int(amp.shape[-1] / 2) + 1)
+    amp_tmp = np.array(2 * amp[..., indices])
+    features = {"amp": amp, "text": text, "indices": indices, "amp_tmp": amp_tmp}
+    if matrix:
+        freq_arr_tmp = np.array(freq_arr[indices])
+        # norm the data
+        # d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.max())).T
+        #! norm over sum for amplitude with power spectrum 
+        features["d"] = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.sum())).T
+    return features
+
+
 # ?#################################
 # ? Z-score
 # ?#################################
 def z_score(
-    amp: np.ndarray, freq_arr: np.ndarray, args
+    amp: np.ndarray, freq_arr: np.ndarray, args, features: dict = None
 ) -> tuple[list[float], np.ndarray, str]:
-    """calculates the outliers using zscore
+    """calculates the outliers using zscore (see z_score_batch)
 
     Args:
         amp (np.ndarray): amplitude or psd
         freq_arr (np.ndarray): frequencies
         args (argsparse): arguments
+        features (dict, optional): result of spectrum_features. Defaults to None (computed).
 
     Returns:
         tuple[list[float], np.ndarray, str]: [dominant frequency/ies, confidence, text]
     """
-    text = "[green]Spectrum[/]: Amplitude spectrum\n"
-    if args.psd:
-        amp = amp*amp/len(amp)
-        text = "[green]Spectrum[/]: Power spectrum\n"
+    features = features if features is not None else spectrum_features(amp, freq_arr, args, matrix=False)
+    rows = {**features, "amp": features["amp"][np.newaxis], "amp_tmp": features["amp_tmp"][np.newaxis]}
+    return z_score_batch(None, freq_arr, args, rows)[0]
 
-    indices = np.arange(1, int(len(amp) / 2) + 1)
-    amp_tmp = np.array(2 * amp[indices])
-    # norm the data
-    amp_tmp = amp_tmp/ amp_tmp.sum() if amp_tmp.sum() > 0 else amp_tmp
-    
+
+def z_score_batch(
+    amp: np.ndarray, freq_arr: np.ndarray, args, features: dict = None
+) -> list[tuple[list[float], np.ndarray, str]]:
+    """calculates the outliers using zscore for several spectra at once (one per row).
+    The statistics are vectorized across rows, only the harmonic removal is done per row.
+
+    Args:
+        amp (np.ndarray): 2D array of amplitudes or psds
+        freq_arr (np.ndarray): frequencies
+        args (argsparse): arguments
+        features (dict, optional): result of spectrum_features for the rows. Defaults
+            to None (computed).
+
+    Returns:
+        list[tuple[list[float], np.ndarray, str]]: [dominant frequency/ies, confidence, text] for each row
+    """
+    features = features if features is not None else spectrum_features(amp, freq_arr, args, matrix=False)
+    amp, header, indices = features["amp"], features["text"], features["indices"]
     tol = args.tol
-    dominant_index = []
-    mean = np.mean(amp_tmp)
-    std = np.std(amp_tmp)
-    z_k = abs(amp_tmp - mean) / std if std > 0 else np.zeros(len(amp_tmp))
-    conf = np.zeros(len(z_k))
-    # find outliers
-    index = np.where((z_k/np.max(z_k) > tol) & (z_k > 3)) if np.max(z_k) > 0 else  (np.array([], dtype=np.int64),)
-    text += f"[green]mean[/]: {mean/np.sum(amp_tmp) if np.sum(amp_tmp) else 0:.3e}\n[green]std[/]: {std:.3e}\n"
-    text += f"Frequencies with Z-score > 3 -> [green]{len(z_k[z_k>3])}[/] candidates\n"
-    text += f"         + Z > Z_max*{tol*100}% > 3 -> [green]{len(index[0])}[/] candidates\n"
-    # text += f"         + Z > Z_max*{tol*100}% > 3 -> [green]{len(z_k[(z_k>np.max(z_k)*tol) & (z_k>3)])}[/] candidates\n"
-    index, removed_index, msg = remove_harmonics(freq_arr, amp_tmp,  indices[index[0]])
-    text+= msg
-    
-    if len(index) == 0:
-        text += "[red]No dominant frequency -> Signal might be not periodic[/]\n"
-    else:
-        removed_index = [i-1 for i in removed_index] #tmp starts at 1
-        # conf[index] = (z_k[index]/max_z  + z_k[index]/np.sum(z_k[index]) + 1/np.sum(z_k > 3))/3
-        # calculate the confidence:
-        # 1) check z_k/max_zk > tol
-        tmp = z_k/np.max(z_k) > tol
-        tmp[removed_index] = False
-        conf[tmp] += z_k[tmp]/np.sum(z_k[tmp])
-        
-        # 2) check z_k > 0
-        tmp = z_k > 3
-        tmp[removed_index] = False
-        conf[tmp] += z_k[tmp]/np.sum(z_k[tmp])
-        conf = conf/2
-        conf = np.array(conf)
-        
-
-        # get dominant index
-        dominant_index, msg = dominant(index, freq_arr, conf)
-        text+= msg
-        
-    if "plotly" in args.engine:
-        i = np.repeat(1, len(indices))
-        if len(dominant_index) != 0:
-            i[np.array(dominant_index) - 1] = -1
-        plot_outliers(args,freq_arr, amp, indices, conf, i)
+    amp_tmp, mean, std, z_k, above_tol, above_3 = z_scores(features["amp_tmp"], tol)
+    candidates = above_tol & above_3
+    has_index = np.zeros(len(amp), dtype=bool)
 
-    return dominant_index, conf, text
+    # harmonics are removed per row
+    out = []
+    for row in range(len(amp)):
+        sum_row = np.sum(amp_tmp[row])
+        text = header
+        text += f"[green]mean[/]: {mean[row, 0]/sum_row if sum_row else 0:.3e}\n[green]std[/]: {std[row, 0]:.3e}\n"
+        text += f"Frequencies with Z-score > 3 -> [green]{np.sum(above_3[row])}[/] candidates\n"
+        text += f"         + Z > Z_max*{tol*100}% > 3 -> [green]{np.sum(candidates[row])}[/] candidates\n"
+        index, removed_index, msg = remove_harmonics(freq_arr, amp_tmp[row], indices[candidates[row]], args.verbose)
+        text += msg
+        if len(index) == 0:
+            text += "[red]No dominant frequency -> Signal might be not periodic[/]\n"
+        else:
+            has_index[row] = True
+            removed_index = [i-1 for i in removed_index] #tmp starts at 1
+            above_tol[row, removed_index] = False
+            above_3[row, removed_index] = False
+        out.append([index, text])
+
+    # calculate the confidence: (1) z_k/max_zk > tol and (2) z_k > 3
+    conf = np.zeros_like(z_k)
+    for mask in [above_tol, above_3]:
+        tmp = np.where(mask, z_k, 0)
+        total = tmp.sum(axis=1, keepdims=True)
+        conf += np.divide(tmp, total, out=np.zeros_like(tmp), where=total > 0)
+    conf = conf/2
+    conf[~has_index] = 0
+
+    result = []
+    for row, (index, text) in enumerate(out):
+        dominant_index = []
+        if has_index[row]:
+            dominant_index, msg = dominant(index, freq_arr, conf[row], args.verbose)
+            text += msg
+        if "plotly" in args.engine:
+            i = np.repeat(1, len(indices))
+            if len(dominant_index) != 0:
+                i[np.array(dominant_index) - 1] = -1
+            from ftio.plot.anomaly_plot import plot_outliers
+            plot_outliers(args, freq_arr, amp[row], indices, conf[row], i)
+        result.append((dominant_index, conf[row], text))
+
+    return result
+
+
+def z_scores(amp_tmp: np.ndarray, tol: float) -> tuple[np.ndarray, ...]:
+    """Z-scores of the spectra (one per row), each normalized over its sum
+
+    Args:
+        amp_tmp (np.ndarray): doubled amplitudes of the bins 1 to N/2 (2D)
+        tol (float): tolerance relative to the highest Z-score
+
+    Returns:
+        tuple[np.ndarray, ...]: normalized amplitudes, mean, std, Z-scores, and the masks
+            Z > Z_max*tol and Z > 3
+    """
+    # norm the data
+    amp_tmp = amp_tmp.astype(float)
+    total = amp_tmp.sum(axis=1, keepdims=True)
+    amp_tmp = np.divide(amp_tmp, total, out=amp_tmp, where=total > 0)
+
+    mean = np.mean(amp_tmp, axis=1, keepdims=True)
+    std = np.std(amp_tmp, axis=1, keepdims=True)
+    z_k = np.divide(np.abs(amp_tmp - mean), std, out=np.zeros_like(amp_tmp), where=std > 0)
+    z_max = np.max(z_k, axis=1, keepdims=True)
+    above_tol = np.divide(z_k, z_max, out=np.zeros_like(z_k), where=z_max > 0) > tol
+    above_3 = z_k > 3
+    return amp_tmp, mean, std, z_k, above_tol, above_3
 
 
 # ?#################################
 # ? DB-Scan
 # ?#################################
 def db_scan(
-    amp: np.ndarray, freq_arr: np.ndarray, args
+    amp: np.ndarray, freq_arr: np.ndarray, args, features: dict = None
 ) -> tuple[list[float], np.ndarray, str]:
     """calculates the outliers using dbscan
 
@@ -150,24 +237,41 @@ def db_scan(
         amp (np.ndarray): amplitude or psd
         freq_arr (np.ndarray): frequencies
         args (argsparse): arguments
+        features (dict, optional): result of spectrum_features. Defaults to None (computed).
 
     Returns:
         tuple[list[float], np.ndarray, str]: [dominant frequency/ies, confidence]
     """
-    text = "[green]Spectrum[/]: Amplitude spectrum\n" 
-    if args.psd:
-        amp = amp*amp/len(amp)
-        text = "[green]Spectrum[/]: Power spectrum\n"
-        
-    indecies = np.arange(1, int(len(amp) / 2) + 1)
-    amp_tmp = np.array(2 * amp[indecies])
-    freq_arr_tmp = np.array(freq_arr[indecies])
-    min_pts = 2
+    features = features if features is not None else spectrum_features(amp, freq_arr, args)
+    amp, text, indecies, amp_tmp, d = [features[k] for k in ["amp", "text", "indices", "amp_tmp", "d"]]
+    dominant_index, conf, eps, eps_text = db_scan_labels(features, args)
+    text += eps_text
 
-    # norm the data
-    # d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.max())).T
-    #! norm over sum for amplitude with power spectrum 
-    d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.sum())).T
+    if "plotly" in args.engine:
+        from ftio.plot.anomaly_plot import plot_outliers
+        plot_outliers(args, freq_arr, amp, indecies, conf, dominant_index, d, eps)
+
+    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1], args.verbose)
+    dominant_index,text_d = dominant(clean_index, freq_arr, conf, args.verbose)
+    
+    return dominant_index, conf,  text+msg+text_d
+
+
+def db_scan_labels(features: dict, args) -> tuple[np.ndarray, np.ndarray, float, str]:
+    """Labels the bins with dbscan (-1 for the outliers)
+
+    Args:
+        features (dict): result of spectrum_features
+        args (argsparse): arguments
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, float, str]: labels, confidence, eps, and text
+    """
+    from ftio.freq._dbscan import dbscan
+
+    d = features["d"]
+    text = ""
+    min_pts = 2
 
     eps_mode = "range"
     if eps_mode == "avr":
@@ -187,52 +291,22 @@ def db_scan(
             pow((d[:, 1].max() - d[:, 1].min())*(1-args.tol), 2) + pow(d[1, 0] - d[0, 0], 2)
         )
         conf = d[:, 1] / d[:, 1].max()
-    else:  # find distance using knee method
-        text += "Calculating eps using knee method\n"
-        observation = int(len(amp) / 5)
-        nbrs = NearestNeighbors(n_neighbors=observation).fit(d)
-        # Find the k-neighbors of a point
-        neigh_dist, _ = nbrs.kneighbors(d)
-        # sort the neighbor distances (lengths to points) in ascending order
-        sort_neigh_dist = np.sort(neigh_dist, axis=0)
-        k_dist = sort_neigh_dist[:, observation - 1]  # sort_neigh_dist[:, 4]
-        # plt.plot(k_dist)
-        # plt.ylabel("k-NN distance")
-        # plt.xlabel("Sorted observations (%ith NN)"%observation)
-        # plt.show()
-        kneedle = KneeLocator(
-            x=range(1, len(neigh_dist) + 1),
-            y=k_dist,
-            S=1.0,
-            curve="concave",
-            direction="increasing",
-            online=True,
-        )
-        eps = kneedle.knee_y
-        conf = k_dist
 
     text += f"eps = [green]{eps:.4f}[/]    Minpoints = [green]{min_pts}[/]\n"
-    model = DBSCAN(eps=eps, min_samples=min_pts)
-    model.fit(d)
-    dominant_index = model.labels_
+    # same labels as sklearn's DBSCAN(eps=eps, min_samples=min_pts), in O(n log n)
+    dominant_index = dbscan(d, eps)
     #normalize like the remaing methods
     dominant_index[dominant_index==-1] = dominant_index[dominant_index==-1] - 1 
-    dominant_index =  dominant_index + 1 
-
-    if "plotly" in args.engine:
-        plot_outliers(args, freq_arr, amp, indecies, conf, dominant_index, d, eps)
+    dominant_index =  dominant_index + 1
 
-    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1])
-    dominant_index,text_d = dominant(clean_index, freq_arr, conf)
-    
-    return dominant_index, conf,  text+msg+text_d
+    return dominant_index, conf, eps, text
 
 
 # ?#################################
 # ? Isolation Forest
 # ?#################################
 def isolation_forest(
-    amp: np.ndarray, freq_arr: np.ndarray, args
+    amp: np.ndarray, freq_arr: np.ndarray, args, features: dict = None
 ) -> tuple[list[float], np.ndarray, str]:
     """calculates the outliers using isolation forest
 
@@ -240,115 +314,125 @@ def isolation_forest(
         amp (np.ndarray): amplitude or psd
         freq_arr (np.ndarray): frequencies
         args (argsparse): arguments
+        features (dict, optional): result of spectrum_features. Defaults to None (computed).
 
     Returns:
         tuple[list[float], np.ndarray, str]: [dominant frequency/ies, confidence]
     """
-    text = "[green]Spectrum[/]: Amplitude spectrum\n" 
-    if args.psd:
-        amp = amp*amp/len(amp)
-        text = "[green]Spectrum[/]: Power spectrum\n"
+    features = features if features is not None else spectrum_features(amp, freq_arr, args)
+    amp, text, indecies, amp_tmp, d = [features[k] for k in ["amp", "text", "indices", "amp_tmp", "d"]]
 
-    indecies = np.arange(1, int(len(amp) / 2) + 1)
-    amp_tmp = np.array(2 * amp[indecies])
-    freq_arr_tmp = np.array(freq_arr[indecies])
-    # norm the data
-    # d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.max())).T
-    #! norm over sum for amplitude with power spectrum 
-    d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.sum())).T
-
-    model = IsolationForest(contamination=0.001, warm_start=True)
-    # model = IsolationForest(contamination=float(0.001),warm_start=True, n_estimators=2)
-    # model = IsolationForest(warm_start=True)
-    model.fit(d)
-    conf = model.decision_function(d)
-    dominant_index = model.predict(d)
+    model, conf, dominant_index, cache_text = isolation_forest_labels(freq_arr, features, args)
+    text += cache_text
 
     if "plotly" in args.engine:
+        from ftio.plot.anomaly_plot import plot_outliers, plot_decision_boundaries
         plot_outliers(args, freq_arr, amp, indecies, conf, dominant_index, d)
         plot_decision_boundaries(model,d, conf)
 
-    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1])
-    dominant_index,text_d = dominant(clean_index, freq_arr, conf)
+    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1], args.verbose)
+    dominant_index,text_d = dominant(clean_index, freq_arr, conf, args.verbose)
     
     return dominant_index, abs(conf), text+msg+text_d
 
 
+def isolation_forest_labels(freq_arr: np.ndarray, features: dict, args) -> tuple[object, np.ndarray, np.ndarray, str]:
+    """Labels the bins with an isolation forest (-1 for the outliers)
+
+    Args:
+        freq_arr (np.ndarray): frequencies
+        features (dict): result of spectrum_features
+        args (argsparse): arguments
+
+    Returns:
+        tuple[object, np.ndarray, np.ndarray, str]: model, decision function, labels, and text
+    """
+    from sklearn.ensemble import IsolationForest
+    from ftio.freq.model_cache import fit_model, model_key
+
+    d = features["d"]
+    # model = IsolationForest(contamination=float(0.001),warm_start=True, n_estimators=2)
+    # model = IsolationForest(warm_start=True)
+    model, text = fit_model(
+        model_key("forest", freq_arr), lambda: IsolationForest(contamination=0.001, warm_start=True), d, args
+    )
+    return model, model.decision_function(d), model.predict(d), text
+
+
 # ?#################################
 # ? Odin
 # ?#################################
-def lof(amp: np.ndarray, freq_arr: np.ndarray, args) -> tuple[list[float], np.ndarray, str]:
+def lof(amp: np.ndarray, freq_arr: np.ndarray, args, features: dict = None) -> tuple[list[float], np.ndarray, str]:
     """calculates the outliers using isolation lof
 
     Args:
         amp (np.ndarray): amplitude or psd
         freq_arr (np.ndarray): frequencies
         args (argsparse): arguments
+        features (dict, optional): result of spectrum_features. Defaults to None (computed).
 
     Returns:
         tuple[list[float], np.ndarray, str]: [dominant frequency/ies, confidence]
     """
-    text = "[green]Spectrum[/]: Amplitude spectrum\n" 
-    if args.psd:
-        amp = amp*amp/len(amp)
-        text = "[green]Spectrum[/]: Power spectrum\n"
-
-    indecies = np.arange(1, int(len(amp) / 2) + 1)
-    amp_tmp = np.array(2 * amp[indecies])
-    freq_arr_tmp = np.array(freq_arr[indecies])
+    features = features if features is not None else spectrum_features(amp, freq_arr, args)
+    amp, text, indecies, amp_tmp, d = [features[k] for k in ["amp", "text", "indices", "amp_tmp", "d"]]
 
-    # norm the data
-    # d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.max())).T
-    #! norm over sum for amplitude with power spectrum 
-    d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.sum())).T
-
-    model = LocalOutlierFactor(contamination=0.001, novelty=True)
-    model.fit(d)
-    conf = model.decision_function(d)
-    dominant_index = model.predict(d)
+    conf, dominant_index, cache_text = lof_labels(freq_arr, features, args)
+    text += cache_text
     # conf is between [-1,1]. Scale this to [0,1]
     conf = -1*(conf-1)/2
 
     # plot
     if "plotly" in args.engine:
+        from ftio.plot.anomaly_plot import plot_outliers
         plot_outliers(args, freq_arr, amp, indecies, conf, dominant_index, d)
 
-    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1])
-    dominant_index,text_d = dominant(clean_index, freq_arr, conf)
+    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1], args.verbose)
+    dominant_index,text_d = dominant(clean_index, freq_arr, conf, args.verbose)
     
     return dominant_index, abs(conf), text+msg+text_d
 
 
+def lof_labels(freq_arr: np.ndarray, features: dict, args) -> tuple[np.ndarray, np.ndarray, str]:
+    """Labels the bins with the local outlier factor (-1 for the outliers)
+
+    Args:
+        freq_arr (np.ndarray): frequencies
+        features (dict): result of spectrum_features
+        args (argsparse): arguments
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, str]: decision function, labels, and text
+    """
+    from sklearn.neighbors import LocalOutlierFactor
+    from ftio.freq.model_cache import fit_model, model_key
+
+    d = features["d"]
+    model, text = fit_model(
+        model_key("lof", freq_arr), lambda: LocalOutlierFactor(contamination=0.001, novelty=True), d, args
+    )
+    return model.decision_function(d), model.predict(d), text
+
+
 # ?#################################
 # ? find_peaks
 # ?#################################
-def peaks(amp: np.ndarray, freq_arr: np.ndarray, args) -> tuple[list[float], np.ndarray, str]:
+def peaks(amp: np.ndarray, freq_arr: np.ndarray, args, features: dict = None) -> tuple[list[float], np.ndarray, str]:
     """calculates the outliers using isolation lof
 
     Args:
         amp (np.ndarray): amplitude or psd
         freq_arr (np.ndarray): frequencies
         args (argsparse): arguments
+        features (dict, optional): result of spectrum_features. Defaults to None (computed).
 
     Returns:
         tuple[list[float], np.ndarray, str]: [dominant frequency/ies, confidence]
     """
-    text = "[green]Spectrum[/]: Amplitude spectrum\n" 
-    if args.psd:
-        amp = amp*amp/len(amp)
-        text = "[green]Spectrum[/]: Power spectrum\n"
+    features = features if features is not None else spectrum_features(amp, freq_arr, args)
+    amp, text, indecies, amp_tmp, d = [features[k] for k in ["amp", "text", "indices", "amp_tmp", "d"]]
 
-    indecies = np.arange(1, int(len(amp) / 2) + 1)
-    amp_tmp = np.array(2 * amp[indecies])
-    freq_arr_tmp = np.array(freq_arr[indecies])
-    
-    # norm the data
-    # d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.max())).T
-    #! norm over sum for amplitude with power spectrum 
-    d = np.vstack((freq_arr_tmp / freq_arr_tmp.max(), amp_tmp / amp_tmp.sum())).T
-
-    limit = 1.2*np.mean(d[:,1])
-    found_peaks, _ = find_peaks(d[:,1], height= limit if limit > 0.2 else 0.2)
+    found_peaks = find_peaks_index(d)
     conf = np.zeros(len(d[:,1]))
     conf[found_peaks] = 1
     dominant_index = np.zeros(len(d[:,1]))
@@ -356,16 +440,224 @@ def peaks(amp: np.ndarray, freq_arr: np.ndarray, args) -> tuple[list[float], np.
 
     # plot
     if "plotly" in args.engine:
+        from ftio.plot.anomaly_plot import plot_outliers
         plot_outliers(args, freq_arr, amp, indecies, conf, dominant_index, d)
 
-    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1])
-    dominant_index,text_d = dominant(clean_index, freq_arr, conf)
+    clean_index, _, msg = remove_harmonics(freq_arr, amp_tmp,  indecies[dominant_index == -1], args.verbose)
+    dominant_index,text_d = dominant(clean_index, freq_arr, conf, args.verbose)
     
     return dominant_index, abs(conf), text+msg+text_d
 
 
+def find_peaks_index(d: np.ndarray) -> np.ndarray:
+    """Peaks of the normalized amplitude above max(1.2*mean, 0.2)
+
+    Args:
+        d (np.ndarray): normalized (frequency, amplitude) matrix
+
+    Returns:
+        np.ndarray: index of the peaks in d
+    """
+    from scipy.signal import find_peaks
+
+    limit = 1.2*np.mean(d[:,1])
+    found_peaks, _ = find_peaks(d[:,1], height= limit if limit > 0.2 else 0.2)
+    return found_peaks
+
+
+# tolerance of the harmonic check in Hz: f_a is a harmonic of f_b if f_a % f_b < HARMONIC_TOL
+HARMONIC_TOL = 0.00001
+
+
+# ?#################################
+# ? Ensemble
+# ?#################################
+# name of each method in --ensemble
+ENSEMBLE_METHODS = {
+    "z-score": "z-score", "zscore": "z-score",
+    "dbscan": "db-scan", "db-scan": "db-scan", "db": "db-scan",
+    "isolation_forest": "isolation_forest", "forest": "isolation_forest",
+    "lof": "lof", "local outlier factor": "lof",
+    "peaks": "peaks", "peak": "peaks", "find peaks": "peaks",
+}
+
+
+def ensemble(amp: np.ndarray, freq_arr: np.ndarray, args) -> tuple[list[float], np.ndarray, str]:
+    """runs several outlier detection methods at the same time and combines them by
+    weighted voting. The methods and their weights are set with --ensemble (e.g.,
+    "Z-score:2,DB-Scan,LOF"). The features are calculated once and shared by the
+    methods, which run at the same time (see run_methods).
+
+    The vote is on the outliers of each method (see candidates), before the harmonics
+    are removed. A bin is a candidate if the methods that found it have at least half
+    of the total weight. The scores of each method are divided by the highest score of
+    its outliers, so each method contributes a value in (0, 1] for the bins it found.
+    The confidence of a bin is the weighted mean of these values (0 for the methods
+    that did not find it). The harmonics are removed from the candidates in the order
+    of their confidence.
+
+    Args:
+        amp (np.ndarray): amplitude or psd
+        freq_arr (np.ndarray): frequencies
+        args (argsparse): arguments
+
+    Returns:
+        tuple[list[float], np.ndarray, str]: [dominant frequency/ies, confidence, text]
+    """
+    methods, weights = ensemble_methods(args.ensemble)
+    features = spectrum_features(amp, freq_arr, args)
+    indices = features["indices"]
+    results = run_methods(methods, freq_arr, args, features)
+
+    votes = np.zeros(len(indices))
+    conf = np.zeros(len(indices))
+    text = features["text"]
+    text += f"Methods: {', '.join(f'{m} ({w:g})' for m, w in zip(methods, weights))}\n"
+    for m, w, (outlier, score, method_text) in zip(methods, weights, results):
+        votes[outlier] += w
+        if np.any(outlier):
+            score = np.clip(score[outlier], 0, None)
+            conf[outlier] += w * (score / score.max() if score.max() > 0 else 1)
+        if args.verbose:
+            text += method_text
+            text += f"{m} -> [green]{np.sum(outlier)}[/] outliers\n"
+    conf = conf / np.sum(weights)
+
+    candidates = np.flatnonzero(votes >= np.sum(weights) / 2)
+    candidates = candidates[np.argsort(-conf[candidates], kind="stable")]
+    text += f"Majority vote -> [green]{len(candidates)}[/] candidates\n"
+    clean_index, _, msg = remove_harmonics(freq_arr, features["amp_tmp"], indices[candidates], args.verbose)
+    dominant_index, text_d = dominant(clean_index, freq_arr, conf, args.verbose)
+
+    if "plotly" in args.engine:
+        i = np.repeat(1, len(indices))
+        if len(dominant_index) != 0:
+            i[np.array(dominant_index) - 1] = -1
+        from ftio.plot.anomaly_plot import plot_outliers
+        plot_outliers(args, freq_arr, features["amp"], indices, conf, i, features["d"])
+
+    return dominant_index, conf, text + msg + text_d
+
+
+def candidates(method: str, freq_arr: np.ndarray, args, features: dict) -> tuple[np.ndarray, np.ndarray, str]:
+    """Outliers of a method before the harmonics are removed, with a score that is
+    higher for stronger outliers: the Z-score (Z-score), the normalized amplitude
+    (DB-Scan and peaks), or the negated decision function (Isolation Forest and LOF)
+
+    Args:
+        method (str): name of the method (value of ENSEMBLE_METHODS)
+        freq_arr (np.ndarray): frequencies
+        args (argsparse): arguments
+        features (dict): result of spectrum_features
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, str]: mask of the outliers and score of the bins
+            1 to N/2, and text
+    """
+    d = features["d"]
+    text = ""
+    if method == "z-score":
+        z_k, above_tol, above_3 = z_scores(features["amp_tmp"][np.newaxis], args.tol)[3:]
+        outlier, score = (above_tol & above_3)[0], z_k[0]
+    elif method == "db-scan":
+        labels, _, _, _ = db_scan_labels(features, args)
+        outlier, score = labels == -1, d[:, 1]
+    elif method == "isolation_forest":
+        _, decision, labels, text = isolation_forest_labels(freq_arr, features, args)
+        outlier, score = labels == -1, -decision
+    elif method == "lof":
+        decision, labels, text = lof_labels(freq_arr, features, args)
+        outlier, score = labels == -1, -decision
+    elif method == "peaks":
+        outlier = np.zeros(len(d), dtype=bool)
+        outlier[find_peaks_index(d)] = True
+        score = d[:, 1]
+    else:
+        raise NotImplementedError(f"Unsupported method {method} in ensemble")
+
+    return outlier, score, text
+
+
+def run_methods(methods: list[str], freq_arr: np.ndarray, args, features: dict) -> list:
+    """Finds the candidates of the methods at the same time on threads (NumPy and
+    sklearn release the GIL in the heavy parts). The threads share the features and
+    the model cache of the process. With a single CPU, the methods run one after the
+    other.
+
+    Args:
+        methods (list[str]): names of the methods (values of ENSEMBLE_METHODS)
+        freq_arr (np.ndarray): frequencies
+        args (argsparse): arguments
+        features (dict): result of spectrum_features
+
+    Returns:
+        list: result of candidates for each method
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    workers = min(len(methods), cpus)
+    if workers < 2:
+        return [candidates(m, freq_arr, args, features) for m in methods]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(candidates, m, freq_arr, args, features) for m in methods]
+        return [f.result() for f in futures]
+
+
+def ensemble_methods(spec: str) -> tuple[list[str], list[float]]:
+    """Parses --ensemble
+
+    Args:
+        spec (str): comma-separated methods, optionally with a weight (method:weight)
+
+    Returns:
+        tuple[list[str], list[float]]: methods and their weights
+    """
+    methods, weights = [], []
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition(":")
+        name = name.strip().lower()
+        if name not in ENSEMBLE_METHODS:
+            raise NotImplementedError(f"Unsupported method {name} in ensemble")
+        methods.append(ENSEMBLE_METHODS[name])
+        weights.append(float(weight) if weight else 1.0)
+    return methods, weights
+
+
+def harmonic_sieve(freq: np.ndarray, max_kept: int = 0) -> tuple[np.ndarray, int]:
+    """Keeps the frequencies that are not a multiple of an earlier kept frequency. Each
+    kept frequency removes all its later multiples at once, so the Python loop only
+    runs over the kept frequencies.
+
+    Args:
+        freq (np.ndarray): candidate frequencies in the order they are examined
+        max_kept (int, optional): stop after so many frequencies were kept (0: no limit). Defaults to 0.
+
+    Returns:
+        tuple[np.ndarray, int]: mask of the kept frequencies and number of examined frequencies
+    """
+    n = len(freq)
+    alive = np.ones(n, dtype=bool)
+    kept = np.zeros(n, dtype=bool)
+    i = 0
+    n_kept = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        while i < n:
+            kept[i] = True
+            n_kept += 1
+            if n_kept == max_kept:
+                return kept, i + 1
+            alive[i + 1 :] &= ~(freq[i + 1 :] % freq[i] < HARMONIC_TOL)
+            later = np.flatnonzero(alive[i + 1 :])
+            if len(later) == 0:
+                break
+            i += 1 + later[0]
+    return kept, n
+
+
 def dominant(
-    dominant_index: np.ndarray, freq_arr: np.ndarray, conf: np.ndarray
+    dominant_index: np.ndarray, freq_arr: np.ndarray, conf: np.ndarray, verbose: bool = True
 ) -> tuple[list[float],str]:
     """_summary_
 
@@ -373,6 +665,7 @@ def dominant(
         dominant_index (array): found indecies of dominant frequencies
         freq_arr (array): array of frequencies
         conf (float): value between -1 (strong outlier) and 1 (no outlier)
+        verbose (bool, optional): build the text. Defaults to True.
 
     Returns:
         dominant_index: set to 0 if more than three were found. Also remove harmonics
@@ -381,55 +674,65 @@ def dominant(
     text = ""
     out = []
     if len(dominant_index) > 0:
-        for i in dominant_index:
-            if any(freq_arr[i] % freq_arr[out] < 0.00001):
-                text += f"[yellow]Ignoring harmonic at: {freq_arr[i]:.3e} Hz (T = {1/freq_arr[i] if freq_arr[i] > 0 else 0:.3f} s, k = {i}) -> confidence: {abs(conf[i-1])*100:.3f}%[/]\n"
-            else:
-                text += f"Dominant frequency at: [green] {freq_arr[i]:.3e} Hz (T = {1/freq_arr[i] if freq_arr[i] > 0 else 0:.3f} s, k = {i}) -> confidence: {abs(conf[i-1])*100:.3f}%[/]\n"
-                out.append(i)
-            if len(out) > 2:
-                text = "[red]Too many dominant frequencies -> Signal might be not periodic[/]\n"
-                out = []
-                break
+        kept, n = harmonic_sieve(np.asarray(freq_arr)[np.asarray(dominant_index)], max_kept=3)
+        if np.sum(kept) > 2:
+            return [], "[red]Too many dominant frequencies -> Signal might be not periodic[/]\n"
+        out = [dominant_index[k] for k in np.flatnonzero(kept)]
+        if verbose:
+            for k in range(n):
+                i = dominant_index[k]
+                if kept[k]:
+                    text += f"Dominant frequency at: [green] {freq_arr[i]:.3e} Hz (T = {1/freq_arr[i] if freq_arr[i] > 0 else 0:.3f} s, k = {i}) -> confidence: {abs(conf[i-1])*100:.3f}%[/]\n"
+                else:
+                    text += f"[yellow]Ignoring harmonic at: {freq_arr[i]:.3e} Hz (T = {1/freq_arr[i] if freq_arr[i] > 0 else 0:.3f} s, k = {i}) -> confidence: {abs(conf[i-1])*100:.3f}%[/]\n"
     else: 
         text = "[red]No dominant frequencies found -> Signal might be not periodic[/]\n"
     
     return out, text
 
 
-def remove_harmonics(freq_arr, amp_tmp, index_list) -> tuple[np.ndarray, list, str]:
+def remove_harmonics(freq_arr, amp_tmp, index_list, verbose: bool = True) -> tuple[np.ndarray, list, str]:
     """Removes harmonics
 
     Args:
         freq_arr (_type_): frequency array
         amp_tmp (_type_): amplitude or power array
         index_list (_type_): list of indecies starting at 1
+        verbose (bool, optional): build the text. Defaults to True.
 
     Returns:
         np.ndarray: indecies without harmonics
         list: removed harmonics
         str: text to print
     """
-    seen = []
-    removed = []
+    index_list = np.asarray(index_list)
+    if len(index_list) == 0:
+        return np.array([]), [], ""
+    freq_arr = np.asarray(freq_arr)
+    _, first = np.unique(index_list, return_index=True)
+    if len(first) == len(index_list):
+        kept, _ = harmonic_sieve(freq_arr[index_list])
+        removed = list(index_list[~kept])
+    else:
+        # the first occurrence of an index is sieved. A repeated one is removed
+        # (again) if it is a harmonic of another index kept before it
+        first = np.sort(first)
+        is_kept, _ = harmonic_sieve(freq_arr[index_list[first]])
+        kept = np.zeros(len(index_list), dtype=bool)
+        kept[first[is_kept]] = True
+        is_removed = np.ones(len(index_list), dtype=bool)
+        is_removed[first[is_kept]] = False
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for pos in np.setdiff1d(np.arange(len(index_list)), first):
+                before = index_list[:pos][kept[:pos]]
+                before = before[before != index_list[pos]]
+                is_removed[pos] = np.any(freq_arr[index_list[pos]] % freq_arr[before] < HARMONIC_TOL)
+        removed = list(index_list[is_removed])
     msg = ""
-    flag = True
-    # sort according to amplitude in descending order
-    # index_list = index_list[np.argsort(-amp_tmp[index_list])]
-    for ind in index_list:
-        if seen:
-            flag = True
-            for value in seen:
-                if freq_arr[ind] % freq_arr[value] < 0.00001 and ind != value:
-                    msg += (
-                        f"[yellow]Ignoring harmonic at: {freq_arr[ind]:.3e} Hz "
-                        f"(T = {1/freq_arr[ind] if freq_arr[ind] > 0 else 0:.3f} s, k = {ind})[/]\n"
-                        )
-                    removed.append(ind)
-                    flag = False
-                    break
-            if flag and ind not in seen:
-                seen.append(ind)
-        else:
-            seen.append(ind)
-    return np.array(seen), removed, msg
+    if verbose:
+        for ind in removed:
+            msg += (
+                f"[yellow]Ignoring harmonic at: {freq_arr[ind]:.3e} Hz "
+                f"(T = {1/freq_arr[ind] if freq_arr[ind] > 0 else 0:.3f} s, k = {ind})[/]\n"
+                )
+    return index_list[kept], removed, msg
@@ -1,12 +1,9 @@
 from __future__ import annotations
 import time
 import numpy as np
-from scipy.signal import find_peaks
 from rich.panel import Panel
-import plotly.graph_objects as go
 # from rich.padding import Padding
 import ftio.freq.discretize as dis
-from ftio.plot.helper import format_plot
 from ftio.freq.helper import MyConsole
 
 
@@ -37,6 +34,8 @@ def find_autocorrelation(args, data: dict, share:dict) -> dict:
     CONSOLE.set(args.verbose)
     tik = time.time()
     if args.autocorrelation:
+        # scipy.signal and plotly are only loaded when needed
+        from scipy.signal import find_peaks
         CONSOLE.print("[cyan]Executing:[/] Autocorrelation\n")
         prediction = {
         "source":"autocorrelation",
@@ -54,6 +53,8 @@ def find_autocorrelation(args, data: dict, share:dict) -> dict:
         total_bytes = np.nan
         # Ckeck if figure is on
         if any(x in args.engine for x in ["mat","plot"]):
+            import plotly.graph_objects as go
+            from ftio.plot.helper import format_plot
             fig.append(go.Figure())
 
         # Take data if already avilable from previous step
@@ -98,16 +99,8 @@ def find_autocorrelation(args, data: dict, share:dict) -> dict:
         # Scipy autocorrelation
         # lags = range(int(freq*len(b_sampled)))
         # acorr = sm.tsa.acf(b_sampled, nlags = len(lags)-1)
-        #! numpy autocorrelation
-        # # Mean
-        mean = np.mean(b_sampled)
-        # Variance
-        var = np.var(b_sampled)
-        # Normalized data
-        ndata = b_sampled - mean
-        # Caclualte autocorrelation:
-        acorr = np.correlate(ndata, ndata, "full")[len(ndata) - 1 :]
-        acorr = acorr / var / len(ndata)
+        #! FFT autocorrelation (reuses the zero-padded spectrum from the DFT if available)
+        acorr = autocorrelation(b_sampled, share.get("spectrum", None) if share else None)
         # plot
         if any(x in args.engine for x in ["mat","plot"]):
             fig[-1].add_scatter(y=acorr, mode="markers+lines", name="ACF", 
@@ -220,6 +213,36 @@ def find_autocorrelation(args, data: dict, share:dict) -> dict:
     return prediction
 
 
+def autocorrelation(b_sampled: np.ndarray, spectrum: np.ndarray = None) -> np.ndarray:
+    """Calculates the normalized autocorrelation for the lags 0 to N-1 using the
+    Wiener-Khinchin theorem. The signal is zero-padded to 2N samples, which results in
+    the same (linear) autocorrelation as np.correlate(x, x, "full")[N-1:].
+
+    Args:
+        b_sampled (np.ndarray): sampled bandwidth (N samples)
+        spectrum (np.ndarray, optional): np.fft.rfft(b_sampled, 2N). If provided, only an
+            inverse FFT is needed. Defaults to None.
+
+    Returns:
+        np.ndarray: autocorrelation
+    """
+    n = len(b_sampled)
+    mean = np.mean(b_sampled)
+    var = np.var(b_sampled)
+    if spectrum is None or len(spectrum) != n + 1:
+        spectrum = np.fft.rfft(b_sampled - mean, 2 * n)
+    else:
+        # remove the mean: subtract the spectrum of the zero-padded constant signal,
+        # which vanishes at the even bins (except DC)
+        k = np.arange(1, n + 1, 2)
+        spectrum = spectrum.copy()
+        spectrum[0] -= mean * n
+        spectrum[k] -= mean * 2 / (1 - np.exp(-1j * np.pi * k / n))
+
+    acorr = np.fft.irfft(spectrum * np.conj(spectrum), 2 * n)[:n]
+    return acorr / var / n if var > 0 else acorr
+
+
 def filter_outliers(freq: float, candidates: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, str]:
     """removes outliers using either qunatil method or Z-score
 
@@ -19,13 +19,40 @@ def sample_data(b: np.ndarray, t: np.ndarray, freq=-1) -> tuple[np.ndarray, floa
         _type_: b_sampled, sampling frequency (in case -1), and text 
         
     """
+    if len(t) == 0:
+        return np.empty(0), 0, " "
+
+    # ? calculate recommended frequency:
+    freq, N, text = sampling_frequency(t, freq)
+
+    # ? sample the data with the recommended frequency
+    b_sampled = zero_order_hold(b, t, sampling_grid(t[0], freq, N))
+
+    #! Abstraction error
+    error = abstraction_error(b, t, b_sampled, freq)
+    text += f"Abstraction error: {error:.5f}\n"
+
+    if len(b_sampled) == 0:
+        raise RuntimeError("No data in sampled bandwidth.\n Try increasing the sampling frequency")
+
+    return b_sampled, freq, text[:-1]
+
+
+def sampling_frequency(t: np.ndarray, freq: float = -1) -> tuple[float, int, str]:
+    """Finds the sampling frequency (in case it is set to an automatic mode) and
+    the number of samples needed to cover the signal
+
+    Args:
+        t (np.ndarray): time
+        freq (float, optional): sampling frequency. Defaults to -1, calculates the optimal sampling
+        frequency inside this function
+
+    Returns:
+        tuple[float, int, str]: sampling frequency, number of samples, and text
+    """
     text = ""
     text += f"Time window: {t[-1]-t[0]:.2f} s\n"
     text += f"Frequency step: {1/(t[-1]-t[0]) if (t[-1]-t[0]) != 0 else 0:.3e} Hz\n"
-
-    # ? calculate recommended frequency:
-    if len(t) == 0:
-        return np.empty(0), 0, " "
     if freq == -1:
         t_rec = find_lowest_time_change(t)
         freq = 2 / t_rec
@@ -37,37 +64,8 @@ def sample_data(b: np.ndarray, t: np.ndarray, freq=-1) -> tuple[np.ndarray, floa
         text += f"Sampling frequency:  {freq:.3e} Hz\n"
     N = int(np.floor((t[-1] - t[0]) * freq))
     text += f"Expected samples: {N}\n"
-    # print("    '-> \033[1;Start time: %f s \033[1;0m"%t[0])
-
-    # ? sample the data with the recommended frequency
-    # t_sampled = np.zeros(N) #t[0]+np.arange(N)*1/freq
-    b_sampled = np.zeros(N)
-    n = len(t)
-    counter = 0
-    n_old = 0
-    t_step = t[0]
-    # error   = 0
-    # errorStep   = 0
-    for _ in range(0, N):
-        for i in range(n_old, n):
-            if (t_step >= t[i]) and (t_step < t[i + 1]) or i == n - 1:
-                n_old = i  # no need to iterate over entire array
-                b_sampled[counter] = b[i]
-                counter = counter + 1
-                break
-        t_step = t_step + 1 / freq
 
-    #! Abstraction error
-    v_a = np.sum(np.abs(b_sampled * np.repeat(1 / freq, len(b_sampled))))
-    v_0 = np.sum(b * (np.concatenate([t[1:], t[-1:]]) - t))
-    # E = (abs(error))/(V0) if V0 > 0 else 0
-    error = (abs(v_a - v_0)) / v_0 if v_0 > 0 else 0
-    text += f"Abstraction error: {error:.5f}\n"
-
-    if len(b_sampled) == 0:
-        raise RuntimeError("No data in sampled bandwidth.\n Try increasing the sampling frequency")
-
-    return b_sampled, freq, text[:-1]
+    return freq, N, text
 
 
 def sample_data_same_size(b: np.ndarray, t:np.ndarray, freq=-1, n_bins=-1) -> tuple[np.ndarray,np.ndarray]:
@@ -84,27 +82,71 @@ def sample_data_same_size(b: np.ndarray, t:np.ndarray, freq=-1, n_bins=-1) -> tu
         _type_: b_sampled and sampling frequency (in case -1)
     """
     print(f"    '-> \033[1;34mBins: {n_bins}  \033[1;0m")
+    t_step = sampling_grid(0, freq, n_bins)
     b_sampled = np.zeros(n_bins)
-    n_old = 0
-    counter = 0
-    t_step = 0
-    n = len(b)
-    for k in range(0, n_bins):
-        if (t_step < t[0]) or (t_step > t[-1]):
-            counter = counter + 1
-        else:
-            for i in range(n_old, n):
-                if (t_step >= t[i]) and (t_step < t[i + 1]) or i == n - 1:
-                    n_old = i  # no need to itterate over entire array
-                    b_sampled[counter] = b[i]
-                    counter = counter + 1
-                    break
-        t_step = t_step + 1 / freq
+    # samples outside [t[0], t[-1]] are kept at zero
+    inside = (t_step >= t[0]) & (t_step <= t[-1])
+    b_sampled[inside] = zero_order_hold(b, t, t_step[inside])
 
     t = np.arange(0, n_bins) * 1 / freq
     return b_sampled, t
 
 
+def sampling_grid(t_0: float, freq: float, n: int) -> np.ndarray:
+    """Creates the time stamps at which the signal is sampled.
+
+    The stamps are accumulated sequentially (t_0, t_0 + 1/freq, ...) to produce
+    exactly the same grid as stepping through the signal in a loop.
+
+    Args:
+        t_0 (float): start time
+        freq (float): sampling frequency
+        n (int): number of samples
+
+    Returns:
+        np.ndarray: time stamps of the samples
+    """
+    if n <= 0:
+        return np.empty(0)
+    steps = np.full(n, 1 / freq)
+    steps[0] = t_0
+    return np.cumsum(steps)
+
+
+def zero_order_hold(b: np.ndarray, t: np.ndarray, t_sampled: np.ndarray) -> np.ndarray:
+    """Samples the step-shaped bandwidth at the provided time stamps. Each sample
+    holds the bandwidth of the last change point at or before it.
+
+    Args:
+        b (np.ndarray): bandwidth
+        t (np.ndarray): time stamps where the bandwidth changes (sorted)
+        t_sampled (np.ndarray): time stamps to sample at
+
+    Returns:
+        np.ndarray: sampled bandwidth
+    """
+    index = np.searchsorted(t, t_sampled, side="right") - 1
+    np.clip(index, 0, len(t) - 1, out=index)
+    return np.asarray(b)[index]
+
+
+def abstraction_error(b: np.ndarray, t: np.ndarray, b_sampled: np.ndarray, freq: float) -> float:
+    """Calculates the relative difference between the transferred volume of the
+    original and the sampled signal.
+
+    Args:
+        b (np.ndarray): bandwidth
+        t (np.ndarray): time
+        b_sampled (np.ndarray): sampled bandwidth
+        freq (float): sampling frequency
+
+    Returns:
+        float: abstraction error
+    """
+    v_a = np.sum(np.abs(b_sampled)) / freq
+    v_0 = np.sum(b[:-1] * np.diff(t))
+    return abs(v_a - v_0) / v_0 if v_0 > 0 else 0
+
 
 @jit(nopython=True, cache=True)
 def find_lowest_time_change(t:np.ndarray)-> float:
@@ -0,0 +1,153 @@
+"""Cache of the fitted outlier detection models (Isolation Forest and LOF). In the
+online predictor, the spectra of consecutive windows are similar, so the worker
+processes keep the fitted models between predictions instead of fitting a new model
+each time. The models are keyed by method, spectrum size, and sampling frequency.
+The least recently used model is evicted (see --model_cache), and a model is fitted
+from scratch after a number of reuses (see --model_refit). A cached Isolation Forest
+grows by a few trees fitted on the current spectrum on each reuse (warm start, see
+--model_extra).
+"""
+
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Callable
+import numpy as np
+
+# cache of the current process, see get_model_cache
+_CACHE = None
+
+
+class CachedModel:
+    def __init__(self, model):
+        self.model = model
+        self.uses = 0
+
+
+class ModelCache:
+    """Least recently used cache of fitted models. The methods of an ensemble run on
+    threads and share the cache, so the accesses are locked"""
+
+    def __init__(self, size: int = 8):
+        """init function
+
+        Args:
+            size (int, optional): maximal number of models. Defaults to 8.
+        """
+        self.size = size
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> CachedModel | None:
+        with self.lock:
+            entry = self.models.get(key)
+            if entry is not None:
+                self.models.move_to_end(key)
+            return entry
+
+    def reuse(self, key: tuple, max_uses: int) -> CachedModel | None:
+        """Returns the model for another use and counts the hit, or counts the miss if
+        there is no model or it was used max_uses times
+
+        Args:
+            key (tuple): key of the model (see model_key)
+            max_uses (int): maximal number of reuses of a model
+
+        Returns:
+            CachedModel | None: the model or None on a miss
+        """
+        with self.lock:
+            entry = self.models.get(key)
+            if entry is None or entry.uses >= max_uses:
+                self.misses += 1
+                return None
+            self.models.move_to_end(key)
+            self.hits += 1
+            entry.uses += 1
+            return entry
+
+    def put(self, key: tuple, entry: CachedModel) -> None:
+        with self.lock:
+            self.models[key] = entry
+            self.models.move_to_end(key)
+            self._evict()
+
+    def evict(self) -> None:
+        with self.lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self.models) > self.size:
+            self.models.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+
+def get_model_cache(size: int) -> ModelCache:
+    """Returns the cache of the process, creating it on the first call. The cache is
+    kept for the lifetime of the process (e.g., a worker of the predictor)
+
+    Args:
+        size (int): maximal number of models
+
+    Returns:
+        ModelCache: the cache
+    """
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ModelCache(size)
+    elif _CACHE.size != size:
+        _CACHE.size = size
+        _CACHE.evict()
+    return _CACHE
+
+
+def model_key(method: str, freq_arr: np.ndarray) -> tuple:
+    """Key of a model: method, spectrum size, and sampling frequency
+
+    Args:
+        method (str): outlier detection method
+        freq_arr (np.ndarray): frequencies of the spectrum (freq * k / N)
+
+    Returns:
+        tuple: key
+    """
+    n = len(freq_arr)
+    freq = freq_arr[1] * n if n > 1 else 0
+    return (method, n, round(float(freq), 9))
+
+
+def fit_model(key: tuple, create: Callable, d: np.ndarray, args) -> tuple[object, str]:
+    """Fits a new model or reuses the cached one
+
+    Args:
+        key (tuple): key of the model (see model_key)
+        create (Callable): creates an unfitted model
+        d (np.ndarray): features of the current spectrum
+        args (argparse): arguments (model_cache, model_refit, and model_extra)
+
+    Returns:
+        tuple[object, str]: fitted model and text
+    """
+    if args.model_cache <= 0:
+        model = create()
+        model.fit(d)
+        return model, ""
+
+    cache = get_model_cache(args.model_cache)
+    entry = cache.reuse(key, args.model_refit)
+    if entry is None:
+        model = create()
+        model.fit(d)
+        cache.put(key, CachedModel(model))
+        return model, "Fitted new model (cached)\n"
+
+    model = entry.model
+    if getattr(model, "warm_start", False) and args.model_extra > 0:
+        # add trees fitted on the current spectrum
+        model.n_estimators += args.model_extra
+        model.fit(d)
+    return model, f"Reused cached model ({entry.uses}/{args.model_refit})\n"
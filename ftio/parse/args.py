@@ -75,12 +75,20 @@ Full documentation:
         parser.set_defaults(freq = 10)
         parser.add_argument('-ts', '--ts',         type = float, help = 'modifies the start time of the examined time window')
         parser.add_argument('-te', '--te',         type = float, help = 'modifies the end time of the examined time window')
-        parser.add_argument('-tr', '--transformation', dest='transformation',  type = str, help = 'Specifies the frequency technique to use. Supported modes are: dft (default), wave_disc, and wave_cont')
+        parser.add_argument('-tr', '--transformation', dest='transformation',  type = str, help = 'Specifies the frequency technique to use. Supported modes are: dft (default), step_dft (analytic DFT of the step-shaped bandwidth without sampling. In the auto mode of -f, the frequencies reach up to the average Nyquist frequency of the change points. At most max(65536, 2*change points) bins are evaluated, a higher sampling frequency is lowered), lomb (Lomb-Scargle periodogram on the change points without sampling. In the auto mode of -f, the frequencies reach up to the average Nyquist frequency of the change points), welch (averaged spectrum of overlapping segments, see --welch_segment and --welch_overlap), wave_disc, and wave_cont. For the predictor, --sliding_dft replaces the growing window of dft with a fixed-length sliding window')
         parser.set_defaults(transformation='dft')
         parser.add_argument('-e', '--engine',         type = str, help = 'specifies the engine used to display the figures. Either plotly (default) or mathplotlib can be used.  Plotly is used to generate interactive plots as HTML files. Set this value to no if you do not want to generate plots')
         parser.set_defaults(engine = 'plotly')
-        parser.add_argument('-o', '--outlier',         type = str, help = 'outlier detection method: Z-score (default), DB-Scan, Isolation_forest, or LOF')
+        parser.add_argument('-o', '--outlier',         type = str, help = 'outlier detection method: Z-score (default), DB-Scan, Isolation_forest, LOF, peaks, or ensemble (see --ensemble)')
         parser.set_defaults(outlier = 'Z-score')
+        parser.add_argument('--ensemble', dest='ensemble', type = str, help = 'methods combined by -o ensemble as comma-separated list. Each method can have a weight for the voting (e.g., Z-score:2,DB-Scan,LOF). Default is Z-score,DB-Scan,Isolation_forest,LOF,peaks')
+        parser.set_defaults(ensemble = 'Z-score,DB-Scan,Isolation_forest,LOF,peaks')
+        parser.add_argument('--model_cache', dest='model_cache', type = int, help = 'number of fitted Isolation Forest and LOF models kept per process for the next predictions with the same spectrum size and sampling frequency. The least recently used model is evicted. Set to 0 to fit a new model each time (default for ftio, 8 for the predictor)')
+        parser.set_defaults(model_cache = 8 if 'predictor' in name.lower() else 0)
+        parser.add_argument('--model_refit', dest='model_refit', type = int, help = 'a cached model is fitted from scratch after being reused so many times (default=10)')
+        parser.set_defaults(model_refit = 10)
+        parser.add_argument('--model_extra', dest='model_extra', type = int, help = 'trees added to a cached Isolation Forest each time it is reused. The trees are fitted on the current spectrum (warm start). Set to 0 to reuse the forest unchanged (default=10)')
+        parser.set_defaults(model_extra = 10)
         parser.add_argument('-le', '--level', dest='level', type = float, help ='specifies the decomposition level for the discrete wavelet transformation (default=3). If specified as auto, the maximum decomposition level is automatic calculated')
         parser.set_defaults(level = 3)
         parser.add_argument('-t', '--tol', dest= 'tol',   type = float, help ='tolerance value')
@@ -99,6 +107,36 @@ Full documentation:
         parser.set_defaults(window_adaptation=False)
         parser.add_argument('-fh', '--frequency_hits', dest= 'frequency_hits',   type = float, help ='specifies the number of hits needed to adapt the time window. A hit occurs once a dominant frequency is found')
         parser.set_defaults(frequency_hits =  3)
+        parser.add_argument('--welch_segment', dest='welch_segment', type = float, help ='segment length in seconds for -tr welch (default=0, a quarter of the time window). The frequency step is 1/segment length')
+        parser.set_defaults(welch_segment=0)
+        parser.add_argument('--welch_overlap', dest='welch_overlap', type = float, help ='overlap of consecutive segments for -tr welch as a fraction in [0,1) (default=0.5)')
+        parser.set_defaults(welch_overlap=0.5)
+        parser.add_argument('--refine', dest='refine', action='store_true', help ='refines the dominant frequencies below the DFT resolution (1/time window) using a chirp-Z transform around each dominant bin. Gives accurate periods on short time windows without increasing the sampling frequency')
+        parser.set_defaults(refine=False)
+        parser.add_argument('--refine_points', dest='refine_points', type = int, help ='number of frequencies evaluated per DFT bin during the refinement (default=64)')
+        parser.set_defaults(refine_points=64)
+        parser.add_argument('--fft_backend', dest='fft_backend', type = str, help ='FFT backend used for the DFT: rfft (default, numpy real FFT that only computes the non-redundant half; the predictor reuses its output buffer if N stays the same), scipy.fft (scipy real FFT with several workers, see --fft_workers), or numpy (full complex numpy FFT)')
+        parser.set_defaults(fft_backend='rfft')
+        parser.add_argument('--fft_workers', dest='fft_workers', type = int, help ='number of workers for the scipy FFT backend (default=-1, uses all cores)')
+        parser.set_defaults(fft_workers=-1)
+        parser.add_argument('--fft_fast_len', dest='fft_fast_len', action='store_true', help ='computes the DFT with a chirp-Z transform whose FFTs have the next fast length. Speeds up sample counts with large prime factors. The frequency bins and the prediction are the same as without the flag')
+        parser.set_defaults(fft_fast_len=False)
+        parser.add_argument('--batch', dest='batch', action='store_true', help ='returns one prediction per trace (e.g., for several files or a folder) instead of only the last one. Traces with the same number of samples and sampling frequency are analyzed together in a single batched FFT')
+        parser.set_defaults(batch=False)
+        parser.add_argument('--pool_size', dest='pool_size', type = int, help ='predictor only: number of persistent worker processes that execute the predictions (default=1). The workers keep the modules and compiled kernels loaded between predictions. With 0, a new process is started for each prediction. At most max(1, pool_size) predictions run at the same time, data that arrives meanwhile is merged into a single pending prediction')
+        parser.set_defaults(pool_size=1)
+        parser.add_argument('--sliding_dft', dest='sliding_dft', action='store_true', help ='predictor only: keeps the spectrum between predictions and updates it with a sliding DFT using only the new samples. The spectrum is kept by the worker that runs the prediction. Note that, unlike the DFT without this flag, which analyzes the growing window from the start time (-ts) to the last sample, the window keeps the length of its first prediction and slides forward until the start time changes (window adaptation) or the sampling frequency changes')
+        parser.set_defaults(sliding_dft=False)
+        parser.add_argument('--full_parse', dest='incremental', action='store_false', help ='predictor only: parses the entire trace file for each prediction. By default, the predictor keeps the parsed data of JSONL and msgpack files between predictions and only parses the appended lines or objects')
+        parser.set_defaults(incremental='predictor' in name.lower())
+        parser.add_argument('--server', dest='server', action='store_true', help ='predictor only: runs a server that predicts the I/O of several applications over ZMQ (see --zmq_address and --zmq_port). The messages contain the id of the application (app or job). Each application has its own prediction state, and the predictions run on a pool of --pool_size workers with at most one prediction per application at a time. Each application is pinned to one worker, which keeps its state (e.g., of --sliding_dft)')
+        parser.set_defaults(server=False)
+        parser.add_argument('--pub_port', dest='pub_port', type = str, help ='predictor only: port of a ZMQ PUB socket that streams each prediction as a msgpack map (app, count, freq, period, conf, phase, t_start, t_end, probability, hits). The topic is the id of the application. Disabled by default')
+        parser.set_defaults(pub_port='')
+        parser.add_argument('--rep_port', dest='rep_port', type = str, help ='predictor only: port of a ZMQ REP socket that returns the latest prediction on request (msgpack map, optionally with the app). Disabled by default')
+        parser.set_defaults(rep_port='')
+        parser.add_argument('--result_endpoint', dest='result_endpoint', type = str, help ='predictor only: internal endpoint the prediction processes send their results to. Set by the predictor if --pub_port or --rep_port is used')
+        parser.set_defaults(result_endpoint='')
         parser.add_argument('-v', '--verbose', dest= 'verbose',   action = 'store_true', help ='sets verbose on or off (default=False)')
         parser.set_defaults(verbose =  False)
         parser.add_argument('--zmq', action='store_true', help='avoids opening the generated HTML file since zmq is used')
@@ -116,6 +154,8 @@ Full documentation:
         parser.set_defaults(cargo_server = 'ofi+sockets://127.0.0.1:62000')
         parser.add_argument('--cargo_out', '--cargo_out', dest='cargo_out', type = str, help = 'Cargo stage out path')
         parser.set_defaults(carge_out = '/lustre/project/nhr-admire/tarraf/stage-out')
+        parser.add_argument('--flush_cmd', '--flush_cmd', dest='flush_cmd', type = str, help = 'Shell command executed at the predicted time of the next phase instead of the cargo_ftio call. Use "local" to only record the calls (no cargo)')
+        parser.set_defaults(flush_cmd = '')
 
     #! IOPLOT Settings
     if 'plot' in name.lower():
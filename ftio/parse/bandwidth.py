@@ -37,11 +37,11 @@ class Bandwidth:
         # if "n_overlap" in b:
         # 	self.n_overlap.extend(b["n_overlap"])
         if "b_overlap_sum" in b:
-            self.b_overlap_sum.extend(b["b_overlap_sum"])
+            self.b_overlap_sum = values(b["b_overlap_sum"])
         if "b_overlap_avr" in b:
-            self.b_overlap_avr.extend(b["b_overlap_avr"])
+            self.b_overlap_avr = values(b["b_overlap_avr"])
         if "t_overlap" in b:
-            self.t_overlap.extend(b["t_overlap"])
+            self.t_overlap = values(b["t_overlap"])
         else:
             if "b_overlap_sum" in b:
                 self.t_overlap.extend(np.zeros(len(b["b_overlap_sum"])))
@@ -77,10 +77,10 @@ class Bandwidth:
 
             if "t_rank_s" in b:
                 self.t_rank_s.extend(b["t_rank_s"])
-                if "t_rank_e" in b and b["t_rank_e"]:
+                if "t_rank_e" in b and len(b["t_rank_e"]) > 0:
                     self.t_rank_e.extend(b["t_rank_e"])
                 else:
-                    if b["t_rank_s"]:
+                    if len(b["t_rank_s"]) > 0:
                         self.t_rank_e.extend(b["t_rank_s"][1:])
                         self.t_rank_e.append(b["t_rank_s"][-1])
                         b["t_rank_e"] = self.t_rank_e
@@ -120,9 +120,9 @@ class Bandwidth:
             if "t_ind_e" in b:
                 self.t_ind_e.extend(b["t_ind_e"])
 
-        self.app_ind = max(self.b_overlap_ind) if self.b_overlap_ind else -1
-        self.app_avr = max(self.b_overlap_avr) if self.b_overlap_avr else -1
-        self.app_sum = max(self.b_overlap_sum) if self.b_overlap_sum else -1
+        self.app_ind = peak(self.b_overlap_ind)
+        self.app_avr = peak(self.b_overlap_avr)
+        self.app_sum = peak(self.b_overlap_sum)
 
         # statistics:
         self.weighted_harmonic_mean = self.assign(b, "weighted_harmonic_mean")
@@ -153,6 +153,19 @@ class Bandwidth:
             return -1
 
 
+def values(x):
+    """Arrays (e.g., the views of IncrementalOverlap) are kept as they are, other
+    sequences are copied to a list"""
+    return x if isinstance(x, np.ndarray) else list(x)
+
+
+def peak(x) -> float:
+    """maximum of a list or array, -1 if empty"""
+    if len(x) == 0:
+        return -1
+    return x.max() if isinstance(x, np.ndarray) else max(x)
+
+
 #! ----------------------- I/O analysis ------------------------------
 # **********************************************************************
 # *                       1. Overlap
@@ -223,3 +236,82 @@ def overlap_core_safe(b, t_s, t_e, id_s, id_e):
         b_out.append(b_tmp)
 
     return b_out, t_out
+
+
+class IncrementalOverlap:
+    """Overlaps the bandwidth of intervals that arrive over time (e.g., appended
+    traces). The events are kept sorted in growing buffers. New intervals only
+    re-sort and re-accumulate the events from the first new time stamp on, so the
+    cost is proportional to the new data as long as it arrives roughly in order.
+    The result is the same as overlap() on all intervals.
+    """
+
+    def __init__(self, columns: list[str]):
+        """init function
+
+        Args:
+            columns (list[str]): names of the bandwidth columns that are overlapped
+                (e.g., ["b_rank_avr", "b_rank_sum"])
+        """
+        self.columns = columns
+        self.n = 0
+        self.t = np.empty(0)
+        self.end = np.empty(0, dtype=bool)
+        self.delta = {c: np.empty(0) for c in columns}
+        self.b = {c: np.empty(0) for c in columns}
+
+    def add(self, b: dict, t_s, t_e) -> None:
+        """Adds intervals
+
+        Args:
+            b (dict): bandwidth of the intervals for each column
+            t_s (list): start times
+            t_e (list): end times
+        """
+        t_s = np.asarray(t_s, dtype=float)
+        t_e = np.asarray(t_e, dtype=float)
+        if len(t_s) == 0:
+            return
+        n_new = 2 * len(t_s)
+        self.reserve(self.n + n_new)
+
+        # the events after the first new time stamp are sorted again
+        # (starts before ends at the same time, as in overlap_core)
+        t_new = np.concatenate([t_s, t_e])
+        k = int(np.searchsorted(self.t[: self.n], t_new.min(), side="left"))
+        t_tail = np.concatenate([self.t[k : self.n], t_new])
+        end_tail = np.concatenate([self.end[k : self.n], np.arange(n_new) >= len(t_s)])
+        order = np.lexsort((end_tail, t_tail))
+        n = self.n + n_new
+        self.t[k:n] = t_tail[order]
+        self.end[k:n] = end_tail[order]
+        for c in self.columns:
+            b_c = np.asarray(b[c], dtype=float)
+            delta_tail = np.concatenate([self.delta[c][k : self.n], b_c, -b_c])[order]
+            self.delta[c][k:n] = delta_tail
+            start = self.b[c][k - 1] if k > 0 else 0
+            self.b[c][k:n] = np.cumsum(np.concatenate([[start], delta_tail]))[1:]
+        self.n = n
+
+    def reserve(self, n: int) -> None:
+        """Grows the buffers (by at least a factor of two) to hold n events"""
+        if n <= len(self.t):
+            return
+        size = max(n, 2 * len(self.t))
+        self.t = np.resize(self.t, size)
+        self.end = np.resize(self.end, size)
+        for c in self.columns:
+            self.delta[c] = np.resize(self.delta[c], size)
+            self.b[c] = np.resize(self.b[c], size)
+
+    def result(self, column: str) -> tuple[np.ndarray, np.ndarray]:
+        """Overlapped bandwidth and time. The arrays are views of the buffers (no
+        copy), so they are only valid until the next call of add
+
+        Args:
+            column (str): name of the bandwidth column
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: bandwidth and time (as returned by overlap)
+        """
+        return self.b[column][: self.n], self.t[: self.n]
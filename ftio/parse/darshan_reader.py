@@ -3,14 +3,24 @@ Parses Darshan object to simrun
 This function can be also executed as a standalone. Just call:
 > python3 darshan_reader.py FILE
 
+Only the DXT module selected with --dxt_mode is read from the log (or the heatmap if
+the module was not captured). The segments of all records are concatenated once into
+flat arrays, and the bandwidths and the aggregates of the records are computed on the
+arrays instead of per record.
+
 Returns:
     list[dict]: _description_
 """
 import sys
 import time
+from itertools import chain
+from operator import itemgetter
+import numpy as np
 import darshan
 from rich.console import Console
-import pandas as pd
+
+MODES = ["write", "read"]
+FIELDS = itemgetter("length", "start_time", "end_time")
 
 
 def extract(path, args) -> tuple[dict, int]:
@@ -25,8 +35,8 @@ def extract(path, args) -> tuple[dict, int]:
             1. dictionary with relevant files
             2. number of ranks
     """
-    dataframe, ranks, time_total = extract_data(path, args)
-    write, read, time_io = extract_darshan(dataframe)
+    segments, ranks, time_total = extract_data(path, args)
+    write, read, time_io = extract_darshan(segments)
     data = {
         "read_sync": read,
         "write_sync": write,
@@ -35,36 +45,36 @@ def extract(path, args) -> tuple[dict, int]:
     return data, ranks
 
 
-def extract_data(path: str, args) -> tuple[list, int, dict]:
-    """Extracts module from Darshan
+def extract_data(path: str, args) -> tuple[dict, int, dict]:
+    """Extracts module from Darshan. Only the selected DXT module (or the heatmap) is
+    read from the log
 
     Args:
         path (str): file location
         args (Argparse): optional arguments
 
-    Raises:
-        RuntimeError: Not implemented
-
     Returns:
-        _type_: tuple[dataframe,int]
+        tuple[dict, int, dict]:
+            1. segments of each mode (see dxt_segments)
+            2. number of ranks
+            3. total time
     """
     start = time.time()
     total_time = {}
-    with darshan.DarshanReport(path, read_all=True) as report:
+    with darshan.DarshanReport(path, read_all=False) as report:
         ranks = int(report.metadata["job"]["nprocs"])
         console = Console()
         console.print(f"[cyan]Elapsed time:[/] {time.time()-start:.3f} s")
         start = time.time()
-        # dataframe = pd.DataFrame()
-        dataframe = []
+        segments = empty_segments()
         # get modules captured
         modules = list(report.modules.keys())
         if isinstance(args, list) or "MPI" in args.dxt_mode.upper():
             if "DXT_MPIIO" in modules:
-                dataframe = report.records["DXT_MPIIO"].to_df()
+                segments = read_dxt(report, "DXT_MPIIO")
             else:
                 console.print("[red]No DXT Module[/]\n[cyan]Trying heatmap[/]")
-                dataframe, freq, total_time = extract_heatmap(report, "MPIIO")
+                segments, freq, total_time = extract_heatmap(report, "MPIIO")
                 if isinstance(args, list):
                     pass
                 elif freq > 0 and "ftio" in args.files[0]:
@@ -73,77 +83,120 @@ def extract_data(path: str, args) -> tuple[list, int, dict]:
 
         elif "POSIX" in args.dxt_mode.upper():
             if "DXT_POSIX" in modules:
-                dataframe = report.records["DXT_POSIX"].to_df()
+                segments = read_dxt(report, "DXT_POSIX")
             else:
                 console.print("[red]No DXT Module[/]\n[cyan]Trying heatmap[/]")
-                dataframe, freq, total_time = extract_heatmap(report, "POSIX")
+                segments, freq, total_time = extract_heatmap(report, "POSIX")
                 if freq > 0:
                     args.freq = freq
                     console.print(f"[cyan]Adjusting sampling freq:[/] {freq:.3e}")
 
         console.print(f"[cyan]Done:[/] {time.time()-start:.3f} s\n")
 
-    return dataframe, ranks, total_time
+    return segments, ranks, total_time
 
 
-def extract_heatmap(report, kind: str) -> tuple[list, float, dict]:
-    """Extract heatmap to support types
+def read_dxt(report, module: str) -> dict:
+    """Reads a single DXT module of the report
+
+    Args:
+        report: darshan report (opened with read_all=False)
+        module (str): DXT_MPIIO or DXT_POSIX
+
+    Returns:
+        dict: segments of each mode (see dxt_segments)
+    """
+    report.mod_read_all_dxt_records(module, dtype="dict")
+    return dxt_segments(report.records[module])
+
+
+def empty_segments() -> dict:
+    return {
+        mode: {
+            "record": np.zeros(0, dtype=np.int64),
+            "rank": np.zeros(0, dtype=np.int64),
+            "length": np.zeros(0, dtype=np.int64),
+            "start_time": np.zeros(0),
+            "end_time": np.zeros(0),
+        }
+        for mode in MODES
+    }
+
+
+def dxt_segments(records) -> dict:
+    """Concatenates the segments of all DXT records into flat arrays
+
+    Args:
+        records: DXT records (dicts with rank, write_segments, and read_segments)
+
+    Returns:
+        dict: for each mode (write and read), the arrays record (index of the record),
+            rank, length, start_time, and end_time with one entry per segment. The
+            segments are in the order of the records
+    """
+    segments = {}
+    ranks = np.array([rec["rank"] for rec in records], dtype=np.int64)
+    for mode in MODES:
+        key = f"{mode}_segments"
+        counts = np.array([len(rec[key]) for rec in records], dtype=np.int64)
+        values = np.array(
+            [FIELDS(s) for s in chain.from_iterable(rec[key] for rec in records)],
+            dtype=np.float64,
+        ).reshape(-1, 3)
+        record = np.repeat(np.arange(len(counts)), counts)
+        segments[mode] = {
+            "record": record,
+            "rank": ranks[record],
+            "length": values[:, 0].astype(np.int64),
+            "start_time": values[:, 1],
+            "end_time": values[:, 2],
+        }
+    return segments
+
+
+def extract_heatmap(report, kind: str) -> tuple[dict, float, dict]:
+    """Extract heatmap to support types. Each non-zero bin of a rank is a segment
+    spanning the bin
 
     Args:
         report: darshan report
         kind (str): either MPIIO, POSIX, or STDIO
 
     Returns:
-        list: data
+        dict: segments of each mode (see dxt_segments)
         float: adjusted sampling frequency
         float: total time
     """
-    dataframe = []
+    report.read_all_heatmap_records()
+    segments = empty_segments()
     total_time = {}
     freq = 0
     for mode in ["read", "write"]:
         heatmap = report.heatmaps[kind].to_df([mode])
-        # bins = heatmap._nbins
         bin_width = report.heatmaps[kind]._bin_width_seconds
         freq = 5 / bin_width
-        col_name = heatmap.columns.values
-        t_sum_rank = 0  # Measures total time
-        for rank, row in heatmap.iterrows():
-            length = []
-            start_time = []
-            end_time = []
-            for n_bin, value in enumerate(row):
-                if value != 0:
-                    length.append(value)
-                    start_time.append(col_name[n_bin].left)
-                    end_time.append(col_name[n_bin].right)
-            if length:
-                dataframe.append(
-                    {
-                        "rank": rank,
-                        f"{mode}_segments": pd.DataFrame(
-                            {
-                                "length": length,
-                                "start_time": start_time,
-                                "end_time": end_time,
-                            }
-                        ),
-                    }
-                )
-            else:
-                dataframe.append({"rank": rank, f"{mode}_segments": pd.DataFrame()})
-            t_sum_rank += col_name[-1].right
-
-        total_time["delta_t_agg"] = t_sum_rank
+        bins = heatmap.columns
+        values = heatmap.to_numpy()
+        # row-major, as the bins of each rank
+        row, col = np.nonzero(values)
+        segments[mode] = {
+            "record": row,
+            "rank": heatmap.index.to_numpy()[row].astype(np.int64),
+            "length": values[row, col],
+            "start_time": np.asarray(bins.left, dtype=np.float64)[col],
+            "end_time": np.asarray(bins.right, dtype=np.float64)[col],
+        }
+        # measures total time
+        total_time["delta_t_agg"] = len(heatmap) * bins[-1].right
 
-    return dataframe, freq, total_time
+    return segments, freq, total_time
 
 
-def extract_darshan(dataframe: list) -> tuple[dict, dict, dict]:
-    """_summary_
+def extract_darshan(segments: dict) -> tuple[dict, dict, dict]:
+    """Computes the bandwidth and the aggregates of the segments
 
     Args:
-        df (pd.Dataframe): dataframe contating darshan module
+        segments (dict): segments of each mode (see dxt_segments)
 
     Returns:
         tuple[dict, dict]:
@@ -151,107 +204,8 @@ def extract_darshan(dataframe: list) -> tuple[dict, dict, dict]:
             2. read dict
             3. time dict
     """
-    write = {
-        "number_of_ranks": 0,
-        "total_bytes": 0,
-        "max_bytes_per_rank": 0,
-        "max_bytes_per_phase": 0,
-        "max_io_phases_per_rank" : 0,
-        "total_io_phases" : 0,
-        "bandwidth": {
-            "b_rank_sum": [],
-            "b_rank_avr": [],
-            "t_rank_s": [],
-            "t_rank_e": [],
-        },
-    }
-    read = {
-        "number_of_ranks": 0,
-        "total_bytes": 0,
-        "max_bytes_per_rank": 0,
-        "max_bytes_per_phase": 0,
-        "max_io_phases_per_rank" : 0,
-        "total_io_phases" : 0,
-        "bandwidth": {
-            "b_rank_sum": [],
-            "b_rank_avr": [],
-            "t_rank_s": [],
-            "t_rank_e": [],
-        },
-    }
-    time_sr = 0
-    time_sw = 0
-    
-    
-    
-    for rank, _ in enumerate(dataframe):
-        if (
-            "write_segments" in dataframe[rank]
-            and not dataframe[rank]["write_segments"].empty
-        ):
-            bandwidth = (
-                dataframe[rank]["write_segments"]["length"]/ (
-                    dataframe[rank]["write_segments"]["end_time"]
-                    - dataframe[rank]["write_segments"]["start_time"]
-                )
-            )
-            write["bandwidth"]["b_rank_avr"].extend(bandwidth.to_list())
-            write["bandwidth"]["b_rank_sum"].extend(bandwidth.to_list())
-            write["bandwidth"]["t_rank_e"].extend(
-                dataframe[rank]["write_segments"]["end_time"].to_list()
-            )
-            write["bandwidth"]["t_rank_s"].extend(
-                dataframe[rank]["write_segments"]["start_time"].to_list()
-            )
-            write["number_of_ranks"] = max(write["number_of_ranks"], dataframe[rank]["rank"] + 1)
-            time_sw += sum(
-                (
-                    dataframe[rank]["write_segments"]["end_time"]
-                    - dataframe[rank]["write_segments"]["start_time"]
-                ).to_list()
-            )
-            write["total_bytes"] += sum(dataframe[rank]["write_segments"]["length"])
-            write["max_bytes_per_rank"] = max(
-                write["max_bytes_per_rank"], sum(dataframe[rank]["write_segments"]["length"])
-            )
-            write["max_bytes_per_phase"] = max(
-                write["max_bytes_per_phase"], max(dataframe[rank]["write_segments"]["length"]))
-            write["max_io_phases_per_rank"] = max(write["max_io_phases_per_rank"], len(dataframe[rank]["write_segments"]["length"]))
-            write["total_io_phases"] += len(dataframe[rank]["write_segments"]["length"])
-
-        if (
-            "read_segments" in dataframe[rank]
-            and not dataframe[rank]["read_segments"].empty
-        ):
-            bandwidth = (
-                dataframe[rank]["read_segments"]["length"] / (
-                    dataframe[rank]["read_segments"]["end_time"]
-                    - dataframe[rank]["read_segments"]["start_time"]
-                )
-            )
-            read["bandwidth"]["b_rank_avr"].extend(bandwidth.to_list())
-            read["bandwidth"]["b_rank_sum"].extend(bandwidth.to_list())
-            read["bandwidth"]["t_rank_e"].extend(
-                dataframe[rank]["read_segments"]["end_time"].to_list()
-            )
-            read["bandwidth"]["t_rank_s"].extend(
-                dataframe[rank]["read_segments"]["start_time"].to_list()
-            )
-            read["number_of_ranks"] = max(read["number_of_ranks"], dataframe[rank]["rank"] + 1)
-            time_sr += sum(
-                (
-                    dataframe[rank]["read_segments"]["end_time"]
-                    - dataframe[rank]["read_segments"]["start_time"]
-                ).to_list()
-            )
-            read["total_bytes"] += sum(dataframe[rank]["read_segments"]["length"])
-            read["max_bytes_per_rank"] = max(
-                read["max_bytes_per_rank"], sum(dataframe[rank]["read_segments"]["length"])
-            )
-            read["max_bytes_per_phase"] = max(
-                read["max_bytes_per_phase"], max(dataframe[rank]["read_segments"]["length"]))
-            read["max_io_phases_per_rank"] = max(read["max_io_phases_per_rank"], len(dataframe[rank]["read_segments"]["length"]))
-            read["total_io_phases"] += len(dataframe[rank]["read_segments"]["length"])
+    write, time_sw = aggregate(segments["write"])
+    read, time_sr = aggregate(segments["read"])
 
     # total time
     time = {
@@ -270,6 +224,53 @@ def extract_darshan(dataframe: list) -> tuple[dict, dict, dict]:
     return write, read, time
 
 
+def aggregate(seg: dict) -> tuple[dict, float]:
+    """Aggregates the segments of a mode. As before, the "per rank" values are
+    computed per record (i.e., per rank and file)
+
+    Args:
+        seg (dict): segments of the mode (see dxt_segments)
+
+    Returns:
+        tuple[dict, float]: dict of the mode and the summed time of the segments
+    """
+    out = {
+        "number_of_ranks": 0,
+        "total_bytes": 0,
+        "max_bytes_per_rank": 0,
+        "max_bytes_per_phase": 0,
+        "max_io_phases_per_rank": 0,
+        "total_io_phases": 0,
+        "bandwidth": {
+            "b_rank_sum": [],
+            "b_rank_avr": [],
+            "t_rank_s": [],
+            "t_rank_e": [],
+        },
+    }
+    length = seg["length"]
+    if len(length) == 0:
+        return out, 0
+
+    duration = seg["end_time"] - seg["start_time"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bandwidth = (length / duration).tolist()
+    out["bandwidth"]["b_rank_avr"] = bandwidth
+    out["bandwidth"]["b_rank_sum"] = list(bandwidth)
+    out["bandwidth"]["t_rank_e"] = seg["end_time"].tolist()
+    out["bandwidth"]["t_rank_s"] = seg["start_time"].tolist()
+
+    # the segments of a record are contiguous
+    starts = np.flatnonzero(np.diff(seg["record"], prepend=-1))
+    out["number_of_ranks"] = int(seg["rank"].max()) + 1
+    out["total_bytes"] = length.sum().item()
+    out["max_bytes_per_rank"] = np.add.reduceat(length, starts).max().item()
+    out["max_bytes_per_phase"] = length.max().item()
+    out["max_io_phases_per_rank"] = int(np.diff(starts, append=len(length)).max())
+    out["total_io_phases"] = len(length)
+    return out, float(duration.sum())
+
+
 def main(args) -> None:
     """Pass varibales and call main_core. The extraction of the traces
     and the parsing of the arguments is done in this function.
@@ -0,0 +1,248 @@
+"""Incremental parser for traces that grow over time (JSONL or msgpack files
+monitored by the predictor). The parser remembers the byte offset and the merged
+data, so each call only parses the appended lines or objects and extends the
+merged fields and the overlapped bandwidth. The Simrun is kept as well, and only
+the modes that received new data are assigned again.
+"""
+
+from __future__ import annotations
+import os
+import json
+from ftio.parse.simrun import Simrun
+from ftio.parse.percent import Percent
+from ftio.parse.helper import match_mode
+from ftio.parse.bandwidth import IncrementalOverlap
+
+OVERLAP_COLUMNS = ["b_rank_avr", "b_rank_sum"]
+
+# parsers of the current process, see get_parser
+_PARSERS = {}
+
+
+def get_parser(path: str) -> ParseIncremental:
+    """Returns the incremental parser of the file, creating it on the first call.
+    The parsers are kept for the lifetime of the process (e.g., a worker of the
+    predictor), so later predictions only parse the new data.
+
+    Args:
+        path (str): file name
+
+    Returns:
+        ParseIncremental: parser of the file
+    """
+    path = os.path.abspath(path)
+    if path not in _PARSERS:
+        _PARSERS[path] = ParseIncremental(path)
+    return _PARSERS[path]
+
+
+class ParseIncremental:
+    def __init__(self, path):
+        self.path = path
+        if self.path[-1] == "/":
+            self.path = self.path[:-1]
+        self.ext = "msgpack" if "msgpack" in self.path[-10:] else "jsonl"
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets the parsed data (e.g., if the file was truncated or replaced)"""
+        self.offset = 0
+        self.inode = None
+        self.rest = b""
+        self.unpacker = None
+        self.first = {}  # first part of each mode (used as is while it is the only one)
+        self.merged = {}  # merged parts of each mode (as Simrun.merge_fields)
+        self.n_parts = {}
+        self.means = {}  # sum and count of the merged arithmetic means
+        self.overlaps = {}  # IncrementalOverlap of each mode or None
+        self.simrun = None  # Simrun of the last call
+        self.key = None  # arguments the Simrun was created with
+
+    def to_simrun(self, args, index=0):
+        """Parses the appended data and converts everything parsed so far to a
+        Simrun class
+
+        Args:
+            args (argparse): command line arguments
+            index: file index in case several files are passed
+        Returns:
+            Simrun: Simrun object
+        """
+        changed = set()
+        for item in self.read():
+            for mode, part in item.items():
+                if isinstance(part, dict):
+                    self.add(mode, part)
+                    changed.add(mode)
+
+        # the Simrun depends on these arguments (see Simrun and Bandwidth)
+        key = (args.mode, args.avr, args.sum, args.ind, index)
+        if self.simrun is None or key != self.key:
+            data = [{mode: self.part(mode, args)} for mode in self.merged]
+            self.simrun = Simrun(data, self.ext, self.path, args, index)
+            self.key = key
+            return self.simrun
+
+        # only the modes with new data are assigned again
+        run = self.simrun
+        args.file_index = index
+        fields = self.fields(args)
+        for mode in changed & fields:
+            setattr(run, mode, run.merge_parts([{mode: self.part(mode, args)}], mode, args))
+            if mode == "io_time":
+                run.io_percent = Percent(run.io_time)
+        return run
+
+    def part(self, mode: str, args) -> dict:
+        """Merged part of the mode with the overlapped bandwidth
+
+        Args:
+            mode (str): mode (e.g., write_sync)
+            args (argparse): command line arguments
+
+        Returns:
+            dict: metrics of the mode as Simrun.merge_fields of all parts
+        """
+        part = dict(self.first[mode] if self.n_parts[mode] == 1 else self.merged[mode])
+        if "bandwidth" in part:
+            part["bandwidth"] = dict(part["bandwidth"])
+            self.assign_overlap(mode, part["bandwidth"], args)
+        return part
+
+    def fields(self, args) -> set[str]:
+        """Modes that Simrun assigns for the arguments (see Simrun.assign)"""
+        modes = ["read_sync", "write_sync", "read_async_t", "read_async_b", "write_async_t", "write_async_b"]
+        mode = match_mode(args.mode) if args.mode else ""
+        if mode in ["read_sync", "write_sync", "read_async", "write_async"]:
+            modes = [m for m in modes if m.startswith(mode)]
+        return set(modes) | {"io_time"}
+
+    def read(self) -> list:
+        """Reads the data appended since the last call
+
+        Returns:
+            list: new JSONL lines or items extracted from the msgpack objects
+        """
+        stat = os.stat(self.path)
+        if stat.st_size < self.offset or (self.inode is not None and stat.st_ino != self.inode):
+            self.reset()
+        self.inode = stat.st_ino
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            new = f.read()
+        self.offset += len(new)
+
+        if self.ext == "msgpack":
+            return self.extract_msgpack(new)
+        return self.extract_jsonl(new)
+
+    def extract_jsonl(self, new: bytes) -> list[dict]:
+        # an incomplete last line is kept until the rest of it is written
+        buffer = self.rest + new
+        end = buffer.rfind(b"\n") + 1
+        lines, self.rest = buffer[:end].splitlines(), buffer[end:]
+        data = [json.loads(line) for line in lines if line.strip()]
+        if self.rest.strip():
+            try:
+                data.append(json.loads(self.rest))
+                self.rest = b""
+            except ValueError:
+                pass
+        return data
+
+    def extract_msgpack(self, new: bytes) -> list[dict]:
+        import msgpack
+        from ftio.parse.msgpack_reader import get_type, convert_to_class
+
+        # the unpacker keeps incomplete objects until the rest is written
+        if self.unpacker is None:
+            self.unpacker = msgpack.Unpacker()
+        self.unpacker.feed(new)
+        data = []
+        for item in self.unpacker:
+            data.extend(convert_to_class(item, get_type(item)) or [])
+        return data
+
+    def add(self, mode: str, part: dict) -> None:
+        """Merges a part into the mode
+
+        Args:
+            mode (str): mode of the part (e.g., write_sync)
+            part (dict): metrics of the part
+        """
+        if mode not in self.merged:
+            self.first[mode] = part
+            self.n_parts[mode] = 1
+            self.merged[mode] = self.init_fields(part, (mode,))
+        else:
+            self.n_parts[mode] += 1
+            self.add_fields(self.merged[mode], part, (mode,))
+
+        # overlap the new intervals
+        b = part.get("bandwidth")
+        if not isinstance(b, dict) or self.overlaps.get(mode, True) is None:
+            return
+        columns = [c for c in OVERLAP_COLUMNS if c in b]
+        if mode not in self.overlaps:
+            self.overlaps[mode] = IncrementalOverlap(columns) if columns else None
+        overlap = self.overlaps[mode]
+        if (
+            overlap is None
+            or columns != overlap.columns
+            or not b.get("t_rank_e")
+            or any(len(b[c]) != len(b.get("t_rank_s", [])) for c in columns)
+            or len(b["t_rank_e"]) != len(b["t_rank_s"])
+        ):
+            # not supported, Bandwidth overlaps the merged intervals
+            self.overlaps[mode] = None
+            return
+        overlap.add(b, b["t_rank_s"], b["t_rank_e"])
+
+    def assign_overlap(self, mode: str, b: dict, args) -> None:
+        """Adds the overlapped bandwidth to the bandwidth fields, so Bandwidth does
+        not overlap all intervals again"""
+        overlap = self.overlaps.get(mode)
+        if overlap is None or any(name in b for name in ["b_overlap_avr", "b_overlap_sum", "t_overlap"]):
+            return
+        for column, name, flag in [("b_rank_avr", "b_overlap_avr", args.avr), ("b_rank_sum", "b_overlap_sum", args.sum)]:
+            if flag and column in overlap.columns:
+                b[name], b["t_overlap"] = overlap.result(column)
+
+    def init_fields(self, part: dict, path: tuple) -> dict:
+        """Simrun.merge_fields of a single part"""
+        merged = {}
+        for field, value in part.items():
+            if isinstance(value, dict):
+                merged[field] = self.init_fields(value, path + (field,))
+            elif isinstance(value, list):
+                merged[field] = list(value)
+            elif any(x in field for x in ["total", "_t_", "max", "number", "min"]):
+                merged[field] = value
+            elif "arithmetic_mean" in field:
+                self.means[path + (field,)] = [value, 1]
+                merged[field] = value
+        return merged
+
+    def add_fields(self, merged: dict, part: dict, path: tuple) -> None:
+        """Extends the merged fields with a new part. Equivalent to
+        Simrun.merge_fields on all parts, where the fields are defined by the
+        first part"""
+        for field in merged:
+            if field not in part:
+                continue
+            value = part[field]
+            if isinstance(merged[field], dict):
+                self.add_fields(merged[field], value, path + (field,))
+            elif isinstance(merged[field], list):
+                merged[field].extend(value)
+            elif any(x in field for x in ["total", "_t_"]):
+                merged[field] += value
+            elif any(x in field for x in ["max", "number"]):
+                merged[field] = max(merged[field], value)
+            elif "min" in field:
+                merged[field] = min(merged[field], value)
+            elif "arithmetic_mean" in field:
+                mean = self.means[path + (field,)]
+                mean[0] += value
+                mean[1] += 1
+                merged[field] = mean[0] / mean[1]
@@ -3,7 +3,7 @@ the bandwidth, the start time, and the end time.
 '''
 import zmq
 from ftio.parse.simrun import Simrun
-from ftio.parse.zmq_reader import extract
+from ftio.parse.zmq_reader import extract, receive
 from ftio.parse.msgpack_reader import extract_data
 from ftio.freq.helper import MyConsole
 
@@ -27,8 +27,8 @@ class ParseZmq:
 
             
         if 'direct' in args.zmq_source:
-            for msg in self.msgs:
-                dataframe, ranks = extract(msg, args)
+            # the fields of all messages are concatenated
+            dataframe, ranks = extract(list(self.msgs), args)
             return Simrun(dataframe, 'txt',str(ranks), args, index)
         elif 'tmio' in args.zmq_source.lower():
             data = extract_data(self.msgs[0], [])
@@ -56,7 +56,7 @@ def get_msgs_zmq(args)-> list[str]:
     while(True):
         while(socks):
             if socks.get(socket) == zmq.POLLIN:
-                msg = socket.recv(zmq.NOBLOCK)
+                msg = receive(socket, zmq.NOBLOCK)
                 msgs.append(msg)
                 ranks += 1
             socks = dict(poller.poll(1000))
@@ -71,7 +71,7 @@ class Sample:
     def find_data(self,name,common):
         #remove empty:
         for i in name:
-            if not getattr(self.bandwidth,i):
+            if len(getattr(self.bandwidth,i)) == 0:
                 name.remove(i)
 
         # add phase info
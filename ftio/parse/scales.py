@@ -9,15 +9,9 @@ from rich.panel import Panel
 from rich.console import Console
 from rich.text import Text
 from ftio import __version__
-from ftio.parse.parse_json import ParseJson
-from ftio.parse.parse_jsonl import ParseJsonl
-from ftio.parse.parse_recorder import ParseRecorder
-from ftio.parse.parse_darshan import ParseDarshan
-from ftio.parse.parse_msgpack import ParseMsgpack
-from ftio.parse.parse_txt import ParseTxt
-from ftio.parse.parse_custom import ParseCustom
-from ftio.parse.parse_zmq import ParseZmq
 from ftio.parse.args import parse_args
+# the parsers are imported when the input format is known, as their readers
+# (darshan, zmq, msgpack, ...) are slow to load
 
 
 class Scales:
@@ -43,6 +37,7 @@ class Scales:
         self.args = parse_args(argv)
 
         if "zmq" in self.args and self.args.zmq:
+            from ftio.parse.parse_zmq import ParseZmq
             self.s.append(ParseZmq(self.msg).to_simrun(self.args, 0))
             self.n = 1
         else:
@@ -68,6 +63,7 @@ class Scales:
                 console.print(
                     f"\n[cyan]Loading Recorder folder({self.paths.index(path) + 1},{len(self.paths)}):[/] {path}"
                 )
+                from ftio.parse.parse_recorder import ParseRecorder
                 run = ParseRecorder(path).to_simrun(self.args)
                 self.s.append(run)
 
@@ -148,16 +144,27 @@ class Scales:
         """
         check_open(file_path)
         if self.args.custom_file:
+            from ftio.parse.parse_custom import ParseCustom
             run = ParseCustom(file_path).to_simrun(self.args, file_index)
+        elif "incremental" in self.args and self.args.incremental and (
+            ".jsonl" in file_path[-6:] or "msgpack" in file_path[-10:]
+        ):
+            from ftio.parse.parse_incremental import get_parser
+            run = get_parser(file_path).to_simrun(self.args, file_index)
         elif ".json" in file_path[-5:]:
+            from ftio.parse.parse_json import ParseJson
             run = ParseJson(file_path).to_simrun(self.args, file_index)
         elif ".jsonl" in file_path[-6:]:
+            from ftio.parse.parse_jsonl import ParseJsonl
             run = ParseJsonl(file_path).to_simrun(self.args, file_index)
         elif "darshan" in file_path[-10:]:
+            from ftio.parse.parse_darshan import ParseDarshan
             run = ParseDarshan(file_path).to_simrun(self.args, file_index)
         elif "msgpack" in file_path[-10:]:
+            from ftio.parse.parse_msgpack import ParseMsgpack
             run = ParseMsgpack(file_path).to_simrun(self.args, file_index)
         elif "txt" in file_path[-10:]:
+            from ftio.parse.parse_txt import ParseTxt
             run = ParseTxt(file_path).to_simrun(self.args, file_index)
         self.s.append(run)
 
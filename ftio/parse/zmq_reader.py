@@ -1,27 +1,51 @@
+from __future__ import annotations
 import time
+import struct
 import msgpack
+import numpy as np
 from rich.console import Console
 from ftio.parse.input_template import init_data
 
+# binary format: a header frame followed by one frame per field. Each field frame
+# contains the values as little-endian float64. An optional first frame contains
+# the id of the application (utf-8), see ftio.prediction.server_zmq.
+# header: magic (4 bytes), ranks (uint32), number of values per field (uint64)
+MAGIC = b"FTB1"
+HEADER = struct.Struct("<4sIQ")
+FIELDS = ["b", "ts", "te"]
+
 
 def extract(msgs, args:list) -> tuple[dict, int]:
+    """Extracts the bandwidth, start time, and end time from one or several
+    messages. The fields of several messages are concatenated.
+
+    Args:
+        msgs (bytes | dict | list): msgpack message, decoded binary message (see
+            decode_frames), or a list of them
+        args (list): command line arguments
+
+    Returns:
+        tuple[dict, int]: data and number of ranks
+    """
     # init
-    start = time.time() 
+    start = time.time()
     mode, io_data, io_time = init_data(args)
 
     # unpack data
-    unpacked_data = msgpack.unpackb(msgs)
+    if not isinstance(msgs, list):
+        msgs = [msgs]
+    unpacked = [msg if isinstance(msg, dict) else msgpack.unpackb(msg) for msg in msgs]
 
     # Access the data
-    if "ranks" in unpacked_data:
-        ranks           = unpacked_data["ranks"]
+    ranks = max(d.get("ranks", 0) for d in unpacked) if unpacked else 0
+    if len(unpacked) == 1:
+        b  = unpacked[0]["b"]
+        ts = unpacked[0]["ts"]
+        te = unpacked[0]["te"]
     else:
-        ranks = 0
-    b               = unpacked_data["b"]
-    ts              = unpacked_data["ts"]
-    te              = unpacked_data["te"]
+        b, ts, te = [np.concatenate([d[field] for d in unpacked]) for field in FIELDS]
     # received_float  = unpacked_data["floatData"]
-    
+
     io_data["bandwidth"]["b_rank_avr"] = b
     io_data["bandwidth"]["t_rank_s"]   = ts
     io_data["bandwidth"]["t_rank_e"]   = te
@@ -29,7 +53,7 @@ def extract(msgs, args:list) -> tuple[dict, int]:
     console = Console()
     console.print(f"[cyan]Elapsed time:[/] {time.time()-start:.3f} s")
     # io_time[f"delta_t_{kind}"] = 0
-    
+
     #pack everything
     data = {
         f"{mode}": io_data,
@@ -38,3 +62,67 @@ def extract(msgs, args:list) -> tuple[dict, int]:
 
     return data, ranks
 
+
+def receive(socket, flags: int = 0) -> bytes | dict:
+    """Receives a message without copying it. Single frames are returned as bytes
+    (msgpack format), several frames are decoded with decode_frames.
+
+    Args:
+        socket (zmq.Socket): socket to receive from
+        flags (int, optional): zmq flags (e.g., zmq.NOBLOCK). Defaults to 0.
+
+    Returns:
+        bytes | dict: msgpack message or decoded binary message
+    """
+    frames = socket.recv_multipart(flags, copy=False)
+    if len(frames) == 1:
+        return frames[0].bytes
+    return decode_frames(frames)
+
+
+def decode_frames(frames: list) -> dict:
+    """Maps the frames of a binary message to NumPy arrays (no copy)
+
+    Args:
+        frames (list): optional app id, header frame, and one frame per field (zmq.Frame or bytes)
+
+    Returns:
+        dict: ranks, app id (if sent), and one read-only array per field
+    """
+    buffers = [memoryview(frame.buffer if hasattr(frame, "buffer") else frame) for frame in frames]
+    data = {}
+    if len(buffers) == 2 + len(FIELDS):
+        data["app"] = bytes(buffers[0]).decode()
+        buffers = buffers[1:]
+    if len(buffers) != 1 + len(FIELDS) or len(buffers[0]) < HEADER.size:
+        raise ValueError(f"Binary message needs a header and {len(FIELDS)} fields, got {len(buffers)} frames")
+    magic, ranks, n = HEADER.unpack(buffers[0][: HEADER.size])
+    if magic != MAGIC:
+        raise ValueError(f"Unknown message format {magic!r}")
+
+    data["ranks"] = ranks
+    for field, buffer in zip(FIELDS, buffers[1:]):
+        data[field] = np.frombuffer(buffer, dtype="<f8", count=n)
+    return data
+
+
+def encode_frames(b, ts, te, ranks: int = 0, app: str = "") -> list:
+    """Creates the frames of a binary message (see decode_frames). Send them with
+    socket.send_multipart(frames, copy=False)
+
+    Args:
+        b (array-like): bandwidth
+        ts (array-like): start times
+        te (array-like): end times
+        ranks (int, optional): number of ranks. Defaults to 0.
+        app (str, optional): id of the application. Defaults to "" (not sent).
+
+    Returns:
+        list: header and field frames
+    """
+    fields = [np.ascontiguousarray(x, dtype="<f8") for x in (b, ts, te)]
+    n = len(fields[0])
+    if any(len(x) != n for x in fields):
+        raise ValueError("b, ts, and te must have the same length")
+    frames = [HEADER.pack(MAGIC, ranks, n)] + fields
+    return [app.encode()] + frames if app else frames
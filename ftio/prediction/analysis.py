@@ -7,7 +7,29 @@ from ftio.cli import ftio_core
 from ftio.prediction.helper import get_dominant, get_hits
 from ftio.plot.units import set_unit
 
-def ftio_process(queue: Queue, count, hits, start_time, aggregated_bytes, args, msgs=None) -> None:
+_STATES = {}
+
+
+def get_state(key: str = "default") -> dict:
+    """Returns the state with the key that persists between predictions (e.g., the
+    sliding DFT), creating it on the first call. As the trackers of the probability
+    analysis, the states are kept for the lifetime of the process (e.g., a worker of
+    the predictor) and are never sent between processes
+
+    Args:
+        key (str, optional): name of the state. Defaults to "default".
+
+    Returns:
+        dict: the state
+    """
+    if key not in _STATES:
+        _STATES[key] = {}
+    return _STATES[key]
+
+
+def ftio_process(
+    queue: Queue, count, hits, start_time, aggregated_bytes, args, msgs=None, state=None, ticket=None, on_applied=None
+) -> None:
     """Perform a single prediction
 
     Args:
@@ -18,16 +40,51 @@ def ftio_process(queue: Queue, count, hits, start_time, aggregated_bytes, args,
         start_time (Manager().Value): start time window for ftio
         aggregated_bytes (Manager().Value): total bytes transferred so far
         args (list[str]): additional arguments passed to ftio
+        msgs (list, optional): ZMQ messages. Defaults to None.
+        state (dict, optional): state that persists between predictions. Defaults to None
+            (state of the process, see get_state).
+        ticket (Ticket, optional): sequence number from the scheduler. The result is dropped
+            if a newer prediction was already applied. Defaults to None.
+        on_applied (Callable, optional): called after the result was applied, still under
+            the lock of the ticket (e.g., to collect and publish the result in the order
+            of the sequence numbers). Defaults to None.
     """
     console = Console()
     console.print(f'[purple][PREDICTOR] (#{count.value}):[/]  Started')
-    # Modify the arguments
-    args.extend(['-e', 'no'])
-    args.extend(['-ts', f'{start_time.value:.2f}'])
+    # Modify the arguments (copy, as workers of a WorkerPool reuse the list)
+    args = args + ['-e', 'no', '-ts', f'{start_time.value:.2f}']
     
     # perform prediction
-    prediction, args = ftio_core.main(args,msgs)
-    
+    if state is None:
+        state = get_state()
+    prediction, args = ftio_core.main(args, msgs, state)
+
+    # never apply a result that is older than an already applied one
+    if ticket is not None and not ticket.acquire():
+        console.print(f'[purple][PREDICTOR] (seq {ticket.seq}):[/][yellow] Dropped, a newer prediction was already applied[/]')
+        return
+    try:
+        apply_prediction(queue, count, hits, start_time, aggregated_bytes, args, prediction, console)
+        if on_applied is not None:
+            on_applied()
+    finally:
+        if ticket is not None:
+            ticket.release()
+
+
+def apply_prediction(queue: Queue, count, hits, start_time, aggregated_bytes, args, prediction: dict, console: Console) -> None:
+    """Saves the prediction and updates the shared state (hits, start time, count)
+
+    Args:
+        queue (Manager().Queue): queue for FTIO data
+        count (Manager().Value): number of prediction
+        hits (Manager().Value): hits indicating how often a dominant frequency was found
+        start_time (Manager().Value): start time window for ftio
+        aggregated_bytes (Manager().Value): total bytes transferred so far
+        args (argparse): parsed arguments of the prediction
+        prediction (dict): result from FTIO
+        console (Console): console to print to
+    """
     # get data
     freq = get_dominant(prediction) #just get a single dominant value
     hits = get_hits(prediction,count.value,hits)
@@ -42,6 +99,24 @@ def ftio_process(queue: Queue, count, hits, start_time, aggregated_bytes, args,
     count.value += 1
 
 
+def warm_up(args: list[str]) -> None:
+    """Loads the parsers and the compiled numba kernels used by ftio_process, so that
+    the first prediction of a persistent worker only costs the analysis itself
+
+    Args:
+        args (list[str]): arguments passed to ftio
+    """
+    from ftio.parse.args import parse_args
+    from ftio.parse.bandwidth import overlap
+    from ftio.freq.discretize import find_lowest_time_change
+    # DBSCAN groups the predictions in find_probability
+    import sklearn.cluster  # noqa: F401
+
+    _ = parse_args(args)
+    _ = overlap(np.ones(2), np.array([0.0, 1.0]), np.array([1.0, 2.0]))
+    _ = find_lowest_time_change(np.array([0.0, 1.0]))
+
+
 def data_analysis(args, prediction, freq, count, hits, text:str) -> tuple[str, float]:
     # average data/data processing
     t_s = prediction['t_start']
@@ -63,7 +138,10 @@ def data_analysis(args, prediction, freq, count, hits, text:str) -> tuple[str, f
         # adaptive time window
         if args.window_adaptation:
             if hits.value > args.frequency_hits: 
-                if True: #np.abs(avr_bytes - (total_bytes-aggregated_bytes.value)) < 100:
+                if args.sliding_dft and args.ts:
+                    # window already adapted, the sliding DFT moves it forward
+                    t_s = args.ts
+                elif True: #np.abs(avr_bytes - (total_bytes-aggregated_bytes.value)) < 100:
                     tmp = t_e - 3*1/freq
                     t_s = tmp if tmp > 0 else 0
                     text += f'[purple][PREDICTOR] (#{count.value}):[/][green] Adjusting start time to {t_s} sec\n[/]'
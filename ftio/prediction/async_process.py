@@ -2,7 +2,7 @@
 """
 from __future__ import annotations
 from typing import Callable
-from multiprocessing import Process
+from multiprocessing import Process, Queue
 
 def handle_in_process(function: Callable, args) -> Process:
     """Handle function in a dedicated process
@@ -40,4 +40,68 @@ def join_procs(procs:list) -> list:
                 p.join()
                 procs.remove(p)
                 # print(f"Process {p} JOINED")
-    return procs
\ No newline at end of file
+    return procs
+
+
+class WorkerPool:
+    """Pool of long-lived processes that execute `function` for every submitted task.
+    In contrast to handle_in_process, the workers stay alive between tasks. Hence,
+    the imported modules and compiled kernels are only loaded once per worker.
+    """
+
+    def __init__(
+        self, function: Callable, args: tuple = (), n_workers: int = 1,
+        warm_up: Callable = None, warm_up_args: tuple = ()
+    ):
+        """init function
+
+        Args:
+            function (Callable): function executed for each task as function(*args, *task)
+            args (tuple, optional): arguments shared by all tasks. Defaults to ().
+            n_workers (int, optional): number of worker processes. Defaults to 1.
+            warm_up (Callable, optional): executed once by each worker before the first task. Defaults to None.
+            warm_up_args (tuple, optional): arguments passed to warm_up. Defaults to ().
+        """
+        self.tasks = Queue()
+        self.procs = [
+            Process(target=worker_loop, args=(function, args, self.tasks, warm_up, warm_up_args), daemon=True)
+            for _ in range(max(1, n_workers))
+        ]
+        for p in self.procs:
+            p.start()
+
+    def submit(self, *task) -> None:
+        """Queues a task. The first free worker executes it. The task is pickled in the
+        background, so Manager proxies in it must stay referenced by the caller."""
+        self.tasks.put(task)
+
+    def close(self, timeout: float = 5) -> None:
+        """Lets the workers finish the queued tasks and stops them"""
+        for _ in self.procs:
+            self.tasks.put(None)
+        for p in self.procs:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+
+
+def worker_loop(function: Callable, args: tuple, tasks: Queue, warm_up: Callable = None, warm_up_args: tuple = ()) -> None:
+    """Executes the tasks from the queue until None is received
+
+    Args:
+        function (Callable): function executed for each task
+        args (tuple): arguments shared by all tasks
+        tasks (Queue): task queue
+        warm_up (Callable, optional): executed once before the first task. Defaults to None.
+        warm_up_args (tuple, optional): arguments passed to warm_up. Defaults to ().
+    """
+    try:
+        if warm_up is not None:
+            warm_up(*warm_up_args)
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            function(*args, *task)
+    except KeyboardInterrupt:
+        pass
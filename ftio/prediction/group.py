@@ -2,8 +2,8 @@
 """
 
 from __future__ import annotations
+import random
 import numpy as np
-from sklearn.cluster import DBSCAN
 from ftio.prediction.helper import get_dominant
 
 def group_step(data: list[dict]) -> tuple[list[dict], int]:
@@ -83,6 +83,7 @@ def group_dbscan(data: list[dict]) -> tuple[list[dict], int]:
             counter = 0
             out[0]["group"] = counter
         else:
+            from sklearn.cluster import DBSCAN
             X = np.column_stack((freq, freq))
             model = DBSCAN(eps=tol, min_samples=2).fit(X)
             counter = max(model.labels_)
@@ -94,3 +95,248 @@ def group_dbscan(data: list[dict]) -> tuple[list[dict], int]:
 
     return out, counter
 
+
+
+class SortedTree:
+    """Sorted keys with a value each in a randomized balanced search tree (treap).
+    Each node keeps the size and the minimal value of its subtree, so inserting,
+    removing, ranking, and the minimal value in a key range take O(log n) (expected).
+    """
+
+    class Node:
+        __slots__ = ("key", "value", "prio", "left", "right", "size", "low")
+
+        def __init__(self, key, value, prio: float):
+            self.key = key
+            self.value = value
+            self.prio = prio
+            self.left = None
+            self.right = None
+            self.size = 1
+            self.low = value
+
+    def __init__(self, seed: int = 0):
+        self.root = None
+        self.rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self.root.size if self.root else 0
+
+    @staticmethod
+    def pull(node: Node) -> Node:
+        node.size = 1
+        node.low = node.value
+        for child in (node.left, node.right):
+            if child is not None:
+                node.size += child.size
+                node.low = min(node.low, child.low)
+        return node
+
+    def split(self, node: Node, key) -> tuple[Node, Node]:
+        """splits into the keys smaller than key and the others"""
+        if node is None:
+            return None, None
+        if node.key < key:
+            node.right, right = self.split(node.right, key)
+            return self.pull(node), right
+        left, node.left = self.split(node.left, key)
+        return left, self.pull(node)
+
+    def merge(self, left: Node, right: Node) -> Node:
+        """merges two trees, all keys of left are smaller than the ones of right"""
+        if left is None or right is None:
+            return left if right is None else right
+        if left.prio > right.prio:
+            left.right = self.merge(left.right, right)
+            return self.pull(left)
+        right.left = self.merge(left, right.left)
+        return self.pull(right)
+
+    def insert(self, key, value=0) -> None:
+        left, right = self.split(self.root, key)
+        node = self.Node(key, value, self.rng.random())
+        self.root = self.merge(self.merge(left, node), right)
+
+    def remove(self, key) -> None:
+        self.root = self._remove(self.root, key)
+
+    def _remove(self, node: Node, key) -> Node:
+        if node is None:
+            return None
+        if node.key == key:
+            return self.merge(node.left, node.right)
+        if key < node.key:
+            node.left = self._remove(node.left, key)
+        else:
+            node.right = self._remove(node.right, key)
+        return self.pull(node)
+
+    def rank(self, key) -> int:
+        """number of keys smaller than key"""
+        out = 0
+        node = self.root
+        while node is not None:
+            if node.key < key:
+                out += 1 + (node.left.size if node.left else 0)
+                node = node.right
+            else:
+                node = node.left
+        return out
+
+    def lower(self, key):
+        """largest key smaller than key (None if there is none)"""
+        out = None
+        node = self.root
+        while node is not None:
+            if node.key < key:
+                out = node.key
+                node = node.right
+            else:
+                node = node.left
+        return out
+
+    def higher(self, key):
+        """smallest key larger than key (None if there is none)"""
+        out = None
+        node = self.root
+        while node is not None:
+            if key < node.key:
+                out = node.key
+                node = node.left
+            else:
+                node = node.right
+        return out
+
+    def first(self):
+        node = self.root
+        while node.left is not None:
+            node = node.left
+        return node.key
+
+    def last(self):
+        node = self.root
+        while node.right is not None:
+            node = node.right
+        return node.key
+
+    def low(self, start, end) -> float:
+        """minimal value of the keys in [start, end) (end=None: no upper bound)"""
+        left, right = self.split(self.root, start)
+        middle, right = self.split(right, end) if end is not None else (right, None)
+        out = middle.low if middle is not None else np.inf
+        self.root = self.merge(self.merge(left, middle), right)
+        return out
+
+    def keys_from(self, start) -> list:
+        """keys that are not smaller than start, in order. Takes O(log n + k) for k keys"""
+        out = []
+        stack = []
+        node = self.root
+        while node is not None:
+            if node.key < start:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        while stack:
+            node = stack.pop()
+            out.append(node.key)
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
+        return out
+
+
+class OnlineGroups:
+    """Incremental version of group_dbscan. The predictions are added one at a time and
+    the groups are derived from a sorted index of the dominant frequencies instead of
+    running DBSCAN on all predictions.
+
+    In one dimension, DBSCAN with min_samples=2 has no border points: two neighboring
+    frequencies belong to the same group if their distance is at most eps, and a
+    frequency without a neighbor in eps is noise. Hence, the groups are the runs of
+    the sorted frequencies that are not split by a gap larger than eps. The frequencies
+    and the gaps between neighbors are kept in sorted trees (see SortedTree), so adding
+    a prediction takes O(log n). The gaps that split the runs are the largest ones, and
+    the size and the first prediction of each run are range queries on the tree of the
+    frequencies, so the groups take O(g log n) for g groups. The tolerance (eps) is
+    updated from running sums of the time windows. As DBSCAN, the groups are numbered in
+    the order of their first prediction.
+    """
+
+    def __init__(self):
+        # keys (frequency, index of the prediction), values: index of the prediction
+        self.freqs = SortedTree()
+        # keys (distance, left key, right key) of neighboring frequencies
+        self.gaps = SortedTree()
+        self.n = 0
+        self.tol_max = 0
+        self.old_window = 0
+        # Welford's algorithm for the mean and std of the windows
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @staticmethod
+    def distance(a: float, b: float) -> float:
+        # group_dbscan clusters the points (f, f)
+        d = b - a
+        return np.sqrt(d * d + d * d)
+
+    def add(self, prediction: dict) -> None:
+        """Adds a prediction (predictions without a dominant frequency are ignored)
+
+        Args:
+            prediction (dict): prediction as in group_dbscan
+        """
+        if len(prediction["dominant_freq"]) < 1:
+            return
+        time_window = prediction["t_end"] - prediction["t_start"]
+        res = 1 / time_window - 1 / self.old_window if self.old_window != 0 else 0
+        self.tol_max = max(abs(res), self.tol_max)
+        self.old_window = time_window
+        self.n += 1
+        delta = time_window - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (time_window - self.mean)
+
+        key = (get_dominant(prediction), self.n - 1)
+        left, right = self.freqs.lower(key), self.freqs.higher(key)
+        if left is not None and right is not None:
+            self.gaps.remove((self.distance(left[0], right[0]), left, right))
+        if left is not None:
+            self.gaps.insert((self.distance(left[0], key[0]), left, key))
+        if right is not None:
+            self.gaps.insert((self.distance(key[0], right[0]), key, right))
+        self.freqs.insert(key, key[1])
+
+    def tol(self) -> float:
+        """eps of DBSCAN (see group_dbscan)"""
+        std = np.sqrt(self.m2 / self.n) if self.n > 0 else 0
+        tol_min = 1 / std if std != 0 else 1e-8
+        tol = 2 * self.tol_max if self.tol_max < 3 * tol_min else np.abs(1 - (tol_min / self.mean)) * self.tol_max
+        return tol if tol > 0 and tol != np.inf else 1e-8
+
+    def groups(self) -> list[tuple[float, float, int]]:
+        """Groups of the predictions so far
+
+        Returns:
+            list[tuple[float, float, int]]: minimal and maximal frequency and number of
+                predictions of each group, ordered by the group number of group_dbscan
+        """
+        if self.n == 0:
+            return []
+        if self.n == 1:
+            f = self.freqs.first()[0]
+            return [(f, f, 1)]
+        # gaps larger than eps split the runs, each run starts at the right key of a gap
+        starts = [self.freqs.first()] + sorted(right for _, _, right in self.gaps.keys_from((self.tol(), (np.inf,), (np.inf,))))
+        ends = starts[1:] + [None]
+        runs = []
+        for start, end in zip(starts, ends):
+            count = (self.freqs.rank(end) if end is not None else self.n) - self.freqs.rank(start)
+            # single frequencies are noise
+            if count >= 2:
+                last = self.freqs.lower(end) if end is not None else self.freqs.last()
+                runs.append((self.freqs.low(start, end), start[0], last[0], count))
+        return [(f_min, f_max, count) for _, f_min, f_max, count in sorted(runs)]
@@ -1,11 +1,16 @@
 from __future__ import annotations
 import os
+import glob
 import fcntl
 import signal
-from time import sleep
+import select
+import struct
+import ctypes
+import ctypes.util
+from fnmatch import fnmatch
+from time import sleep, monotonic
 from rich.console import Console
 from ftio.prediction.async_process import join_procs
-from time import sleep
 
 CONSOLE = Console()
 
@@ -19,93 +24,308 @@ def monitor(name: str, _cached_stamp: str, procs: list = []) ->  tuple[str, list
         procs (list, optional): List of process to join. Defaults to [].
 
     Returns:
-        str: _description_
+        tuple[str, list]: new time stamp and the processes that are still running
     """
-    return monitor_stat(name, _cached_stamp, procs)
-    # try:
-    #     return monitor_stat(name, _cached_stamp, procs)
-    # finally:
-    #     return monitor_fcntl(name, _cached_stamp, procs)
+    return monitor_watch(name, _cached_stamp, procs)
 
 
 #! Method 1
 def monitor_stat(name: str, _cached_stamp: str, procs: list) -> tuple[str, list]:
-    """Monitors a file for changes
+    """Monitors a file for changes by polling its time stamp
 
     Args:
-        name (str): _description_
+        name (str): filename
         _cached_stamp (str): change time stamp
         procs: list or process
 
     Returns:
-        str: _description_
+        tuple[str, list]: new time stamp and the processes that are still running
     """
     if _cached_stamp == "":
-        stream = os.popen(f"stat -c %z {name} 2>&1")
-        stamp = stream.read()
+        stamp = file_stamp(name)
         CONSOLE.print(f"[purple][PREDICTOR]:[/] Monitoring file {name}")
         CONSOLE.print(f"[purple][PREDICTOR]:[/] Stamp is {stamp}")
         return stamp, procs
     else:
-        sleep(1)
         while True:
             procs = join_procs(procs)
-            stream = os.popen(f"stat -c %z {name} 2>&1")
-            stamp = stream.read()
+            stamp = file_stamp(name)
             if stamp != _cached_stamp:
                 CONSOLE.print(
                     f"\n[purple][PREDICTOR]:[/][red bold]Stamp changed[/] to {stamp}"
                 )
-                sleep(0.2)
                 return stamp, procs
+            sleep(0.05)
 
-def monitor_list(name: list, n_buffers, _cached_stamp: dict={}, procs: list = []) -> tuple[dict, list]:
-    """Monitors a file for changes
+
+#! Method 3
+def monitor_watch(name: str, _cached_stamp: str, procs: list) -> tuple[str, list]:
+    """Monitors a file for changes with a FileWatcher (inotify or os.stat polling).
+    The watcher is created on the first call and kept for the following ones, so no
+    change is missed while a prediction runs.
 
     Args:
-        name (str): _description_
+        name (str): filename
         _cached_stamp (str): change time stamp
         procs: list or process
 
     Returns:
-        str: _description_
+        tuple[str, list]: new time stamp and the processes that are still running
+    """
+    w = get_watcher(name)
+    if _cached_stamp == "":
+        stamp = file_stamp(name)
+        CONSOLE.print(f"[purple][PREDICTOR]:[/] Monitoring file {name} ({w.backend})")
+        CONSOLE.print(f"[purple][PREDICTOR]:[/] Stamp is {stamp}")
+        return stamp, procs
+
+    while True:
+        procs = join_procs(procs)
+        if w.wait(timeout=0.5):
+            stamp = file_stamp(name)
+            if stamp != _cached_stamp:
+                CONSOLE.print(
+                    f"\n[purple][PREDICTOR]:[/][red bold]Stamp changed[/] to {stamp}"
+                )
+                return stamp, procs
+
+
+def monitor_list(name: list, n_buffers, _cached_stamp: dict={}, procs: list = []) -> tuple[dict, list]:
+    """Monitors several files (e.g., the GekkoFS buffers) and returns once n_buffers
+    of them changed
+
+    Args:
+        name (list): filenames
+        n_buffers (int): number of files that need to change
+        _cached_stamp (dict): change time stamp of each file
+        procs: list or process
+
+    Returns:
+        tuple[dict, list]: new time stamps and the processes that are still running
     """
+    w = get_watcher(name)
     if not _cached_stamp:
         stamp = {}
-        for i in name:
-            stream = os.popen(f"stat -c %z {i} 2>&1")
-            file_stamp = stream.read()
-            stamp[i] = file_stamp
+        for index, i in enumerate(name):
+            stamp[i] = file_stamp(i)
             CONSOLE.print(
-                f"[purple][PREDICTOR]:[/] Monitoring file {name.index(i)}/{n_buffers} {i}"
+                f"[purple][PREDICTOR]:[/] Monitoring file {index}/{n_buffers} {i} ({w.backend})\n"
                 f"[purple][PREDICTOR]:[/] Stamp is {stamp[i]}"
                 )
         return stamp, procs
-    else:
-        sleep(1)
-        seen = []
-        counter = n_buffers
+
+    files = {os.path.abspath(i): i for i in name}
+    seen = set()
+    while True:
+        procs = join_procs(procs)
+        for path in w.wait(timeout=0.5):
+            i = files.get(path)
+            if i is None or i in seen:
+                continue
+            stamp = file_stamp(i)
+            if stamp != _cached_stamp.get(i):
+                seen.add(i)
+                CONSOLE.print(
+                    f"[purple][PREDICTOR]:[/][red bold]Stamp changed[/] to {stamp}\n"
+                    f"[purple][PREDICTOR]:[/] {len(seen)}/{n_buffers} files changed"
+                    )
+
+        if len(seen) >= min(n_buffers, len(name)):
+            return {i: file_stamp(i) for i in name}, procs
+
+
+def file_stamp(name: str) -> str:
+    """Change time stamp of a file (ns resolution)
+
+    Args:
+        name (str): filename
+
+    Returns:
+        str: time stamp, or "missing" if the file does not exist
+    """
+    try:
+        return str(os.stat(name).st_ctime_ns)
+    except OSError:
+        return "missing"
+
+
+_WATCHERS = {}
+
+
+def get_watcher(name: str | list) -> FileWatcher:
+    """Returns the FileWatcher of the file(s), creating it on the first call
+
+    Args:
+        name (str | list): filename or list of filenames
+
+    Returns:
+        FileWatcher: watcher of the files
+    """
+    key = (name,) if isinstance(name, str) else tuple(name)
+    if key not in _WATCHERS:
+        _WATCHERS[key] = FileWatcher(list(key))
+    return _WATCHERS[key]
+
+
+# inotify constants (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+IN_EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Watches one or many files for changes. On Linux, inotify (through ctypes) wakes
+    the watcher as soon as a file is written. The parent directories are watched, so
+    files that are created or replaced later are also seen, and the names can contain
+    wildcards (e.g., write*.msgpack). Where inotify is not available, the time stamps
+    are polled with os.stat. Bursts of writes are debounced into a single change.
+    """
+
+    def __init__(
+        self,
+        names: str | list,
+        debounce: float = 0.01,
+        max_delay: float = 0.1,
+        poll: float = 0.05,
+        backend: str = "auto",
+    ):
+        """init function
+
+        Args:
+            names (str | list): filename(s), may contain wildcards
+            debounce (float, optional): quiet time in s that ends a burst. Defaults to 0.01.
+            max_delay (float, optional): max. time in s a burst delays the wake-up. Defaults to 0.1.
+            poll (float, optional): polling interval in s of the os.stat fallback. Defaults to 0.05.
+            backend (str, optional): "auto", "inotify", or "stat". Defaults to "auto".
+        """
+        if isinstance(names, str):
+            names = [names]
+        self.patterns = [os.path.abspath(n) for n in names]
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll = poll
+        self.fd = -1
+        self.backend = "stat"
+        if backend != "stat":
+            try:
+                self._init_inotify()
+                self.backend = "inotify"
+            except OSError:
+                if backend == "inotify":
+                    raise
+        if self.backend == "stat":
+            self.stamps = self._stat()
+
+    def _init_inotify(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        for folder in {os.path.dirname(p) for p in self.patterns}:
+            wd = libc.inotify_add_watch(fd, os.fsencode(folder), mask)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(errno, f"inotify_add_watch failed for {folder}")
+            self.dirs[wd] = folder
+        self.fd = fd
+
+    def wait(self, timeout: float | None = None) -> list[str]:
+        """Blocks until at least one of the files changed
+
+        Args:
+            timeout (float | None, optional): max. time to wait in s. Defaults to None (forever).
+
+        Returns:
+            list[str]: absolute names of the changed files (empty on timeout)
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        if self.backend == "inotify":
+            return self._wait_inotify(deadline)
+        return self._wait_stat(deadline)
+
+    def _wait_inotify(self, deadline: float | None) -> list[str]:
+        changed = set()
+        while not changed:
+            remaining = None if deadline is None else max(0.0, deadline - monotonic())
+            if not select.select([self.fd], [], [], remaining)[0]:
+                return []
+            changed |= self._read()
+
+        # debounce: collect the rest of the burst
+        end = monotonic() + self.max_delay
+        while monotonic() < end and select.select([self.fd], [], [], max(0.0, min(self.debounce, end - monotonic())))[0]:
+            changed |= self._read()
+
+        return sorted(changed)
+
+    def _read(self) -> set:
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + IN_EVENT.size <= len(buffer):
+            wd, mask, _, length = IN_EVENT.unpack_from(buffer, offset)
+            offset += IN_EVENT.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self._expand())
+            elif wd in self.dirs and name:
+                path = os.path.join(self.dirs[wd], os.fsdecode(name))
+                if any(fnmatch(path, p) for p in self.patterns):
+                    changed.add(path)
+        return changed
+
+    def _wait_stat(self, deadline: float | None) -> list[str]:
         while True:
-            procs = join_procs(procs)
-            for _,i in enumerate(_cached_stamp):
-                stream = os.popen(f"stat -c %z {i} 2>&1")
-                file_stamp = stream.read()
-                if file_stamp != _cached_stamp[i] and  _cached_stamp[i] not in seen:
-                    counter = counter - 1
-                    seen.append(_cached_stamp[i])
-                    CONSOLE.print(
-                        f"[purple][PREDICTOR]:[/][red bold]Stamp changed[/] to {file_stamp}"
-                        f"[purple][PREDICTOR]:[/] {n_buffers - counter}/{n_buffers} files changed"
-                        )
-
-            if counter == 0:
-                for i in name:
-                    stream = os.popen(f"stat -c %z {i} 2>&1")
-                    file_stamp = stream.read()
-                    _cached_stamp[i] = file_stamp
-                return _cached_stamp, procs
-            
-            sleep(0.2)
+            stamps = self._stat()
+            changed = {p for p in stamps.keys() | self.stamps.keys() if stamps.get(p) != self.stamps.get(p)}
+            if changed:
+                # debounce: wait until the time stamps are stable
+                end = monotonic() + self.max_delay
+                while monotonic() < end:
+                    sleep(self.debounce)
+                    new = self._stat()
+                    if new == stamps:
+                        break
+                    changed |= {p for p in new if new[p] != stamps.get(p)}
+                    stamps = new
+                self.stamps = stamps
+                return sorted(changed)
+            if deadline is not None and monotonic() >= deadline:
+                return []
+            sleep(self.poll)
+
+    def _expand(self) -> list[str]:
+        files = []
+        for p in self.patterns:
+            files.extend(glob.glob(p) if glob.has_magic(p) else [p])
+        return files
+
+    def _stat(self) -> dict:
+        return {p: file_stamp(p) for p in self._expand()}
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __del__(self):
+        self.close()
+
 
 #! Method 2
 def monitor_fcntl(name: str, _cached_stamp: str, procs: list) ->  tuple[str, list]:
@@ -4,11 +4,12 @@ from concurrent.futures import ProcessPoolExecutor
 import ftio.prediction.monitor as pm
 from ftio.prediction.probability_analysis import find_probability
 from ftio.prediction.helper import  print_data
-from ftio.prediction.analysis import ftio_process
+from ftio.prediction.analysis import ftio_process, warm_up
+from ftio.parse.args import parse_args
 # from ftio.prediction.async_process import handle_in_process
 
 
-def predictor_with_pools(filename, data, queue, count, hits, start_time, aggregated_bytes, args):
+def predictor_with_pools(filename, data, queue, count, hits, start_time, aggregated_bytes, args, state=None):
     """performs prediction in ProcessPoolExecuter. FTIO is a submitted future and probability is calculated as a callback
 
     Args:
@@ -24,20 +25,23 @@ def predictor_with_pools(filename, data, queue, count, hits, start_time, aggrega
     # Init: Monitor a file
     stamp, _ = pm.monitor(filename,"")
 
-    # Loop and predict if changes occur
+    # Loop and predict if changes occur. The executor (and its warm workers) is kept
+    # alive across predictions
     try:
-        while True:
-            with ProcessPoolExecutor(max_workers=1) as executor:
+        with ProcessPoolExecutor(
+            max_workers=max(1, parse_args(args).pool_size), initializer=warm_up, initargs=(args,)
+        ) as executor:
+            while True:
                 # monitor
                 stamp, _ = pm.monitor(filename, stamp)
-                future = executor.submit(ftio_future, data, queue, count, hits, start_time, aggregated_bytes, args)
+                future = executor.submit(ftio_future, data, queue, count, hits, start_time, aggregated_bytes, args, state)
                 future.add_done_callback(probability_callback)
     except KeyboardInterrupt:
         print_data(data)
         print("-- done -- ")
 
 
-def ftio_future(data, queue , count, hits, start_time, aggregated_bytes, args: list[str]) -> list[dict]:
+def ftio_future(data, queue , count, hits, start_time, aggregated_bytes, args: list[str], state=None) -> list[dict]:
     """Performs prediction made up of two part: (1) Executes FTIO and (2) appends to data the value
 
     Args:
@@ -49,7 +53,7 @@ def ftio_future(data, queue , count, hits, start_time, aggregated_bytes, args: l
         aggregated_bytes (Manager().Value): total bytes transferred so far
         args (list[str]): additional arguments passed to ftio
     """
-    ftio_process(queue, count, hits, start_time, aggregated_bytes, args)
+    ftio_process(queue, count, hits, start_time, aggregated_bytes, args, state=state)
     while not queue.empty():
         data.append(queue.get())
     return data
@@ -1,11 +1,15 @@
+from __future__ import annotations
 import numpy as np
 from rich.console import Console
 import ftio.prediction.group as gp
 from ftio.prediction.helper import get_dominant
 from ftio.prediction.probability import Probability
 
+# trackers of the current process, see get_tracker
+_TRACKERS = {}
 
-def find_probability(data: list[dict], method:str = "db") -> list:
+
+def find_probability(data: list[dict], method:str = "db", tracker: ProbabilityTracker = None) -> list:
     """Calculates the conditional probability that expresses
     how probable the frequency (event A) is given that the signal
     is periodic occurred (probability B).
@@ -16,10 +20,17 @@ def find_probability(data: list[dict], method:str = "db") -> list:
 
     Args:
         data (dict): contacting predictions
+        method (str, optional): grouping method (db or step). Defaults to "db".
+        tracker (ProbabilityTracker, optional): groups the predictions incrementally
+            (only for db). Only the predictions added to data since the last call
+            are read. Defaults to None.
 
     Returns:
-        None
+        list[Probability]: probability of each group
     """
+    if tracker is not None and "db" in method:
+        return tracker.update(data)
+
     p_b = 0
     p_a = []
     p_a_given_b = 0
@@ -64,4 +75,74 @@ def find_probability(data: list[dict], method:str = "db") -> list:
                 prob.display()
                 out.append(prob)
 
-    return out
\ No newline at end of file
+    return out
+
+
+def get_tracker(key: str = "default") -> ProbabilityTracker:
+    """Returns the tracker with the key, creating it on the first call. The trackers
+    are kept for the lifetime of the process (e.g., a worker of the predictor)
+
+    Args:
+        key (str, optional): name of the tracker. Defaults to "default".
+
+    Returns:
+        ProbabilityTracker: the tracker
+    """
+    if key not in _TRACKERS:
+        _TRACKERS[key] = ProbabilityTracker()
+    return _TRACKERS[key]
+
+
+class ProbabilityTracker:
+    """Incremental find_probability (method db). Remembers the number of predictions
+    seen so far and adds only the new ones to the groups (see OnlineGroups). The
+    predictions must only be appended (as the data of the predictor)."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.seen = 0
+        self.periodic = 0
+        self.groups = gp.OnlineGroups()
+
+    def add(self, prediction: dict) -> None:
+        self.seen += 1
+        if len(prediction["dominant_freq"]) >= 1:
+            self.periodic += 1
+        self.groups.add(prediction)
+
+    def update(self, data: list[dict]) -> list:
+        """Adds the new predictions in data and calculates the probabilities
+
+        Args:
+            data (list[dict]): all predictions so far (list or Manager().list)
+
+        Returns:
+            list[Probability]: probability of each group
+        """
+        n = len(data)
+        if n < self.seen:
+            self.reset()
+        if n > self.seen:
+            for prediction in data[self.seen : n]:
+                self.add(prediction)
+        return self.probabilities()
+
+    def probabilities(self) -> list:
+        """Same output as find_probability with the predictions added so far"""
+        out = []
+        if self.seen == 0:
+            return out
+        p_b_given_a = 1
+        p_b = self.periodic / self.seen
+        CONSOLE = Console()
+        CONSOLE.print(f"[purple][PREDICTOR]:[/] P(periodic) = {p_b*100:.3f}%")
+        for f_min, f_max, count in self.groups.groups():
+            p_a = count / self.seen
+            p_a_given_b = p_b_given_a * p_a / p_b if p_b > 0 else 0
+            prob = Probability(f_min, f_max)
+            prob.set(p_b, p_a, p_a_given_b, p_b_given_a)
+            prob.display()
+            out.append(prob)
+        return out
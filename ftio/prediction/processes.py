@@ -1,16 +1,18 @@
 """Performs prediction with Pools (ProcessPoolExecutor) and a callback mechanism"""
 from __future__ import annotations
 import ftio.prediction.monitor as pm
-from ftio.prediction.probability_analysis import find_probability
+from ftio.prediction.probability_analysis import find_probability, get_tracker
 from ftio.prediction.helper import print_data, export_extrap
-from ftio.prediction.analysis import ftio_process
-from ftio.prediction.async_process import handle_in_process
+from ftio.prediction.analysis import ftio_process, warm_up
+from ftio.prediction.async_process import handle_in_process, WorkerPool
+from ftio.prediction.scheduler import CoalescingScheduler
+from ftio.parse.args import parse_args
 
 # from ftio.prediction.async_process import handle_in_process
 
 
 def predictor_with_processes(
-    filename, data, queue, count, hits, start_time, aggregated_bytes, args
+    filename, data, queue, count, hits, start_time, aggregated_bytes, args, state=None
 ):
     """performs prediction in ProcessPoolExecuter. FTIO is a submitted future and probability is calculated as a callback
 
@@ -23,8 +25,10 @@ def predictor_with_processes(
         start_time (Manager().Value): start time window for ftio
         aggregated_bytes (Manager().Value): total bytes transferred so far
         args (list[str]): additional arguments passed to ftio
+        state (dict, optional): state that persists between predictions (default: state of the worker, see get_state)
     """
-    procs = []
+    pool = start_pool(data, queue, count, hits, start_time, aggregated_bytes, args)
+    scheduler = start_scheduler(pool, (data, queue, count, hits, start_time, aggregated_bytes, args), state, args)
     # Init: Monitor a file
     stamp,_ = pm.monitor(filename, "")
 
@@ -32,22 +36,71 @@ def predictor_with_processes(
     try:
         while True:
             # monitor
-            stamp, procs = pm.monitor(filename, stamp, procs)
-            # launch prediction_process
-            procs.append(
-                handle_in_process(
-                    prediction_process,
-                    args=(data, queue, count, hits, start_time, aggregated_bytes, args)
-                )
-            )
+            stamp, _ = pm.monitor(filename, stamp)
+            # launch prediction_process (or mark it pending if all slots are busy)
+            scheduler.submit()
     except KeyboardInterrupt:
+        if pool:
+            pool.close()
+        scheduler.shutdown()
         print_data(data)
         export_extrap(data)
         print("-- done -- ")
 
 
+def start_pool(data, queue, count, hits, start_time, aggregated_bytes, args: list[str]) -> WorkerPool | None:
+    """Starts persistent workers that execute prediction_process (see --pool_size)
+
+    Args:
+        data (Manager().list): List of dicts with all predictions so far
+        queue (Manager().Queue): queue for FTIO data
+        count (Manager().Value): number of prediction
+        hits (Manager().Value): hits indicating how often a dominant frequency was found
+        start_time (Manager().Value): start time window for ftio
+        aggregated_bytes (Manager().Value): total bytes transferred so far
+        args (list[str]): additional arguments passed to ftio
+
+    Returns:
+        WorkerPool | None: the pool, or None if a new process is started for each prediction
+    """
+    pool_size = parse_args(args).pool_size
+    if pool_size <= 0:
+        return None
+
+    return WorkerPool(
+        prediction_process,
+        (data, queue, count, hits, start_time, aggregated_bytes, args),
+        pool_size,
+        warm_up,
+        (args,),
+    )
+
+
+def start_scheduler(pool: WorkerPool | None, shared: tuple, state, args: list[str], merge=None) -> CoalescingScheduler:
+    """Creates the scheduler that launches prediction_process on the pool (or in a new
+    process if there is no pool). At most max(1, --pool_size) predictions run at once.
+
+    Args:
+        pool (WorkerPool | None): pool from start_pool
+        shared (tuple): data, queue, count, hits, start_time, aggregated_bytes, and args
+        state (dict): state that persists between predictions (None: state of the worker, see get_state)
+        args (list[str]): additional arguments passed to ftio
+        merge (Callable, optional): merges the pending job with a new one (see CoalescingScheduler). Defaults to None.
+
+    Returns:
+        CoalescingScheduler: the scheduler
+    """
+    def launch(msgs, ticket):
+        if pool:
+            pool.submit(msgs, state, ticket)
+            return None
+        return handle_in_process(prediction_process, args=(*shared, msgs, state, ticket))
+
+    return CoalescingScheduler(launch, parse_args(args).pool_size, merge)
+
+
 def prediction_process(
-    data, queue, count, hits, start_time, aggregated_bytes, args: list[str], msgs=None) -> None:
+    data, queue, count, hits, start_time, aggregated_bytes, args: list[str], msgs=None, state=None, ticket=None) -> None:
     """Performs prediction made up of two part: (1) Executes FTIO and (2) appends to data the value
 
     Args:
@@ -58,10 +111,26 @@ def prediction_process(
         start_time (Manager().Value): start time window for ftio
         aggregated_bytes (Manager().Value): total bytes transferred so far
         args (list[str]): additional arguments passed to ftio.py
+        msgs (list, optional): ZMQ messages. Defaults to None.
+        state (dict, optional): state that persists between predictions. Defaults to None
+            (state of the worker, see get_state).
+        ticket (Ticket, optional): sequence number from the scheduler. Defaults to None.
     """
-    ftio_process(queue, count, hits, start_time, aggregated_bytes, args, msgs)
-    while not queue.empty():
-        data.append(queue.get())
+    def collect() -> None:
+        # runs under the lock of the ticket, so the results are appended and published
+        # in the order of the sequence numbers
+        while not queue.empty():
+            data.append(queue.get())
+
+        # only the predictions added since the last call are read from data
+        prob = find_probability(data, tracker=get_tracker())
+        if "--result_endpoint" in args:
+            from ftio.prediction.publisher import publish_prediction
+            publish_prediction(parse_args(args).result_endpoint, data, prob)
 
-    _ = find_probability(data)
+    try:
+        ftio_process(queue, count, hits, start_time, aggregated_bytes, args, msgs, state, ticket, collect)
+    finally:
+        if ticket is not None:
+            ticket.finish()
     
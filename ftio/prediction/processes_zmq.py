@@ -3,18 +3,17 @@ from __future__ import annotations
 import zmq
 import subprocess
 import time
-from ftio.prediction.async_process import join_procs
-from ftio.prediction.processes import prediction_process
+from ftio.prediction.processes import start_pool, start_scheduler
 from ftio.prediction.helper import print_data, export_extrap
-from ftio.prediction.async_process import handle_in_process
 from ftio.parse.args import parse_args
 from ftio.freq.helper import MyConsole
+from ftio.parse.zmq_reader import receive
 
 CONSOLE = MyConsole()
 CONSOLE.set(True)
 
 def predictor_with_processes_zmq(
-    data, queue, count, hits, start_time, aggregated_bytes, args, b_app, t_app
+    data, queue, count, hits, start_time, aggregated_bytes, args, b_app, t_app, state=None
 )-> None:
     """performs prediction in ProcessPoolExecuter. FTIO is a submitted future and probability is calculated as a callback
 
@@ -27,8 +26,8 @@ def predictor_with_processes_zmq(
         start_time (Manager().Value): start time window for ftio
         aggregated_bytes (Manager().Value): total bytes transferred so far
         args (list[str]): additional arguments passed to ftio
+        state (dict, optional): state that persists between predictions (default: state of the worker, see get_state)
     """
-    procs = []
     context = zmq.Context()
     socket = context.socket(socket_type=zmq.PULL)
     #parse arguments
@@ -44,13 +43,17 @@ def predictor_with_processes_zmq(
     
     if '-zmq' not in args:
         args.extend(['--zmq'])
+    pool = start_pool(data, queue, count, hits, start_time, aggregated_bytes, args)
+    # messages that arrive while the predictions are busy are merged into the pending job
+    scheduler = start_scheduler(
+        pool, (data, queue, count, hits, start_time, aggregated_bytes, args), state, args,
+        merge=lambda pending, msgs: pending + msgs,
+    )
     
     # Loop and predict if changes occur
     try:
         with CONSOLE.status("[green] started\n",spinner="arrow3") as status:
             while True:
-                # join procs
-                procs = join_procs(procs)
                 # get messages
                 msgs, ranks = receive_messages(socket, poller)
 
@@ -63,13 +66,11 @@ def predictor_with_processes_zmq(
                 # launch prediction_process
                 # TODO: append b_app and t_app like predictor_gekko_zmq use the flag --zmq to indicate this
                 # put all in msgs and call it zmq_data
-                procs.append(
-                    handle_in_process(
-                        prediction_process,
-                        args=(data, queue, count, hits, start_time, aggregated_bytes, args, msgs)
-                    )
-                )
+                scheduler.submit(msgs)
     except KeyboardInterrupt:
+        if pool:
+            pool.close()
+        scheduler.shutdown()
         print_data(data)
         export_extrap(data)
         print('-- done -- ')
@@ -99,7 +100,9 @@ def bind_socket(addr, port):
 
 
 def receive_messages(socket, poller):
-    """Polls for and receives messages from the socket, returning a list of messages and count."""
+    """Polls for and receives messages from the socket, returning a list of messages and count.
+    Messages in the binary format (several frames) are mapped to NumPy arrays without
+    copying, see ftio.parse.zmq_reader.decode_frames."""
     msgs = []
     ranks = 0
     # start = time.time()
@@ -118,7 +121,7 @@ def receive_messages(socket, poller):
     #3) Loop and accept messages from both channels, acting accordingly
     while socks: 
         if socks.get(socket) == zmq.POLLIN:
-            msgs.append(socket.recv(zmq.NOBLOCK))
+            msgs.append(receive(socket, zmq.NOBLOCK))
             # CONSOLE.print(f"[cyan]Got message {ranks}:[/] {msg}")
             ranks += 1
         # if time.time() - start > 0.5:
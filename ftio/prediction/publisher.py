@@ -0,0 +1,209 @@
+"""Result channel of the predictor. Each prediction is streamed as a msgpack map on a
+PUB socket (--pub_port), and a REP socket (--rep_port) returns the latest prediction
+on request. The prediction processes send their results over an internal PUSH/PULL
+connection (--result_endpoint) to the ResultPublisher in the main process.
+
+Subscriber example:
+    socket = zmq.Context().socket(zmq.SUB)
+    socket.connect("tcp://127.0.0.1:5556")
+    socket.setsockopt(zmq.SUBSCRIBE, b"")
+    app, msg = socket.recv_multipart()
+    prediction = msgpack.unpackb(msg)
+
+Request example (an empty map returns the latest prediction of every application):
+    socket = zmq.Context().socket(zmq.REQ)
+    socket.connect("tcp://127.0.0.1:5557")
+    socket.send(msgpack.packb({"app": "default"}))
+    prediction = msgpack.unpackb(socket.recv())
+"""
+
+from __future__ import annotations
+import os
+import threading
+import numpy as np
+import msgpack
+import zmq
+from ftio.parse.args import parse_args
+from ftio.prediction.helper import get_dominant_and_conf
+
+DEFAULT_APP = "default"
+
+# PUSH sockets of the current process, see send_result
+_SOCKETS = {}
+
+
+def start_publisher(args: list[str]) -> ResultPublisher | None:
+    """Starts the publisher if --pub_port or --rep_port is set and adds the internal
+    endpoint to args (--result_endpoint), so the prediction processes send their
+    results to it
+
+    Args:
+        args (list[str]): arguments of the predictor (extended in place)
+
+    Returns:
+        ResultPublisher | None: the publisher, or None if it is not used
+    """
+    parsed = parse_args(args)
+    if not parsed.pub_port and not parsed.rep_port:
+        return None
+    publisher = ResultPublisher(parsed.zmq_address, parsed.pub_port, parsed.rep_port)
+    args.extend(["--result_endpoint", publisher.endpoint])
+    return publisher
+
+
+def prediction_message(entry: dict, prob: list = [], app: str = DEFAULT_APP) -> dict:
+    """Summarizes a prediction for the result channel
+
+    Args:
+        entry (dict): prediction as saved by save_data
+        prob (list, optional): probability groups from find_probability. Defaults to [].
+        app (str, optional): id of the application. Defaults to "default".
+
+    Returns:
+        dict: app, count, frequency, period, confidence, phase (rad), window,
+            probability, and hits
+    """
+    freq, conf = get_dominant_and_conf(entry)
+    phase = np.nan
+    if not np.isnan(freq):
+        index = int(np.argmax(entry["conf"]))
+        if len(entry.get("phi", [])) > index:
+            phase = entry["phi"][index]
+    probability = -1.0
+    for p in prob:
+        if p.get_freq_prob(freq):
+            probability = p.p_freq_given_periodic
+            break
+
+    return {
+        "app": app,
+        "count": int(entry["phase"]),
+        "freq": float(freq),
+        "period": float(1 / freq) if freq > 0 else float("nan"),
+        "conf": float(conf),
+        "phase": float(phase),
+        "t_start": float(entry["t_start"]),
+        "t_end": float(entry["t_end"]),
+        "probability": float(probability),
+        "hits": float(entry["hits"]),
+    }
+
+
+def send_result(endpoint: str, message: dict) -> None:
+    """Sends a result to the ResultPublisher. The socket is kept for later calls
+
+    Args:
+        endpoint (str): internal endpoint of the publisher (--result_endpoint)
+        message (dict): result (see prediction_message)
+    """
+    key = (os.getpid(), endpoint)
+    if key not in _SOCKETS:
+        socket = zmq.Context.instance().socket(zmq.PUSH)
+        socket.setsockopt(zmq.LINGER, 1000)
+        socket.connect(endpoint)
+        _SOCKETS[key] = socket
+    _SOCKETS[key].send(msgpack.packb(message))
+
+
+def publish_prediction(endpoint: str, data: list, prob: list, app: str = DEFAULT_APP) -> None:
+    """Sends the newest prediction in data to the publisher
+
+    Args:
+        endpoint (str): internal endpoint of the publisher (--result_endpoint)
+        data (list): predictions so far
+        prob (list): probability groups from find_probability
+        app (str, optional): id of the application. Defaults to "default".
+    """
+    if len(data) > 0:
+        send_result(endpoint, prediction_message(data[-1], prob, app))
+
+
+class ResultPublisher:
+    """Forwards the results of the prediction processes to a PUB socket and keeps the
+    latest result of each application for the REP socket. The sockets are handled by a
+    background thread."""
+
+    def __init__(self, address: str = "*", pub_port: str = "", rep_port: str = ""):
+        """init function
+
+        Args:
+            address (str, optional): address to bind to. Defaults to "*".
+            pub_port (str, optional): port of the PUB socket ("" to disable, "0" for a free port). Defaults to "".
+            rep_port (str, optional): port of the REP socket ("" to disable, "0" for a free port). Defaults to "".
+        """
+        self.context = zmq.Context()
+        self.latest = {}
+        self.published = 0
+        self.lock = threading.Lock()
+        self.running = True
+        self.collect = self.context.socket(zmq.PULL)
+        port = self.collect.bind_to_random_port("tcp://127.0.0.1")
+        self.endpoint = f"tcp://127.0.0.1:{port}"
+        self.pub = self.bind(zmq.PUB, address, pub_port)
+        self.rep = self.bind(zmq.REP, address, rep_port)
+        self.pub_port = self.port(self.pub)
+        self.rep_port = self.port(self.rep)
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def bind(self, kind: int, address: str, port: str):
+        if not port:
+            return None
+        socket = self.context.socket(kind)
+        if str(port) == "0":
+            socket.bind_to_random_port(f"tcp://{address}")
+        else:
+            socket.bind(f"tcp://{address}:{port}")
+        return socket
+
+    def port(self, socket) -> str:
+        if socket is None:
+            return ""
+        endpoint = socket.getsockopt_string(zmq.LAST_ENDPOINT)
+        return endpoint[endpoint.rfind(":") + 1 :]
+
+    def loop(self) -> None:
+        poller = zmq.Poller()
+        poller.register(self.collect, zmq.POLLIN)
+        if self.rep is not None:
+            poller.register(self.rep, zmq.POLLIN)
+        while self.running:
+            socks = dict(poller.poll(100))
+            if socks.get(self.collect) == zmq.POLLIN:
+                msg = self.collect.recv()
+                message = msgpack.unpackb(msg)
+                app = str(message.get("app", DEFAULT_APP))
+                with self.lock:
+                    self.latest[app] = message
+                    self.published += 1
+                if self.pub is not None:
+                    # the app is the topic, so subscribers can filter it
+                    self.pub.send_multipart([app.encode(), msg])
+            if self.rep is not None and socks.get(self.rep) == zmq.POLLIN:
+                self.rep.send(msgpack.packb(self.request(self.rep.recv())))
+        for socket in [self.collect, self.pub, self.rep]:
+            if socket is not None:
+                socket.close(linger=0)
+
+    def request(self, msg: bytes) -> dict:
+        """Answers a request of the REP socket
+
+        Args:
+            msg (bytes): msgpack map, optionally with the app
+
+        Returns:
+            dict: latest prediction of the app, or of every app (empty if none yet)
+        """
+        try:
+            request = msgpack.unpackb(msg) if msg else {}
+        except (ValueError, msgpack.UnpackException):
+            request = {}
+        with self.lock:
+            if isinstance(request, dict) and "app" in request:
+                return self.latest.get(str(request["app"]), {})
+            return dict(self.latest)
+
+    def close(self) -> None:
+        self.running = False
+        self.thread.join()
+        self.context.term()
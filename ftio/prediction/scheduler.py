@@ -0,0 +1,121 @@
+"""Schedules the predictions of the online predictor. At most `max_in_flight`
+predictions run at the same time. Data that arrives meanwhile is coalesced into a
+single pending job, and the results are ordered with sequence numbers.
+"""
+from __future__ import annotations
+import threading
+from multiprocessing import Manager
+from typing import Any, Callable
+
+
+class Ticket:
+    """Sequence number of a prediction together with the shared state needed to order
+    the results. Tickets are picklable and are passed to the prediction process."""
+
+    def __init__(self, seq: int, applied, lock, done):
+        """init function
+
+        Args:
+            seq (int): sequence number of the prediction
+            applied (Manager().Value): sequence number of the newest applied result
+            lock (Manager().Lock): lock protecting the shared prediction state
+            done (Manager().Queue): receives the sequence number of finished predictions
+        """
+        self.seq = seq
+        self.applied = applied
+        self.lock = lock
+        self.done = done
+
+    def acquire(self) -> bool:
+        """Locks the shared prediction state (count, hits, start time, ...) if no newer
+        result was applied yet. Must be followed by release if True is returned.
+
+        Returns:
+            bool: False if the result is stale and should be dropped
+        """
+        self.lock.acquire()
+        if self.seq < self.applied.value:
+            self.lock.release()
+            return False
+        self.applied.value = self.seq
+        return True
+
+    def release(self) -> None:
+        self.lock.release()
+
+    def finish(self) -> None:
+        """Frees the slot of the prediction in the scheduler"""
+        self.done.put(self.seq)
+
+
+class CoalescingScheduler:
+    """Launches the submitted jobs with at most `max_in_flight` running at the same time.
+    Jobs submitted while all slots are busy are merged into a single pending job, which
+    is launched as soon as a slot is free. Each launched job gets a Ticket with an
+    increasing sequence number.
+    """
+
+    def __init__(self, launch: Callable, max_in_flight: int = 1, merge: Callable = None):
+        """init function
+
+        Args:
+            launch (Callable): launch(job, ticket) starts the prediction. It may return a
+                Process that is joined once the prediction finished
+            max_in_flight (int, optional): max. predictions running at the same time. Defaults to 1.
+            merge (Callable, optional): merge(pending, job) combines the pending job with a
+                newly submitted one. Defaults to None (the latest job wins).
+        """
+        self.launch = launch
+        self.max_in_flight = max(1, max_in_flight)
+        self.merge = merge if merge is not None else lambda pending, job: job
+        self.manager = Manager()
+        self.applied = self.manager.Value("i", -1)
+        self.lock = self.manager.Lock()
+        self.done = self.manager.Queue()
+        self.seq = 0
+        self.in_flight = {}
+        self.pending = None
+        self.has_pending = False
+        self.coalesced = 0
+        self._mutex = threading.Lock()
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def submit(self, job: Any = None) -> None:
+        """Launches the job, or merges it into the pending job if all slots are busy
+
+        Args:
+            job (Any, optional): data of the job (e.g., ZMQ messages). Defaults to None.
+        """
+        with self._mutex:
+            if self.has_pending:
+                self.pending = self.merge(self.pending, job)
+                self.coalesced += 1
+            else:
+                self.pending = job
+                self.has_pending = True
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self.has_pending and len(self.in_flight) < self.max_in_flight:
+            job = self.pending
+            self.pending = None
+            self.has_pending = False
+            ticket = Ticket(self.seq, self.applied, self.lock, self.done)
+            self.in_flight[self.seq] = self.launch(job, ticket)
+            self.seq += 1
+
+    def _collect(self) -> None:
+        """Frees the slots of finished predictions and launches the pending job"""
+        while True:
+            try:
+                seq = self.done.get()
+            except (EOFError, OSError):
+                return
+            with self._mutex:
+                proc = self.in_flight.pop(seq, None)
+                if proc is not None:
+                    proc.join()
+                self._dispatch()
+
+    def shutdown(self) -> None:
+        self.manager.shutdown()
@@ -0,0 +1,221 @@
+"""Multi-tenant predictor server (predictor --server). A single asyncio loop receives
+the ZMQ messages of many applications on one PULL socket. The messages are keyed by
+the id of the application ("app" or "job" in the msgpack map, or the first frame of
+a binary message, see ftio.parse.zmq_reader). Each application (tenant) has its own
+prediction state (count, hits, time window, predictions, and probability groups). The
+state of the sliding DFT stays in the worker that runs the predictions of the
+tenant (see get_state).
+
+The analysis runs on --pool_size single-process executors. Each tenant is pinned to
+one of them when its first message arrives (round robin), so all its predictions run
+in the same worker and find the state of the previous prediction there. Each tenant
+has at most one prediction in flight; messages that arrive meanwhile are merged into
+its next prediction. Hence, a slow application occupies at most one worker.
+"""
+
+from __future__ import annotations
+import sys
+import asyncio
+import queue
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+import msgpack
+import zmq
+import zmq.asyncio
+from rich.console import Console
+from ftio.parse.args import parse_args
+from ftio.parse.zmq_reader import decode_frames
+from ftio.prediction.analysis import apply_prediction, get_state, warm_up
+from ftio.prediction.helper import print_data
+from ftio.prediction.probability_analysis import find_probability, ProbabilityTracker
+from ftio.prediction.publisher import publish_prediction
+
+DEFAULT_TENANT = "default"
+
+
+class Tenant:
+    """Prediction state of a single application"""
+
+    def __init__(self, name: str, worker: int = 0):
+        self.name = name
+        self.worker = worker  # index of the executor that runs the predictions
+        self.count = SimpleNamespace(value=0)
+        self.hits = SimpleNamespace(value=0.0)
+        self.start_time = SimpleNamespace(value=0.0)
+        self.aggregated_bytes = SimpleNamespace(value=0.0)
+        self.queue = queue.Queue()
+        self.data = []  # predictions
+        self.tracker = ProbabilityTracker()  # groups of the predictions
+        self.pending = []  # messages of the next prediction
+        self.busy = False
+
+
+class PredictorServer:
+    def __init__(self, args: list[str], context: zmq.asyncio.Context = None):
+        """init function
+
+        Args:
+            args (list[str]): arguments passed to ftio (including --zmq_address,
+                --zmq_port, and --pool_size). With --zmq_port 0, a free port is used
+            context (zmq.asyncio.Context, optional): ZMQ context. Defaults to None (new context).
+        """
+        self.args = list(args)
+        if "--zmq" not in self.args:
+            self.args.append("--zmq")
+        parsed = parse_args(self.args)
+        self.address = parsed.zmq_address
+        self.result_endpoint = parsed.result_endpoint
+        self.port = parsed.zmq_port
+        self.console = Console()
+        self.tenants = {}
+        self.tasks = set()
+        # the workers are started (and warmed up) before the ZMQ context exists. Each
+        # worker has its own executor, so that a tenant always runs on the same worker
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, initializer=warm_up, initargs=(self.args,))
+            for _ in range(max(1, parsed.pool_size))
+        ]
+        for executor in self.executors:
+            executor.submit(int).result()
+        self.context = context if context is not None else zmq.asyncio.Context()
+        self.socket = None
+
+    def bind(self) -> str:
+        """Binds the PULL socket
+
+        Returns:
+            str: endpoint the clients connect to
+        """
+        self.socket = self.context.socket(zmq.PULL)
+        if str(self.port) in ["0", "*"]:
+            port = self.socket.bind_to_random_port(f"tcp://{self.address}")
+            self.port = str(port)
+        else:
+            self.socket.bind(f"tcp://{self.address}:{self.port}")
+        address = "127.0.0.1" if self.address == "*" else self.address
+        self.console.print(f"[green]FTIO server is running on: {address}:{self.port}[/]")
+        return f"tcp://{address}:{self.port}"
+
+    async def serve(self) -> None:
+        """Receives messages and launches the predictions until cancelled"""
+        if self.socket is None:
+            self.bind()
+        while True:
+            frames = await self.socket.recv_multipart(copy=False)
+            try:
+                name, msg = self.decode(frames)
+            except (ValueError, msgpack.UnpackException) as e:
+                self.console.print(f"[red]Dropping message: {e}[/]")
+                continue
+            tenant = self.tenants.get(name)
+            if tenant is None:
+                worker = len(self.tenants) % len(self.executors)
+                tenant = self.tenants[name] = Tenant(name, worker)
+                self.console.print(f"[purple][SERVER]:[/] New application {name}")
+            tenant.pending.append(msg)
+            self.schedule(tenant)
+
+    def decode(self, frames: list) -> tuple[str, bytes | dict]:
+        """Finds the application of a message
+
+        Args:
+            frames (list): frames of the message
+
+        Returns:
+            tuple[str, bytes | dict]: id of the application and the message
+        """
+        if len(frames) > 1:
+            msg = decode_frames(frames)
+            return msg.pop("app", DEFAULT_TENANT), msg
+        msg = msgpack.unpackb(frames[0].buffer)
+        if isinstance(msg, dict):
+            name = msg.pop("app", msg.pop("job", DEFAULT_TENANT))
+            return str(name), msg
+        return DEFAULT_TENANT, frames[0].bytes
+
+    def schedule(self, tenant: Tenant) -> None:
+        """Launches the next prediction of the tenant unless one is in flight"""
+        if tenant.busy or not tenant.pending:
+            return
+        msgs, tenant.pending = tenant.pending, []
+        tenant.busy = True
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executors[tenant.worker], tenant_prediction, self.args, msgs, tenant.start_time.value, tenant.name
+        )
+        task = asyncio.ensure_future(self.finish(tenant, future))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def finish(self, tenant: Tenant, future: asyncio.Future) -> None:
+        """Applies the result of a prediction to the tenant and launches the next one"""
+        try:
+            prediction, args = await future
+            console = Console()
+            console.print(f"[purple][SERVER]:[/] Application {tenant.name}")
+            apply_prediction(
+                tenant.queue, tenant.count, tenant.hits, tenant.start_time,
+                tenant.aggregated_bytes, args, prediction, console,
+            )
+            while not tenant.queue.empty():
+                tenant.data.append(tenant.queue.get())
+            prob = find_probability(tenant.data, tracker=tenant.tracker)
+            if self.result_endpoint:
+                publish_prediction(self.result_endpoint, tenant.data, prob, tenant.name)
+        except Exception as e:
+            self.console.print(f"[red]Prediction of {tenant.name} failed: {e}[/]")
+        finally:
+            tenant.busy = False
+            self.schedule(tenant)
+
+    async def idle(self) -> None:
+        """Waits until no prediction is in flight or pending"""
+        while self.tasks or any(t.pending for t in self.tenants.values()):
+            await asyncio.sleep(0.01)
+
+    def close(self) -> None:
+        if self.socket is not None:
+            self.socket.close(linger=0)
+        for executor in self.executors:
+            executor.shutdown(cancel_futures=True)
+
+
+def tenant_prediction(args: list[str], msgs: list, start_time: float, name: str) -> tuple[dict, object]:
+    """Performs a single prediction in a worker of the pool
+
+    Args:
+        args (list[str]): arguments passed to ftio
+        msgs (list): messages of the tenant
+        start_time (float): start time of the window
+        name (str): id of the tenant. The worker keeps a state per tenant (see get_state).
+            All predictions of a tenant run on the same worker
+
+    Returns:
+        tuple[dict, argparse.Namespace]: prediction and parsed arguments
+    """
+    from ftio.cli import ftio_core
+
+    args = args + ["-e", "no", "-ts", f"{start_time:.2f}"]
+    prediction, args = ftio_core.main(args, msgs, get_state(name))
+    return prediction, args
+
+
+def main(args: list[str] = sys.argv) -> None:
+    """Runs the server until interrupted
+
+    Args:
+        args (list[str]): arguments passed from command line
+    """
+    server = PredictorServer(args)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        for name, tenant in server.tenants.items():
+            print(f"Application {name}:")
+            print_data(tenant.data)
+        print("-- done -- ")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,180 @@
+"""Append-only arrays in shared memory (e.g., the app-level bandwidth and time of
+the ZMQ predictor). Appending copies only the new values and reading returns NumPy
+views of the shared memory, so the cost does not depend on the length of the
+history. Unlike Manager().list, no element is sent through a socket.
+"""
+
+from __future__ import annotations
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+# layout of the control block
+LENGTH, GENERATION = 0, 1
+
+
+class SharedHistory:
+    """Columns of float64 values that grow together. The control block stores the
+    published length and the generation of the data segment. Each data segment starts
+    with its capacity. When the capacity is exceeded, the data is copied to a new
+    segment with (at least) twice the capacity and the generation is increased.
+
+    Appends are serialized by a lock and publish the new length only after the values
+    are written. Values below the published length never change, so readers do not
+    need the lock. The object can be passed to other processes (it is picklable,
+    given the lock is; use Manager().Lock() when it is sent through a queue).
+    """
+
+    def __init__(self, columns: int = 2, capacity: int = 1024, lock=None):
+        """init function
+
+        Args:
+            columns (int, optional): number of arrays. Defaults to 2.
+            capacity (int, optional): initial capacity in values per array. Defaults to 1024.
+            lock (Lock, optional): lock for the appends. Defaults to None (multiprocessing.Lock()).
+        """
+        self.columns = columns
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        self._control = shared_memory.SharedMemory(create=True, size=2 * 8)
+        self.name = self._control.name
+        self._state = np.ndarray(2, dtype=np.int64, buffer=self._control.buf)
+        self._state[:] = 0
+        self._segment = self._create(0, max(1, capacity))
+        self._generation = 0
+        self._old = []
+        self.owner = True
+
+    def __getstate__(self) -> dict:
+        return {"columns": self.columns, "lock": self.lock, "name": self.name}
+
+    def __setstate__(self, state: dict) -> None:
+        self.columns = state["columns"]
+        self.lock = state["lock"]
+        self.name = state["name"]
+        self._control = shared_memory.SharedMemory(name=self.name)
+        self._state = np.ndarray(2, dtype=np.int64, buffer=self._control.buf)
+        self._segment = None
+        self._generation = -1
+        self._old = []
+        self.owner = False
+
+    def segment_name(self, generation: int) -> str:
+        return f"{self.name}_{generation}"
+
+    def _create(self, generation: int, capacity: int) -> shared_memory.SharedMemory:
+        segment = shared_memory.SharedMemory(
+            create=True, size=(1 + self.columns * capacity) * 8, name=self.segment_name(generation)
+        )
+        np.ndarray(1, dtype=np.int64, buffer=segment.buf)[0] = capacity
+        return segment
+
+    def _data(self, segment: shared_memory.SharedMemory = None) -> np.ndarray:
+        segment = segment if segment is not None else self._segment
+        capacity = int(np.ndarray(1, dtype=np.int64, buffer=segment.buf)[0])
+        return np.ndarray((self.columns, capacity), dtype=np.float64, buffer=segment.buf, offset=8)
+
+    def _attach(self) -> None:
+        """Maps the current data segment"""
+        while True:
+            generation = int(self._state[GENERATION])
+            if generation == self._generation:
+                return
+            try:
+                segment = shared_memory.SharedMemory(name=self.segment_name(generation))
+            except FileNotFoundError:
+                # the segment was replaced meanwhile
+                continue
+            if self._segment is not None:
+                self._old.append(self._segment)
+            self._segment = segment
+            self._generation = generation
+            self._release_old()
+
+    def _release_old(self) -> None:
+        # old segments stay mapped as long as views of them exist
+        old = []
+        for segment in self._old:
+            try:
+                segment.close()
+            except BufferError:
+                old.append(segment)
+        self._old = old
+
+    def append(self, *arrays) -> None:
+        """Appends values to all columns at once
+
+        Args:
+            *arrays (array-like): one array per column, all of the same length
+        """
+        if len(arrays) != self.columns:
+            raise ValueError(f"Expected {self.columns} arrays, got {len(arrays)}")
+        arrays = [np.asarray(a, dtype=np.float64).ravel() for a in arrays]
+        n = len(arrays[0])
+        if any(len(a) != n for a in arrays):
+            raise ValueError("All arrays must have the same length")
+
+        with self.lock:
+            self._attach()
+            length = int(self._state[LENGTH])
+            data = self._data()
+            if length + n > data.shape[1]:
+                data = self._grow(length, max(length + n, 2 * data.shape[1]))
+            for i, a in enumerate(arrays):
+                data[i, length : length + n] = a
+            # publish the values
+            self._state[LENGTH] = length + n
+
+    def _grow(self, length: int, capacity: int) -> np.ndarray:
+        """Copies the data to a new segment (called with the lock held)
+
+        Returns:
+            np.ndarray: data of the new segment
+        """
+        generation = self._generation + 1
+        segment = self._create(generation, capacity)
+        data = self._data(segment)
+        data[:, :length] = self._data()[:, :length]
+        old = self._segment
+        self._segment = segment
+        self._generation = generation
+        self._state[GENERATION] = generation
+        old.unlink()
+        self._old.append(old)
+        del data
+        self._release_old()
+        return self._data()
+
+    def view(self) -> tuple[np.ndarray, ...]:
+        """Read-only views of all published values (no copy)
+
+        Returns:
+            tuple[np.ndarray, ...]: one array per column
+        """
+        length = int(self._state[LENGTH])
+        self._attach()
+        data = self._data()[:, :length]
+        data.flags.writeable = False
+        return tuple(data)
+
+    def __len__(self) -> int:
+        return int(self._state[LENGTH])
+
+    def close(self) -> None:
+        """Unmaps the shared memory. The owner also removes it"""
+        if self.owner:
+            # another process may have replaced the segment
+            self._attach()
+        if self._segment is not None:
+            self._old.append(self._segment)
+            if self.owner:
+                self._segment.unlink()
+            self._segment = None
+            self._generation = -1
+        self._release_old()
+        self._state = None
+        try:
+            self._control.close()
+        except BufferError:
+            pass
+        if self.owner:
+            self._control.unlink()
@@ -0,0 +1,172 @@
+"""Schedules actions at future times (e.g., the flush of the data staged by cargo at
+the next predicted I/O phase). A single thread sleeps until the next action is due or
+until the actions change, so waiting costs no CPU. A newer prediction replaces the
+pending action with the same key, and pending actions can be cancelled.
+
+Example:
+    scheduler = TriggerScheduler()
+    scheduler.schedule(time.time() + 2.5, ShellAction("cargo_ftio --run"), key="cargo")
+    # a newer prediction moves the flush
+    scheduler.schedule(time.time() + 1.2, ShellAction("cargo_ftio --run"), key="cargo")
+    ...
+    scheduler.close()
+    print(scheduler.records)
+"""
+
+from __future__ import annotations
+import heapq
+import itertools
+import subprocess
+import threading
+import time
+from typing import Any, Callable
+
+
+class ShellAction:
+    """Runs a shell command"""
+
+    def __init__(self, cmd: str):
+        self.cmd = cmd
+
+    def __call__(self, info: dict) -> int:
+        return subprocess.call(self.cmd, shell=True)
+
+    def __repr__(self) -> str:
+        return self.cmd
+
+
+class LocalCargo:
+    """Local stand-in for cargo. Records the time and the information of each flush
+    instead of staging out data (e.g., for tests or runs without cargo)"""
+
+    def __init__(self):
+        self.flushes = []
+
+    def __call__(self, info: dict) -> int:
+        self.flushes.append((time.time(), info))
+        return 0
+
+    def __repr__(self) -> str:
+        return "local cargo"
+
+
+class Trigger:
+    """A scheduled action. Returned by TriggerScheduler.schedule"""
+
+    def __init__(self, target: float, action: Callable, key: Any, info: dict):
+        self.target = target
+        self.action = action
+        self.key = key
+        self.info = info
+        self.cancelled = False
+
+
+class TriggerScheduler:
+    """Fires actions at their target time. Each action is called with its info dict.
+    For every fired action, a record with the target time, the time the action fired,
+    and the difference (delay) is kept in `records`.
+    """
+
+    def __init__(self, on_fire: Callable = None):
+        """init function
+
+        Args:
+            on_fire (Callable, optional): called with each record after the action
+                ran (e.g., to print it). Defaults to None.
+        """
+        self.on_fire = on_fire
+        self.records = []
+        self._heap = []
+        self._pending = {}  # key -> Trigger
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def schedule(self, target: float, action: Callable, key: Any = "default", info: dict = None) -> Trigger:
+        """Schedules an action. A pending action with the same key is cancelled
+
+        Args:
+            target (float): time (time.time()) when the action should fire
+            action (Callable): called with info
+            key (Any, optional): identifies the action to replace. Defaults to "default".
+            info (dict, optional): passed to the action and kept in the record. Defaults to None.
+
+        Returns:
+            Trigger: the scheduled action
+        """
+        trigger = Trigger(target, action, key, info if info is not None else {})
+        with self._cond:
+            self._cancel(key)
+            self._pending[key] = trigger
+            heapq.heappush(self._heap, (target, next(self._counter), trigger))
+            self._cond.notify()
+        return trigger
+
+    def cancel(self, key: Any = "default") -> bool:
+        """Cancels the pending action with the key
+
+        Returns:
+            bool: True if an action was pending
+        """
+        with self._cond:
+            cancelled = self._cancel(key)
+            self._cond.notify()
+        return cancelled
+
+    def _cancel(self, key: Any) -> bool:
+        trigger = self._pending.pop(key, None)
+        if trigger is None:
+            return False
+        # removed from the heap lazily
+        trigger.cancelled = True
+        return True
+
+    def pending(self, key: Any = "default") -> Trigger | None:
+        with self._cond:
+            return self._pending.get(key)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._running:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if self._heap:
+                        delay = self._heap[0][0] - time.time()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                if not self._running:
+                    return
+                _, _, trigger = heapq.heappop(self._heap)
+                del self._pending[trigger.key]
+            self._fire(trigger)
+
+    def _fire(self, trigger: Trigger) -> None:
+        fired = time.time()
+        try:
+            result = trigger.action(trigger.info)
+        except Exception as e:
+            result = e
+        record = {
+            "key": trigger.key,
+            "target": trigger.target,
+            "fired": fired,
+            "delay": fired - trigger.target,
+            "result": result,
+            "info": trigger.info,
+        }
+        self.records.append(record)
+        if self.on_fire is not None:
+            self.on_fire(record)
+
+    def close(self) -> None:
+        """Stops the scheduler. Pending actions are dropped"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,83 @@
+"""Compares the vectorized extraction of DXT segments against the previous per-record
+extraction (a DataFrame per record and pandas operations per record). With a Darshan
+log, the selective loading of the DXT module is compared against reading all modules.
+
+call: python3 bench_darshan.py [n_records] [segments_per_record] [darshan_log]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from ftio.parse.darshan_reader import dxt_segments, extract_darshan
+
+
+def records(n_records: int, n_segments: int) -> list[dict]:
+    rng = np.random.default_rng(0)
+    out = []
+    for i in range(n_records):
+        recs = {"rank": i % 64}
+        for mode in ["write", "read"]:
+            start = np.sort(rng.uniform(0, 100, n_segments))
+            end = start + rng.uniform(1e-4, 1, n_segments)
+            length = rng.integers(1, 1 << 20, n_segments)
+            recs[f"{mode}_segments"] = [
+                {"offset": 0, "length": int(l), "start_time": float(s), "end_time": float(e)}
+                for l, s, e in zip(length, start, end)
+            ]
+        out.append(recs)
+    return out
+
+
+def per_record(recs: list[dict]) -> tuple[int, int]:
+    """previous approach: a DataFrame per record and aggregates per record"""
+    total, phases = 0, 0
+    for rec in recs:
+        for mode in ["write", "read"]:
+            df = pd.DataFrame(rec[f"{mode}_segments"])
+            if df.empty:
+                continue
+            bandwidth = df["length"] / (df["end_time"] - df["start_time"])
+            bandwidth.to_list()
+            df["end_time"].to_list()
+            df["start_time"].to_list()
+            sum((df["end_time"] - df["start_time"]).to_list())
+            total += sum(df["length"])
+            max(df["length"])
+            phases = max(phases, len(df["length"]))
+    return total, phases
+
+
+def bench(n_records: int = 2000, n_segments: int = 50, log: str = "") -> None:
+    recs = records(n_records, n_segments)
+    print(f"records: {n_records}, segments per record and mode: {n_segments}")
+
+    tik = time.time()
+    write, read, _ = extract_darshan(dxt_segments(recs))
+    t_vec = time.time() - tik
+    print(f"vectorized: {t_vec:.4f} s")
+
+    tik = time.time()
+    total, phases = per_record(recs)
+    t_loop = time.time() - tik
+    assert total == write["total_bytes"] + read["total_bytes"]
+    assert phases == max(write["max_io_phases_per_rank"], read["max_io_phases_per_rank"])
+    print(f"per record: {t_loop:.4f} s  (speed-up {t_loop/t_vec if t_vec > 0 else np.inf:.1f}x)")
+
+    if log:
+        import darshan
+        from ftio.parse.darshan_reader import read_dxt
+
+        tik = time.time()
+        with darshan.DarshanReport(log, read_all=True) as report:
+            report.records["DXT_POSIX"].to_df()
+        t_all = time.time() - tik
+        tik = time.time()
+        with darshan.DarshanReport(log, read_all=False) as report:
+            read_dxt(report, "DXT_POSIX")
+        t_sel = time.time() - tik
+        print(f"log {log}: read_all {t_all:.4f} s, DXT_POSIX only {t_sel:.4f} s")
+
+
+if __name__ == "__main__":
+    bench(*[int(x) if i < 2 else x for i, x in enumerate(sys.argv[1:])])
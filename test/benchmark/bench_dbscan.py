@@ -0,0 +1,36 @@
+"""Compares the grid-based DBSCAN of the spectrum against sklearn's DBSCAN.
+
+call: python3 bench_dbscan.py [n_bins] [tol]
+"""
+
+import sys
+import time
+import numpy as np
+from ftio.freq._dbscan import dbscan
+
+
+def bench(n_bins: int = 100_000, tol: float = 0.8) -> None:
+    from sklearn.cluster import DBSCAN
+
+    rng = np.random.default_rng(0)
+    amp = rng.exponential(1, n_bins)
+    amp[rng.choice(n_bins, 10, replace=False)] += n_bins / 100
+    x = np.arange(1, n_bins + 1) / n_bins
+    d = np.column_stack((x, amp / amp.sum()))
+    eps = np.sqrt((np.ptp(d[:, 1]) * (1 - tol)) ** 2 + (x[1] - x[0]) ** 2)
+
+    tik = time.time()
+    labels = dbscan(d, eps)
+    t_grid = time.time() - tik
+    print(f"bins: {n_bins}, outliers: {np.sum(labels == -1)}")
+    print(f"grid:    {t_grid:.4f} s")
+
+    tik = time.time()
+    expected = DBSCAN(eps=eps, min_samples=2).fit(d).labels_
+    t_sklearn = time.time() - tik
+    assert np.array_equal(labels, expected)
+    print(f"sklearn: {t_sklearn:.4f} s  (speed-up {t_sklearn/t_grid if t_grid > 0 else np.inf:.1f}x)")
+
+
+if __name__ == "__main__":
+    bench(*[float(x) if i else int(x) for i, x in enumerate(sys.argv[1:])])
@@ -0,0 +1,37 @@
+"""Compares the vectorized discretization against the reference loop.
+
+call: python3 bench_discretize.py [n_points] [freq]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from ftio.freq.discretize import sample_data
+
+# reference implementations in test/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reference import sample_data_loop
+
+
+def bench(n_points: int = 100_000, freq: float = 1000) -> None:
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.exponential(1 / freq, n_points))
+    b = rng.uniform(0, 1e9, n_points)
+
+    tik = time.time()
+    b_loop = sample_data_loop(b, t, freq)
+    t_loop = time.time() - tik
+
+    tik = time.time()
+    b_vec, _, _ = sample_data(b, t, freq)
+    t_vec = time.time() - tik
+
+    assert np.array_equal(b_loop, b_vec)
+    print(f"change points: {n_points}, samples: {len(b_vec)}")
+    print(f"loop:       {t_loop:.4f} s")
+    print(f"vectorized: {t_vec:.4f} s  (speed-up {t_loop/t_vec if t_vec > 0 else np.inf:.1f}x)")
+
+
+if __name__ == "__main__":
+    bench(*[float(x) if i else int(x) for i, x in enumerate(sys.argv[1:])])
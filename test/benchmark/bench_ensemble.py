@@ -0,0 +1,47 @@
+"""Compares the wall time of -o ensemble against the outlier detection of the single
+methods on a synthetic spectrum. With the methods running at the same time on
+threads, the ensemble should take less than the sum of all (with several CPUs).
+
+call: python3 bench_ensemble.py [n_samples]
+"""
+
+import sys
+import time
+import numpy as np
+from ftio.parse.args import parse_args
+from ftio.freq.anomaly_detection import candidates, ensemble, ensemble_methods, spectrum_features
+
+
+def bench(n_samples: int = 2**16) -> None:
+    rng = np.random.default_rng(0)
+    t = np.arange(n_samples) / 10
+    b = (np.sin(2 * np.pi * 0.5 * t) > 0) * 1e6 + rng.normal(0, 1e5, n_samples)
+    amp = np.abs(np.fft.fft(b)) / n_samples
+    freq_arr = 10 * np.arange(n_samples) / n_samples
+    args = parse_args(["-e", "no", "-o", "ensemble"], "ftio")
+
+    # loads the modules of the methods
+    ensemble(amp, freq_arr, args)
+    features = spectrum_features(amp, freq_arr, args)
+
+    total = 0.0
+    slowest = 0.0
+    for method in ensemble_methods(args.ensemble)[0]:
+        tik = time.time()
+        candidates(method, freq_arr, args, features)
+        t_method = time.time() - tik
+        total += t_method
+        slowest = max(slowest, t_method)
+        print(f"{method:17s} {t_method:.4f} s")
+
+    tik = time.time()
+    dominant_index, _, _ = ensemble(amp, freq_arr, args)
+    t_ensemble = time.time() - tik
+    print(f"bins: {len(amp)//2}, dominant: {freq_arr[dominant_index]} Hz")
+    print(f"sum of methods:  {total:.4f} s")
+    print(f"slowest method:  {slowest:.4f} s")
+    print(f"ensemble:        {t_ensemble:.4f} s")
+
+
+if __name__ == "__main__":
+    bench(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,37 @@
+"""Compares the vectorized harmonic removal against the reference loop.
+
+call: python3 bench_harmonics.py [n_candidates] [n_bins]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from ftio.freq.anomaly_detection import remove_harmonics
+
+# reference implementations in test/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reference import remove_harmonics_loop
+
+
+def bench(n_candidates: int = 5000, n_bins: int = 100_000) -> None:
+    rng = np.random.default_rng(0)
+    freq_arr = 0.001 * np.arange(0, n_bins)
+    index = np.sort(rng.choice(np.arange(1, n_bins), n_candidates, replace=False))
+
+    tik = time.time()
+    kept_loop, _, _ = remove_harmonics_loop(freq_arr, None, index)
+    t_loop = time.time() - tik
+
+    tik = time.time()
+    kept, _, _ = remove_harmonics(freq_arr, None, index, verbose=False)
+    t_vec = time.time() - tik
+
+    assert np.array_equal(kept, kept_loop)
+    print(f"candidates: {n_candidates}, kept: {len(kept)}")
+    print(f"loop:       {t_loop:.4f} s")
+    print(f"vectorized: {t_vec:.4f} s  (speed-up {t_loop/t_vec if t_vec > 0 else np.inf:.1f}x)")
+
+
+if __name__ == "__main__":
+    bench(*[int(x) for x in sys.argv[1:]])
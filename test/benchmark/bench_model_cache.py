@@ -0,0 +1,36 @@
+"""Compares Isolation Forest and LOF with and without the model cache on a series of
+similar spectra (as the consecutive windows of the online predictor).
+
+call: python3 bench_model_cache.py [n_samples] [n_predictions]
+"""
+
+import sys
+import time
+import numpy as np
+from ftio.parse.args import parse_args
+from ftio.freq.anomaly_detection import isolation_forest, lof
+
+
+def bench(n_samples: int = 2**11, n_predictions: int = 20) -> None:
+    rng = np.random.default_rng(0)
+    t = np.arange(n_samples) / 10
+    freq_arr = 10 * np.arange(n_samples) / n_samples
+    spectra = []
+    for _ in range(n_predictions):
+        b = (1 + np.sin(2 * np.pi * 0.5 * t)) * 1e6 + rng.normal(0, 1e5, n_samples)
+        spectra.append(np.abs(np.fft.fft(b)) / n_samples)
+
+    for method in [isolation_forest, lof]:
+        for cache in [0, 8]:
+            args = parse_args(["-e", "no", "--model_cache", str(cache)], "ftio")
+            found = 0
+            tik = time.time()
+            for amp in spectra:
+                dominant_index, _, _ = method(amp, freq_arr, args)
+                found += len(dominant_index) > 0
+            t_method = (time.time() - tik) / n_predictions
+            print(f"{method.__name__:16s} cache={cache}: {t_method*1e3:8.2f} ms per prediction, periodic {found}/{n_predictions}")
+
+
+if __name__ == "__main__":
+    bench(*[int(x) for x in sys.argv[1:]])
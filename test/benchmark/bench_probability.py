@@ -0,0 +1,43 @@
+"""Compares the cost per prediction of find_probability (DBSCAN on all predictions)
+against the incremental ProbabilityTracker when the predictions are replayed.
+
+call: python3 bench_probability.py [n_predictions]
+"""
+
+import sys
+import time
+import contextlib
+import io
+import numpy as np
+from ftio.prediction.probability_analysis import find_probability, ProbabilityTracker
+
+
+def bench(n_predictions: int = 2000) -> None:
+    rng = np.random.default_rng(0)
+    data = []
+    t = 0.0
+    for i in range(n_predictions):
+        window = rng.uniform(20, 40)
+        freqs = [] if i % 7 == 0 else [rng.choice([0.1, 0.25, 0.5]) + rng.normal(0, 0.004)]
+        data.append({"dominant_freq": freqs, "conf": [0.9][: len(freqs)], "t_start": t, "t_end": t + window})
+        t += rng.uniform(0, 5)
+
+    tracker = ProbabilityTracker()
+    t_batch = t_online = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for n in range(1, n_predictions + 1):
+            tik = time.perf_counter()
+            batch = find_probability(data[:n])
+            t_batch += time.perf_counter() - tik
+            tik = time.perf_counter()
+            online = find_probability(data[:n], tracker=tracker)
+            t_online += time.perf_counter() - tik
+    assert [(p.freq_min, p.freq_max) for p in batch] == [(p.freq_min, p.freq_max) for p in online]
+
+    print(f"predictions: {n_predictions}, groups: {len(online)}")
+    print(f"batch:       {t_batch/n_predictions*1e3:.3f} ms per prediction")
+    print(f"incremental: {t_online/n_predictions*1e3:.3f} ms per prediction  (speed-up {t_batch/t_online:.1f}x)")
+
+
+if __name__ == "__main__":
+    bench(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""Measures the overhead of the result channel per message: the time from send_result
+in a prediction process until the subscriber receives the prediction, and the size
+of the message.
+
+call: python3 bench_publisher.py [n_messages]
+"""
+
+import sys
+import time
+import numpy as np
+import msgpack
+import zmq
+from ftio.prediction.publisher import ResultPublisher, prediction_message, send_result
+
+
+def bench(n_messages: int = 10_000) -> None:
+    publisher = ResultPublisher("127.0.0.1", "0", "")
+    context = zmq.Context()
+    sub = context.socket(zmq.SUB)
+    sub.connect(f"tcp://127.0.0.1:{publisher.pub_port}")
+    sub.setsockopt(zmq.SUBSCRIBE, b"")
+    time.sleep(0.2)
+
+    entry = {
+        "phase": 0, "dominant_freq": [0.1], "conf": [0.9], "phi": [0.5],
+        "t_start": 0.0, "t_end": 100.0, "hits": 1.0,
+    }
+    tik = time.time()
+    for _ in range(100):
+        prediction_message(entry, [], "app")
+    t_message = (time.time() - tik) / 100
+
+    latency = np.zeros(n_messages)
+    size = 0
+    for i in range(n_messages):
+        entry["phase"] = i
+        tik = time.perf_counter()
+        send_result(publisher.endpoint, prediction_message(entry, [], "app"))
+        _, msg = sub.recv_multipart()
+        latency[i] = time.perf_counter() - tik
+        size = len(msg)
+    assert msgpack.unpackb(msg)["count"] == n_messages - 1
+
+    print(f"messages: {n_messages}, size: {size} B")
+    print(f"building the message: {t_message*1e6:.1f} us")
+    print(f"latency (median/p99): {np.median(latency)*1e6:.1f} / {np.percentile(latency, 99)*1e6:.1f} us")
+    sub.close(linger=0)
+    context.term()
+    publisher.close()
+
+
+if __name__ == "__main__":
+    bench(*[int(x) for x in sys.argv[1:]])
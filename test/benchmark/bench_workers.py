@@ -0,0 +1,63 @@
+"""Measures the trigger-to-result latency of the predictor with a new process per
+prediction (--pool_size 0) and with persistent warm workers (--pool_size 1).
+
+call: python3 bench_workers.py [n_triggers] [file]
+"""
+
+import os
+import sys
+import time
+from multiprocessing import Manager
+import numpy as np
+from ftio.prediction.async_process import handle_in_process
+from ftio.prediction.processes import prediction_process, start_pool
+
+FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../examples/tmio/JSONL/8.jsonl")
+
+
+def bench_mode(pool_size: int, n_triggers: int, file: str) -> np.ndarray:
+    manager = Manager()
+    data = manager.list()
+    shared = (
+        data,
+        manager.Queue(),
+        manager.Value("i", 0),
+        manager.Value("d", 0.0),
+        manager.Value("d", 0.0),
+        manager.Value("d", 0.0),
+        ["predictor", file, "--pool_size", str(pool_size)],
+    )
+    pool = start_pool(*shared)
+
+    latency = []
+    # the first trigger is not measured (worker start and warm-up)
+    for i in range(n_triggers + 1):
+        tik = time.time()
+        if pool:
+            pool.submit(None, None)
+        else:
+            proc = handle_in_process(prediction_process, args=(*shared, None, None))
+        while len(data) <= i:
+            time.sleep(0.001)
+        latency.append(time.time() - tik)
+        if not pool:
+            proc.join()
+
+    if pool:
+        pool.close()
+    manager.shutdown()
+    return np.array(latency[1:])
+
+
+def bench(n_triggers: int = 10, file: str = FILE) -> None:
+    results = {}
+    for name, pool_size in [("process per trigger", 0), ("warm worker pool", 1)]:
+        results[name] = bench_mode(pool_size, n_triggers, file)
+
+    print(f"\ntriggers: {n_triggers}, file: {file}")
+    for name, latency in results.items():
+        print(f"{name:20s} mean: {latency.mean():.3f} s  min: {latency.min():.3f} s  max: {latency.max():.3f} s")
+
+
+if __name__ == "__main__":
+    bench(*[int(x) if i == 0 else x for i, x in enumerate(sys.argv[1:])])
@@ -0,0 +1,85 @@
+"""Reference implementations of vectorized functions of ftio. The tests and the
+benchmarks (test/benchmark) compare the vectorized versions against them.
+"""
+
+import numpy as np
+
+
+def sample_data_loop(b: np.ndarray, t: np.ndarray, freq: float) -> np.ndarray:
+    """Discretization that steps through the signal sample by sample (the
+    original implementation of sample_data)
+
+    Args:
+        b (np.ndarray): bandwidth
+        t (np.ndarray): time
+        freq (float): sampling frequency
+
+    Returns:
+        np.ndarray: sampled bandwidth
+    """
+    N = int(np.floor((t[-1] - t[0]) * freq))
+    b_sampled = np.zeros(N)
+    n = len(t)
+    counter = 0
+    n_old = 0
+    t_step = t[0]
+    for _ in range(0, N):
+        for i in range(n_old, n):
+            if i == n - 1 or (t_step >= t[i]) and (t_step < t[i + 1]):
+                n_old = i  # no need to iterate over entire array
+                b_sampled[counter] = b[i]
+                counter = counter + 1
+                break
+        t_step = t_step + 1 / freq
+
+    return b_sampled
+
+
+def dominant_loop(
+    dominant_index: np.ndarray, freq_arr: np.ndarray, conf: np.ndarray
+) -> tuple[list[float],str]:
+    """dominant of the baseline, which compares each frequency with the kept ones in a loop"""
+    text = ""
+    out = []
+    if len(dominant_index) > 0:
+        for i in dominant_index:
+            if any(freq_arr[i] % freq_arr[out] < 0.00001):
+                text += f"[yellow]Ignoring harmonic at: {freq_arr[i]:.3e} Hz (T = {1/freq_arr[i] if freq_arr[i] > 0 else 0:.3f} s, k = {i}) -> confidence: {abs(conf[i-1])*100:.3f}%[/]\n"
+            else:
+                text += f"Dominant frequency at: [green] {freq_arr[i]:.3e} Hz (T = {1/freq_arr[i] if freq_arr[i] > 0 else 0:.3f} s, k = {i}) -> confidence: {abs(conf[i-1])*100:.3f}%[/]\n"
+                out.append(i)
+            if len(out) > 2:
+                text = "[red]Too many dominant frequencies -> Signal might be not periodic[/]\n"
+                out = []
+                break
+    else: 
+        text = "[red]No dominant frequencies found -> Signal might be not periodic[/]\n"
+    
+    return out, text
+
+
+def remove_harmonics_loop(freq_arr, amp_tmp, index_list) -> tuple[np.ndarray, list, str]:
+    """remove_harmonics of the baseline, which compares each index with the kept ones in a loop"""
+    seen = []
+    removed = []
+    msg = ""
+    flag = True
+    # sort according to amplitude in descending order
+    # index_list = index_list[np.argsort(-amp_tmp[index_list])]
+    for ind in index_list:
+        if seen:
+            flag = True
+            for value in seen:
+                if freq_arr[ind] % freq_arr[value] < 0.00001 and ind != value:
+                    msg += (
+                        f"[yellow]Ignoring harmonic at: {freq_arr[ind]:.3e} Hz "
+                        f"(T = {1/freq_arr[ind] if freq_arr[ind] > 0 else 0:.3f} s, k = {ind})[/]\n"
+                        )
+                    removed.append(ind)
+                    flag = False
+                    break
+            if flag and ind not in seen:
+                seen.append(ind)
+        else:
+            seen.append(ind)
+    return np.array(seen), removed, msg
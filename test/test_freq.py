@@ -0,0 +1,200 @@
+import pytest
+import numpy as np
+from ftio.freq.discretize import sample_data
+from ftio.freq._sliding_dft import SlidingDFT, sliding_dft
+from ftio.freq.autocorrelation import autocorrelation
+from ftio.freq._dft import real_dft, rfft_buffer, amp_phi, step_dft_bins, STEP_DFT_MAX_N
+from ftio.freq._lomb_scargle import lomb_scargle
+from ftio.freq._welch import welch
+from ftio.freq._dbscan import dbscan
+from ftio.freq.anomaly_detection import dominant, remove_harmonics
+from reference import sample_data_loop, dominant_loop, remove_harmonics_loop
+
+
+def test_sample_data_matches_loop():
+    rng = np.random.default_rng(0)
+    t = np.sort(rng.uniform(0, 50, 500))
+    t = np.concatenate([t[:100], t[99:100], t[100:]])  # duplicated change point
+    b = rng.uniform(0, 1000, len(t))
+    for freq in [0.5, 10, 123.4]:
+        b_sampled, _, _ = sample_data(b, t, freq)
+        assert np.array_equal(b_sampled, sample_data_loop(b, t, freq))
+
+
+def test_sliding_dft_matches_fft():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 1000, 1000)
+    n = 301
+    sdft = SlidingDFT(x[:n], 10, 0)
+    end = n
+    for m in [1, 7, 50, 120, 400]:
+        sdft.slide(x[end : end + m])
+        end += m
+        assert np.allclose(sdft.spectrum(), np.fft.rfft(x[end - n : end]))
+    assert sdft.t_0 == pytest.approx((end - n) / 10)
+
+
+def test_sliding_dft_state():
+    rng = np.random.default_rng(0)
+    t = np.arange(0, 100, 0.5)
+    b = rng.uniform(0, 1000, len(t))
+    state = {}
+    _, first, _, _, _ = sliding_dft(state, b[:100], t[:100], 10)
+    sdft = state["sliding_dft"]
+    X, samples, _, t_0, text = sliding_dft(state, b, t, 10)
+    # slid in place with the length of the first window
+    assert state["sliding_dft"] is sdft
+    assert "new samples" in text
+    assert len(samples) == len(first)
+    assert t_0 > t[0]
+    assert np.allclose(X, np.fft.rfft(samples))
+    # a new start time establishes the window again
+    _, _, _, _, text = sliding_dft(state, b, t, 10, 20)
+    assert "established" in text
+
+
+def test_autocorrelation_matches_correlate():
+    rng = np.random.default_rng(0)
+    for n in [100, 101]:
+        x = rng.uniform(0, 1000, n)
+        ndata = x - np.mean(x)
+        expected = np.correlate(ndata, ndata, "full")[n - 1 :] / np.var(x) / n
+        assert np.allclose(autocorrelation(x), expected)
+        assert np.allclose(autocorrelation(x, np.fft.rfft(x, 2 * n)), expected)
+
+
+def test_real_dft_backends_match_fft():
+    rng = np.random.default_rng(0)
+    for n in [100, 101]:
+        x = rng.uniform(0, 1000, n)
+        X = np.fft.fft(x)
+        for backend in ["rfft", "scipy.fft", "numpy"]:
+            amp, phi = amp_phi(*real_dft(x, backend))
+            assert np.allclose(amp, np.abs(X))
+            assert np.allclose(np.exp(1j * phi), np.exp(1j * np.angle(X)))
+
+
+def test_rfft_buffer_reused():
+    rng = np.random.default_rng(0)
+    state = {}
+    for x in [rng.uniform(0, 1000, 101), rng.uniform(0, 1000, 101)]:
+        out = rfft_buffer(state, len(x))
+        X, _ = real_dft(x, out=out)
+        assert X is out and np.allclose(X, np.fft.rfft(x))
+    assert rfft_buffer(state, 101) is out
+    assert len(rfft_buffer(state, 200)) == 101
+
+
+def test_step_dft_bins():
+    rng = np.random.default_rng(0)
+    t = np.sort(rng.uniform(0, 100, 500))
+    # the auto mode has as many bins as change points
+    _, N, _ = step_dft_bins(t, -1)
+    assert abs(N - len(t)) <= 1
+    # a high sampling frequency is lowered
+    freq, N, text = step_dft_bins(t, 1e6)
+    assert N <= STEP_DFT_MAX_N and freq < 1e6 and "lowered" in text
+    assert step_dft_bins(t, 100)[:2] == (100, int(np.floor((t[-1] - t[0]) * 100)))
+
+
+def test_lomb_scargle_fast_matches_direct():
+    rng = np.random.default_rng(0)
+    t = np.sort(rng.uniform(3, 103, 3000))
+    b = 100 + 50 * np.cos(2 * np.pi * 0.2 * t) + rng.uniform(0, 10, len(t))
+    X = lomb_scargle(b, t, 10, 1000)
+    assert np.allclose(X, lomb_scargle(b, t, 10, 1000, fast=False), atol=1e-3 * np.abs(X).max())
+    assert np.argmax(np.abs(X[1:])) + 1 == 20
+    assert X[0].real / 1000 == pytest.approx(105, rel=1e-2)
+
+
+def test_welch_segments():
+    t = np.arange(0, 100, 0.1)
+    b = 1000 + 500 * np.sin(2 * np.pi * 0.5 * t)
+    X, L, _ = welch(b, t, 10, 1000, segment=20, overlap=0.5)
+    assert L == 200
+    assert np.argmax(np.abs(X[1:])) + 1 == 10
+    assert 2 * np.abs(X[10]) / L == pytest.approx(500, rel=2e-2)
+    X_chunked, _, _ = welch(b, t, 10, 1000, segment=20, overlap=0.5, chunk=400)
+    assert np.allclose(X, X_chunked)
+
+
+def test_harmonics_match_loop():
+    rng = np.random.default_rng(0)
+    freq_arr = 0.01 * np.arange(0, 4000)
+    conf = rng.uniform(0, 1, len(freq_arr))
+    for n in [0, 1, 2, 5, 40, 800]:
+        index = rng.choice(np.arange(1, 2000), n, replace=False)
+        for x in [np.sort(index), index]:
+            kept, removed, msg = remove_harmonics(freq_arr, None, x)
+            kept_loop, removed_loop, msg_loop = remove_harmonics_loop(freq_arr, None, x)
+            assert np.array_equal(kept, kept_loop) and removed == removed_loop and msg == msg_loop
+            assert dominant(x, freq_arr, conf) == dominant_loop(x, freq_arr, conf)
+            assert dominant(kept, freq_arr, conf) == dominant_loop(kept, freq_arr, conf)
+    # repeated indices and harmonics of a kept frequency
+    for x in [np.array([5, 10, 5, 15, 7]), np.array([3, 6, 9]), np.array([10, 5, 10, 10, 3, 5])]:
+        kept, removed, msg = remove_harmonics(freq_arr, None, x)
+        kept_loop, removed_loop, msg_loop = remove_harmonics_loop(freq_arr, None, x)
+        assert np.array_equal(kept, kept_loop) and removed == removed_loop and msg == msg_loop
+        assert dominant(x, freq_arr, conf) == dominant_loop(x, freq_arr, conf)
+    assert remove_harmonics(freq_arr, None, np.array([4, 8, 12]), verbose=False)[2] == ""
+
+
+def test_dbscan_matches_sklearn():
+    from sklearn.cluster import DBSCAN
+
+    rng = np.random.default_rng(0)
+    # spectrum: noise floor with a few peaks
+    n = 5000
+    amp = rng.exponential(1, n)
+    amp[[100, 250, 251, 1200, 4000]] += [400, 300, 310, 150, 420]
+    x = np.arange(1, n + 1) / n
+    spectrum = np.column_stack((x, amp / amp.sum()))
+    eps = np.sqrt((np.ptp(spectrum[:, 1]) * 0.2) ** 2 + (x[1] - x[0]) ** 2)
+    points = rng.uniform(0, 1, (2000, 2))
+    line = np.column_stack((x[:500], np.full(500, 0.3)))
+    line[::7, 0] += 0.5
+    for d, e in [(spectrum, eps), (points, 0.02), (points, 0.05), (np.round(points, 2), 0.01), (line, 0.003)]:
+        assert np.array_equal(dbscan(d, e), DBSCAN(eps=e, min_samples=2).fit(d).labels_)
+    assert np.array_equal(dbscan(spectrum, eps) == -1, np.isin(np.arange(n), [100, 1200, 4000]))
+
+
+def test_model_cache():
+    from argparse import Namespace
+    from sklearn.ensemble import IsolationForest
+    import ftio.freq.model_cache as mc
+
+    mc._CACHE = None
+    args = Namespace(model_cache=2, model_refit=2, model_extra=5)
+    d = np.random.default_rng(0).uniform(0, 1, (200, 2))
+    create = lambda: IsolationForest(n_estimators=20, warm_start=True)
+    key = mc.model_key("forest", np.arange(400) / 4)
+    assert key == ("forest", 400, 100.0)
+
+    model, _ = mc.fit_model(key, create, d, args)
+    reused, _ = mc.fit_model(key, create, d, args)
+    assert reused is model and model.n_estimators == 25 and len(model.estimators_) == 25
+    mc.fit_model(key, create, d, args)
+    refit, _ = mc.fit_model(key, create, d, args)
+    assert refit is not model and refit.n_estimators == 20
+    # least recently used model is evicted
+    mc.fit_model(("lof", 1, 1.0), create, d, args)
+    mc.fit_model(key, create, d, args)
+    mc.fit_model(("other", 1, 1.0), create, d, args)
+    assert list(mc._CACHE.models) == [key, ("other", 1, 1.0)]
+    assert (mc._CACHE.hits, mc._CACHE.misses) == (3, 4)
+    # disabled
+    args.model_cache = 0
+    assert mc.fit_model(key, create, d, args)[0] is not mc._CACHE.get(key).model
+    mc._CACHE = None
+
+
+def test_model_cache_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from ftio.freq.model_cache import ModelCache, CachedModel
+
+    cache = ModelCache(2)
+    cache.put("key", CachedModel(None))
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: cache.reuse("key", 3000), range(8000)))
+    assert (cache.hits, cache.misses) == (3000, 5000)
+    assert cache.get("key").uses == 3000
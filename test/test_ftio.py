@@ -1,5 +1,8 @@
+import pytest
+import numpy as np
+from ftio.freq._welch import welch
 from ftio.cli.ftio_core import main
-from ftio.cli.ftio_core import core
+from ftio.cli.ftio_core import core, core_batch
 from ftio.parse.args import parse_args
 from ftio.freq._dft import display_prediction
 from ftio.post.processing import label_phases
@@ -34,6 +37,28 @@ def test_ftio_dbscan():
     assert prediction["t_start"] == 0.05309
 
 
+def test_ftio_dbscan_matches_sklearn(monkeypatch):
+    from sklearn.cluster import DBSCAN
+    import ftio.freq._dbscan as grid
+
+    calls = []
+    grid_dbscan = grid.dbscan
+
+    def dbscan(d, eps):
+        labels = grid_dbscan(d, eps)
+        calls.append((d, eps, labels.copy()))
+        return labels
+
+    monkeypatch.setattr(grid, "dbscan", dbscan)
+    file = "../examples/tmio/JSONL/8.jsonl"
+    for freq in ["1", "10", "100"]:
+        for tol in ["0.8", "0.95"]:
+            _ = main(["ftio", file, "-e", "no", "-o", "dbscan", "-f", freq, "-t", tol])
+    assert len(calls) == 6
+    for d, eps, labels in calls:
+        assert np.array_equal(labels, DBSCAN(eps=eps, min_samples=2).fit(d).labels_)
+
+
 def test_ftio_lof():
     file = "../examples/tmio/JSONL/8.jsonl"
     args = ["ftio", file, "-e", "no", "-o", "lof"]
@@ -41,6 +66,38 @@ def test_ftio_lof():
     assert prediction["t_start"] == 0.05309
 
 
+def test_ftio_ensemble(monkeypatch):
+    file = "../examples/tmio/JSONL/8.jsonl"
+    dominant = {}
+    for method in ["Z-score", "DB-Scan", "peaks"]:
+        prediction, _ = main(["ftio", file, "-e", "no", "-o", method])
+        dominant[method] = list(prediction["dominant_freq"])
+    args = ["ftio", file, "-e", "no", "-o", "ensemble", "--ensemble", "Z-score:2,DB-Scan,peaks"]
+    prediction, _ = main(list(args))
+    assert prediction["t_start"] == 0.05309
+    # Z-score has half of the weight
+    assert list(prediction["dominant_freq"]) == dominant["Z-score"]
+    assert all(0 <= c <= 1 for c in prediction["conf"])
+    # same result with the methods on threads
+    monkeypatch.setattr("os.sched_getaffinity", lambda pid: {0, 1, 2}, raising=False)
+    parallel, _ = main(list(args))
+    assert list(parallel["dominant_freq"]) == list(prediction["dominant_freq"])
+    assert list(parallel["conf"]) == list(prediction["conf"])
+
+
+def test_ftio_ensemble_model_cache(monkeypatch):
+    import ftio.freq.model_cache as mc
+
+    file = "../examples/tmio/JSONL/8.jsonl"
+    monkeypatch.setattr("os.sched_getaffinity", lambda pid: {0, 1, 2}, raising=False)
+    monkeypatch.setattr(mc, "_CACHE", None)
+    args = ["ftio", file, "-e", "no", "-o", "ensemble", "--model_cache", "4"]
+    main(list(args))
+    main(list(args))
+    # the threads share the models of Isolation Forest and LOF
+    assert (mc._CACHE.misses, mc._CACHE.hits) == (2, 2)
+
+
 def test_ftio_plot():
     file = "../examples/tmio/JSONL/8.jsonl"
     args = ["ftio", file, "-e", "no"]
@@ -54,4 +111,100 @@ def test_ftio_display_prediction():
     args = ["ftio", file, "-e", "no"]
     prediction, args = main(args)
     display_prediction("ftio", prediction)
-    assert True
\ No newline at end of file
+    assert True
+
+def test_ftio_step_dft():
+    file = "../examples/tmio/JSONL/8.jsonl"
+    prediction, _ = main(["ftio", file, "-e", "no", "-f", "100"])
+    prediction_step, _ = main(["ftio", file, "-e", "no", "-f", "100", "-tr", "step_dft"])
+    assert prediction_step["dominant_freq"] == pytest.approx(prediction["dominant_freq"])
+
+
+def test_ftio_lomb():
+    file = "../examples/tmio/JSONL/8.jsonl"
+    prediction, _ = main(["ftio", file, "-e", "no", "-f", "100"])
+    prediction_lomb, _ = main(["ftio", file, "-e", "no", "-f", "100", "-tr", "lomb"])
+    assert prediction_lomb["dominant_freq"] == pytest.approx(prediction["dominant_freq"])
+
+
+def test_ftio_welch():
+    file = "../examples/tmio/JSONL/8.jsonl"
+    prediction, _ = main(["ftio", file, "-e", "no", "-f", "100"])
+    prediction_welch, _ = main(["ftio", file, "-e", "no", "-f", "100", "-tr", "welch", "-c"])
+    resolution = 4 / (prediction["t_end"] - prediction["t_start"])
+    assert abs(prediction_welch["dominant_freq"][0] - prediction["dominant_freq"][0]) <= resolution
+
+
+def test_ftio_welch_plot_data():
+    from ftio.cli.ftio_core import freq_analysis
+
+    t = np.arange(0, 100, 0.25)
+    b = np.where(t % 10 < 1, 1000.0, 0)
+    args = parse_args(["-e", "mat", "-f", "10", "-tr", "welch"], "ftio")
+    data = {"time": t, "bandwidth": b, "total_bytes": 0, "ranks": 1}
+    prediction, dfs, _ = freq_analysis(args, data)
+    # the plot shows the entire signal, not only the first segment
+    signal = dfs[0][0]["b_sampled"]
+    assert len(signal) == int((t[-1] - t[0]) * 10)
+    assert dfs[0][0]["A"].notna().all() and dfs[0][0]["freq"].isna().any()
+    # no samples in the time window
+    with pytest.raises(ValueError):
+        welch(b[:1], t[:1], 10, 0)
+
+
+def test_ftio_batch():
+    rng = np.random.default_rng(0)
+    t = np.arange(0, 100, 0.25)
+    data = []
+    for period in [5, 10, 20, 10]:
+        b = np.where(t % period < 1, 1000.0, 0) + rng.uniform(0, 10, len(t))
+        data.append({"time": t, "bandwidth": b, "total_bytes": 0, "ranks": period})
+    data.append({"time": t[:200], "bandwidth": data[0]["bandwidth"][:200], "total_bytes": 0, "ranks": 1})
+    args = parse_args(["-e", "no", "-c"], "ftio")
+    predictions, _ = core_batch(data, args)
+    assert len(predictions) == len(data)
+    for sim, prediction in zip(data, predictions):
+        expected, _ = core([sim], args)
+        assert prediction["dominant_freq"] == pytest.approx(expected["dominant_freq"])
+        assert prediction["conf"] == pytest.approx(expected["conf"])
+
+
+def test_ftio_batch_fast_len(monkeypatch):
+    import ftio.freq._dft as dft
+
+    calls = []
+    fast_len_dft = dft.fast_len_dft
+    monkeypatch.setattr(dft, "fast_len_dft", lambda b, workers: calls.append(b.shape) or fast_len_dft(b, workers))
+    t = np.arange(0, 100, 0.25)
+    data = [
+        {"time": t, "bandwidth": np.where(t % period < 1, 1000.0, 0), "total_bytes": 0, "ranks": 1}
+        for period in [5, 10, 20]
+    ]
+    predictions, _ = core_batch(data, parse_args(["-e", "no", "-f", "3.97"], "ftio"))
+    fast, _ = core_batch(data, parse_args(["-e", "no", "-f", "3.97", "--fft_fast_len"], "ftio"))
+    assert len(calls) == 1 and calls[0][0] == len(data)
+    for prediction, expected in zip(fast, predictions):
+        assert prediction["dominant_freq"] == pytest.approx(expected["dominant_freq"])
+        assert prediction["conf"] == pytest.approx(expected["conf"])
+
+
+def test_ftio_refine():
+    t = np.arange(0, 50, 0.1)
+    b = 1000 + 500 * np.sin(2 * np.pi * t / 7.3)
+    data = [{"time": t, "bandwidth": b, "total_bytes": 0, "ranks": 1}]
+    prediction, _ = core(data, parse_args(["-e", "no", "-f", "10"], "ftio"))
+    refined, _ = core(data, parse_args(["-e", "no", "-f", "10", "--refine"], "ftio"))
+    assert abs(1 / refined["dominant_freq"][0] - 7.3) < abs(1 / prediction["dominant_freq"][0] - 7.3)
+    assert 1 / refined["dominant_freq"][0] == pytest.approx(7.3, rel=1e-2)
+
+
+def test_ftio_fast_len():
+    # 289 samples, the fast length would be 300
+    file = "../examples/tmio/JSONL/8.jsonl"
+    for extra in [[], ["-c"]]:
+        prediction, _ = main(["ftio", file, "-e", "no", *extra])
+        fast, _ = main(["ftio", file, "-e", "no", "--fft_fast_len", *extra])
+        assert len(fast["dominant_freq"]) > 0
+        assert np.allclose(fast["dominant_freq"], prediction["dominant_freq"])
+        assert np.allclose(fast["conf"], prediction["conf"])
+        assert np.allclose(fast["amp"], prediction["amp"])
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+
+# modules that are only needed for plots, wavelets, or optional detectors and readers
+HEAVY = ["matplotlib", "plotly", "sklearn", "kneed", "pywt", "fastdtw", "scipy.signal", "darshan", "zmq"]
+
+
+def import_times(module: str) -> dict:
+    """cumulative import time in us of every module loaded by `import module`"""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    times = {}
+    for line in out.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def heavy_modules(times: dict) -> list[str]:
+    """heavy modules (or their submodules) in the output of -X importtime"""
+    return [m for m in times if any(m == h or m.startswith(f"{h}.") for h in HEAVY)]
+
+
+def test_ftio_import_light():
+    times = import_times("ftio.cli.ftio_core")
+    assert "ftio.cli.ftio_core" in times
+    assert heavy_modules(times) == []
+
+
+def test_predictor_import_light():
+    times = import_times("ftio.prediction.processes")
+    assert "ftio.prediction.processes" in times
+    assert heavy_modules(times) == []
+
+
+def test_headless_prediction_imports():
+    code = (
+        "import sys\n"
+        "from ftio.cli.ftio_core import main\n"
+        "main(['ftio', '../examples/tmio/JSONL/8.jsonl', '-e', 'no'])\n"
+        f"print([m for m in {HEAVY} if m in sys.modules])\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.splitlines()[-1] == "[]"
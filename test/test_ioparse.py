@@ -1,4 +1,13 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
 from ftio.util.ioparse import main
+from ftio.parse.args import parse_args
+from ftio.parse.bandwidth import overlap, IncrementalOverlap
+from ftio.parse.parse_jsonl import ParseJsonl
+from ftio.parse.parse_msgpack import ParseMsgpack
+from ftio.parse.parse_incremental import ParseIncremental
 
 
 def test_ioplot():
@@ -6,3 +15,137 @@ def test_ioplot():
     args = ["ioparse", file]
     main(args)
     assert True
+
+
+def test_incremental_overlap():
+    rng = np.random.default_rng(0)
+    t_s = np.sort(rng.uniform(0, 100, 300))
+    t_e = t_s + rng.uniform(0.1, 5, 300)
+    b = rng.uniform(1, 10, 300)
+    inc = IncrementalOverlap(["b_rank_avr"])
+    for start in range(0, 300, 37):
+        inc.add({"b_rank_avr": b[start : start + 37]}, t_s[start : start + 37], t_e[start : start + 37])
+    b_ref, t_ref = overlap(b, t_s, t_e)
+    b_inc, t_inc = inc.result("b_rank_avr")
+    assert np.array_equal(t_inc, t_ref)
+    assert np.allclose(b_inc, b_ref)
+
+
+def check_incremental(file: str, ext: str, parser, tmp_path) -> None:
+    raw = open(file, "rb").read()
+    name = str(tmp_path / f"trace.{ext}")
+    inc = ParseIncremental(name)
+    # the cuts split lines and objects
+    for cut in [len(raw) // 7, len(raw) // 3 + 5, len(raw)]:
+        with open(name, "wb") as f:
+            f.write(raw[:cut])
+        run = inc.to_simrun(parse_args(["predictor", name]))
+    ref = parser(name).to_simrun(parse_args(["predictor", name]))
+    # without new data, the Simrun and its samples are reused
+    sample = run.write_sync
+    assert inc.to_simrun(parse_args(["predictor", name])) is run
+    assert run.write_sync is sample
+    for mode in ["read_sync", "write_sync", "read_async_t", "write_async_t"]:
+        x, y = getattr(run, mode), getattr(ref, mode)
+        assert repr(x.total_bytes) == repr(y.total_bytes)
+        assert np.array_equal(x.bandwidth.t_overlap, y.bandwidth.t_overlap)
+        assert np.allclose(x.bandwidth.b_overlap_avr, y.bandwidth.b_overlap_avr)
+        assert x.bandwidth.b_rank_avr == y.bandwidth.b_rank_avr
+
+    # a truncated file is parsed again
+    with open(name, "wb") as f:
+        f.write(raw[: len(raw) // 7])
+    assert inc.to_simrun(parse_args(["predictor", name])).write_sync.total_bytes <= run.write_sync.total_bytes
+
+
+def test_incremental_jsonl(tmp_path):
+    check_incremental("../examples/tmio/JSONL/8.jsonl", "jsonl", ParseJsonl, tmp_path)
+
+
+def test_incremental_msgpack(tmp_path):
+    check_incremental("../examples/tmio/ior/parallel/384.msgpack", "msgpack", ParseMsgpack, tmp_path)
+
+
+def test_zmq_binary_frames():
+    import zmq
+    import msgpack
+    from ftio.cli import ftio_core
+    from ftio.parse.zmq_reader import encode_frames, receive
+
+    ts = np.arange(0, 100, 0.5)
+    te = ts + 0.5
+    b = 1e6 * (1 + (ts % 10 < 5))
+    context = zmq.Context.instance()
+    pull = context.socket(zmq.PULL)
+    pull.bind("inproc://ftio_test")
+    push = context.socket(zmq.PUSH)
+    push.connect("inproc://ftio_test")
+    push.send_multipart(encode_frames(b, ts, te, 8), copy=False)
+    push.send(msgpack.packb({"ranks": 8, "b": b.tolist(), "ts": ts.tolist(), "te": te.tolist()}))
+    binary, packed = receive(pull), receive(pull)
+    push.close()
+    pull.close()
+
+    assert isinstance(binary, dict) and isinstance(packed, bytes)
+    assert binary["ranks"] == 8 and np.array_equal(binary["te"], te)
+    args = ["ftio", "--zmq", "-e", "no", "-f", "10"]
+    prediction_binary, _ = ftio_core.main(args, [binary])
+    prediction_packed, _ = ftio_core.main(args, [packed])
+    assert np.array_equal(prediction_binary["dominant_freq"], prediction_packed["dominant_freq"])
+    assert np.isclose(prediction_binary["dominant_freq"][0], 0.1)
+
+
+def test_darshan_dxt():
+    darshan = pytest.importorskip("darshan")
+    from ftio.parse.darshan_reader import extract
+
+    file = os.path.join(os.path.dirname(darshan.__file__), "examples", "example_logs", "dxt.darshan")
+    if not os.path.isfile(file):
+        pytest.skip("example log of pydarshan not found")
+    data, ranks = extract(file, parse_args(["ftio", file, "--dxt_mode", "POSIX"]))
+    read, write = data["read_sync"], data["write_sync"]
+    assert ranks == 1
+    assert (read["total_bytes"], read["total_io_phases"], read["max_io_phases_per_rank"]) == (22517726, 6126, 3347)
+    assert (write["total_bytes"], write["total_io_phases"], write["max_io_phases_per_rank"]) == (13021781, 1497, 1066)
+    assert len(read["bandwidth"]["b_rank_avr"]) == 6126
+    assert np.isclose(
+        data["io_time"]["delta_t_sr"],
+        np.sum(np.array(read["bandwidth"]["t_rank_e"]) - np.array(read["bandwidth"]["t_rank_s"])),
+    )
+
+
+class FakeHeatmap:
+    _bin_width_seconds = 0.5
+
+    def __init__(self, values: dict):
+        self.values = values
+
+    def to_df(self, ops: list) -> pd.DataFrame:
+        values = self.values[ops[0]]
+        bins = pd.IntervalIndex.from_breaks(np.arange(values.shape[1] + 1) * self._bin_width_seconds)
+        return pd.DataFrame(values, index=pd.Index(range(len(values)), name="rank"), columns=bins)
+
+
+class FakeReport:
+    def __init__(self, values: dict):
+        self.heatmaps = {"POSIX": FakeHeatmap(values)}
+
+    def read_all_heatmap_records(self):
+        pass
+
+
+def test_darshan_heatmap():
+    from ftio.parse.darshan_reader import extract_heatmap, extract_darshan
+
+    write = np.array([[0, 10, 20, 0], [0, 0, 0, 0], [5, 0, 0, 40]])
+    read = np.array([[1, 0, 0, 0], [0, 2, 3, 0], [0, 0, 0, 0]])
+    segments, freq, total_time = extract_heatmap(FakeReport({"write": write, "read": read}), "POSIX")
+    w, r, t = extract_darshan(segments)
+    assert freq == 10
+    assert total_time["delta_t_agg"] == 3 * 2.0
+    assert (w["number_of_ranks"], w["total_bytes"], w["max_bytes_per_rank"]) == (3, 75, 45)
+    assert (w["max_bytes_per_phase"], w["max_io_phases_per_rank"], w["total_io_phases"]) == (40, 2, 4)
+    assert w["bandwidth"]["t_rank_s"] == [0.5, 1.0, 0.0, 1.5]
+    assert w["bandwidth"]["b_rank_avr"] == [20, 40, 10, 80]
+    assert (r["number_of_ranks"], r["total_bytes"], r["max_bytes_per_rank"]) == (2, 6, 5)
+    assert t["delta_t_sw"] == 2.0 and t["delta_t_sr"] == 1.5
@@ -0,0 +1,302 @@
+import time
+import threading
+import numpy as np
+from multiprocessing import Manager
+from ftio.prediction.analysis import get_state
+from ftio.prediction.processes import start_pool, start_scheduler
+from ftio.prediction.scheduler import CoalescingScheduler
+from ftio.prediction.monitor import FileWatcher
+import ftio.prediction.monitor as pm
+from ftio.prediction.shared_history import SharedHistory
+from ftio.prediction.async_process import handle_in_process
+
+
+def test_worker_pool():
+    file = "../examples/tmio/JSONL/8.jsonl"
+    manager = Manager()
+    data = manager.list()
+    args = ["predictor", file, "--pool_size", "1"]
+    shared = (data, manager.Queue(), manager.Value("i", 0), manager.Value("d", 0.0),
+              manager.Value("d", 0.0), manager.Value("d", 0.0), args)
+    pool = start_pool(*shared)
+    scheduler = start_scheduler(pool, shared, None, args)
+    # the second trigger waits for the first prediction, the third one is merged into it
+    for _ in range(3):
+        scheduler.submit()
+    for _ in range(6000):
+        if len(data) == 2:
+            break
+        time.sleep(0.01)
+    pool.close(timeout=60)
+    scheduler.shutdown()
+    assert len(data) == 2
+    assert scheduler.coalesced == 1
+    assert data[0]["t_start"] == 0.05309
+    assert args == ["predictor", file, "--pool_size", "1"]
+    manager.shutdown()
+
+
+def test_state_kept_in_process():
+    assert get_state("a") is get_state("a")
+    assert get_state("a") is not get_state("b")
+
+
+def test_no_pool():
+    assert start_pool(None, None, None, None, None, None, ["predictor", "x", "--pool_size", "0"]) is None
+
+
+def test_coalescing_scheduler():
+    launched = []
+    scheduler = CoalescingScheduler(lambda job, ticket: launched.append((job, ticket)), 1, lambda a, b: a + b)
+    for msgs in [[1], [2], [3]]:
+        scheduler.submit(msgs)
+    # one prediction in flight, the other messages are merged into one pending job
+    assert [job for job, _ in launched] == [[1]]
+    assert scheduler.coalesced == 1
+    launched[0][1].finish()
+    for _ in range(1000):
+        if len(launched) == 2:
+            break
+        time.sleep(0.01)
+    assert [job for job, _ in launched] == [[1], [2, 3]]
+    assert [ticket.seq for _, ticket in launched] == [0, 1]
+
+    # results older than the applied one are dropped
+    old, new = launched[0][1], launched[1][1]
+    assert new.acquire()
+    new.release()
+    assert not old.acquire()
+    scheduler.shutdown()
+
+
+class RecordingTicket:
+    """Ticket that records the number of collected predictions when its lock is released"""
+
+    seq = 0
+
+    def __init__(self, data: list):
+        self.data = data
+        self.released = []
+
+    def acquire(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        self.released.append(len(self.data))
+
+    def finish(self) -> None:
+        pass
+
+
+def test_prediction_collected_under_ticket():
+    import queue
+    from types import SimpleNamespace
+    from ftio.prediction.processes import prediction_process
+
+    file = "../examples/tmio/JSONL/8.jsonl"
+    data = []
+    ticket = RecordingTicket(data)
+    shared = (data, queue.Queue(), SimpleNamespace(value=0), SimpleNamespace(value=0.0),
+              SimpleNamespace(value=0.0), SimpleNamespace(value=0.0), ["predictor", file])
+    prediction_process(*shared, ticket=ticket)
+    # the prediction was appended to data before the lock was released
+    assert ticket.released == [1]
+
+
+def append_later(name: str, delay: float) -> list:
+    tik = []
+
+    def append():
+        time.sleep(delay)
+        tik.append(time.time())
+        with open(name, "a") as f:
+            f.write("{}\n")
+
+    threading.Thread(target=append).start()
+    return tik
+
+
+def test_file_watcher(tmp_path):
+    name = str(tmp_path / "trace.jsonl")
+    open(name, "w").close()
+    for backend in ["inotify", "stat"]:
+        watcher = FileWatcher(name, backend=backend)
+        tik = append_later(name, 0.1)
+        assert watcher.wait(timeout=5) == [name]
+        assert time.time() - tik[0] < 0.2
+        assert watcher.wait(timeout=0.1) == []
+        watcher.close()
+
+
+def test_monitor_wakes_on_append(tmp_path):
+    names = [str(tmp_path / f"write{i}.msgpack") for i in range(2)]
+    for name in names:
+        open(name, "w").close()
+    stamp, _ = pm.monitor(names[0], "")
+    tik = append_later(names[0], 0.1)
+    new_stamp, _ = pm.monitor(names[0], stamp)
+    assert new_stamp != stamp
+    assert time.time() - tik[0] < 0.2
+
+    stamps, _ = pm.monitor_list(names, 2)
+    for i, name in enumerate(names):
+        append_later(name, 0.05 * (i + 1))
+    new_stamps, _ = pm.monitor_list(names, 2, stamps)
+    assert all(new_stamps[name] != stamps[name] for name in names)
+
+
+def append_history(history: SharedHistory, value: float) -> None:
+    for i in range(20):
+        history.append(np.full(50, value), np.arange(50) + 50 * i)
+
+
+def test_shared_history():
+    # starts small, so the processes grow the segment while appending
+    history = SharedHistory(columns=2, capacity=8)
+    procs = [handle_in_process(append_history, args=(history, value)) for value in range(3)]
+    for proc in procs:
+        proc.join()
+    b, t = history.view()
+    assert len(history) == len(b) == len(t) == 3000
+    assert np.bincount(b.astype(int)).tolist() == [1000, 1000, 1000]
+    assert not b.flags.writeable
+
+    history.append([7.0], [1e6])
+    b_new, t_new = history.view()
+    assert b_new[-1] == 7.0 and t_new[-1] == 1e6
+    assert t[-1] == t_new[-2]
+    del b, t, b_new, t_new
+    history.close()
+
+
+def test_predictor_server():
+    import asyncio
+    import msgpack
+    import zmq
+    import zmq.asyncio
+    from ftio.parse.zmq_reader import encode_frames
+    from ftio.prediction.server_zmq import PredictorServer
+
+    ts = np.arange(0, 100, 0.5)
+    te = ts + 0.5
+
+    async def run() -> PredictorServer:
+        server = PredictorServer(["predictor", "-f", "10", "--zmq_address", "127.0.0.1", "--zmq_port", "0", "--pool_size", "2"])
+        endpoint = server.bind()
+        serving = asyncio.ensure_future(server.serve())
+        push = server.context.socket(zmq.PUSH)
+        push.connect(endpoint)
+        # two applications with periods of 10 s and 5 s
+        b_a = 1e6 * (1 + (ts % 10 < 5))
+        b_b = 1e6 * (1 + (ts % 5 < 2.5))
+        await push.send(msgpack.packb({"app": "a", "ranks": 1, "b": b_a.tolist(), "ts": ts.tolist(), "te": te.tolist()}))
+        await push.send_multipart(encode_frames(b_b, ts, te, 1, app="b"), copy=False)
+        for _ in range(6000):
+            if sum(len(t.data) for t in server.tenants.values()) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        await server.idle()
+        push.close(linger=0)
+        serving.cancel()
+        server.close()
+        return server
+
+    server = asyncio.run(run())
+    assert sorted(server.tenants) == ["a", "b"]
+    assert np.isclose(server.tenants["a"].data[0]["dominant_freq"][0], 0.1)
+    assert np.isclose(server.tenants["b"].data[0]["dominant_freq"][0], 0.2)
+    assert server.tenants["a"].count.value == 1
+    # each application is pinned to its own worker
+    assert sorted(t.worker for t in server.tenants.values()) == [0, 1]
+
+
+def test_publisher():
+    import msgpack
+    import zmq
+    from ftio.prediction.publisher import start_publisher
+    from ftio.prediction.processes import prediction_process
+
+    file = "../examples/tmio/JSONL/8.jsonl"
+    args = ["predictor", file, "--pub_port", "0", "--rep_port", "0", "--zmq_address", "127.0.0.1"]
+    publisher = start_publisher(args)
+    assert args[-2] == "--result_endpoint"
+    context = zmq.Context()
+    sub = context.socket(zmq.SUB)
+    sub.connect(f"tcp://127.0.0.1:{publisher.pub_port}")
+    sub.setsockopt(zmq.SUBSCRIBE, b"")
+    time.sleep(0.2)  # PUB drops messages until the subscription arrives
+
+    manager = Manager()
+    data = manager.list()
+    shared = (data, manager.Queue(), manager.Value("i", 0), manager.Value("d", 0.0),
+              manager.Value("d", 0.0), manager.Value("d", 0.0), args)
+    handle_in_process(prediction_process, args=shared).join()
+    assert sub.poll(10000)
+    app, msg = sub.recv_multipart()
+    result = msgpack.unpackb(msg)
+    assert app == b"default"
+    assert result["count"] == 0 and result["t_start"] == data[0]["t_start"]
+    assert {"freq", "period", "conf", "phase", "probability"} <= set(result)
+
+    req = context.socket(zmq.REQ)
+    req.connect(f"tcp://127.0.0.1:{publisher.rep_port}")
+    req.send(msgpack.packb({"app": "default"}))
+    assert req.poll(5000)
+    assert msgpack.unpackb(req.recv()) == result
+    for socket in [sub, req]:
+        socket.close(linger=0)
+    context.term()
+    publisher.close()
+    manager.shutdown()
+
+
+def test_trigger_scheduler():
+    from ftio.prediction.trigger import TriggerScheduler, LocalCargo
+
+    cargo = LocalCargo()
+    scheduler = TriggerScheduler()
+    now = time.time()
+    scheduler.schedule(now + 0.2, cargo, "cargo", {"source": "#0"})
+    # a newer prediction moves the flush
+    scheduler.schedule(now + 0.1, cargo, "cargo", {"source": "#1"})
+    scheduler.schedule(now + 0.15, cargo, "other", {"source": "#2"})
+    assert scheduler.cancel("other")
+    assert not scheduler.cancel("missing")
+    time.sleep(0.4)
+    scheduler.close()
+
+    assert [info["source"] for _, info in cargo.flushes] == ["#1"]
+    record = scheduler.records[0]
+    assert record["target"] == now + 0.1 and record["result"] == 0
+    assert 0 <= record["delay"] < 0.05
+    assert scheduler.pending("cargo") is None
+
+
+def test_probability_tracker():
+    from ftio.prediction.probability_analysis import find_probability, ProbabilityTracker
+
+    rng = np.random.default_rng(3)
+    data = []
+    t = 0.0
+    for i in range(200):
+        window = rng.uniform(20, 40)
+        freqs = [] if i % 7 == 0 else [rng.choice([0.1, 0.25, 0.5]) + rng.normal(0, 0.004), rng.uniform(0, 1)]
+        data.append({"dominant_freq": freqs, "conf": [0.9, 0.1][: len(freqs)], "t_start": t, "t_end": t + window})
+        t += rng.uniform(0, 5)
+
+    # spread frequencies and similar windows (small eps), many small groups
+    for i in range(200, 600):
+        freqs = [rng.uniform(0.05, 5)] if i % 5 else []
+        data.append({"dominant_freq": freqs, "conf": [0.5][: len(freqs)], "t_start": t, "t_end": t + rng.uniform(30, 30.5)})
+        t += rng.uniform(0, 5)
+
+    tracker = ProbabilityTracker()
+    for n in [1, 2, 3, 10, 50, 51, 120, 200, 201, 350, 600]:
+        batch = find_probability(data[:n])
+        online = find_probability(data[:n], tracker=tracker)
+        assert len(batch) == len(online)
+        for a, b in zip(batch, online):
+            assert (a.freq_min, a.freq_max) == (b.freq_min, b.freq_max)
+            assert np.isclose(a.p_periodic, b.p_periodic) and np.isclose(a.p_freq, b.p_freq)
+            assert np.isclose(a.p_freq_given_periodic, b.p_freq_given_periodic)
+    assert tracker.seen == 600